@@ -0,0 +1,405 @@
+import selectors
+import socket
+import struct
+import sys
+import time
+from array import array
+from threading import Event, Lock, Thread
+
+from core import AGGREGATE_PORT, CYCLE_LOSS_THRESHOLD
+
+AGENT_FLUSH_INTERVAL = 0.5  # Seconds between result batches sent by an agent
+AGENT_RECONNECT_MAX = 30  # Longest wait in seconds between an agent's reconnect attempts
+MAX_FRAME = 1 << 24  # Largest frame accepted, to bound a bad peer's memory use
+
+# Wire format: every frame is a little-endian uint32 payload length and the
+# payload, whose first byte is its type. Results travel column-wise, so
+# packing and unpacking a batch is a few array copies whatever its size.
+FRAME = struct.Struct("<I")
+HELLO = 1  # payload: agent name (UTF-8)
+KEYS = 2  # payload: count, then per key KEY_ENTRY, ip and name (UTF-8)
+RESULTS = 3  # payload: RESULTS_HEADER, count uint32 key ids, count * burst float32 RTTs (NaN = lost)
+KEYS_HEADER = struct.Struct("<BI")  # type, count
+KEY_ENTRY = struct.Struct("<IHH")  # key id, ip bytes, name bytes
+RESULTS_HEADER = struct.Struct("<BdIB")  # type, unix time sent, count, burst
+SWAP = sys.byteorder == "big"  # arrays are native order; the wire is little-endian
+
+
+def encode_hello(name):
+    payload = bytes([HELLO]) + name.encode("utf-8")
+    return FRAME.pack(len(payload)) + payload
+
+
+def encode_keys(keys):
+    """Frame (key id, ip, name) assignments."""
+    parts = [KEYS_HEADER.pack(KEYS, len(keys))]
+    for key_id, ip, name in keys:
+        ip_bytes, name_bytes = ip.encode("utf-8"), name.encode("utf-8")
+        parts.append(KEY_ENTRY.pack(key_id, len(ip_bytes), len(name_bytes)))
+        parts.append(ip_bytes)
+        parts.append(name_bytes)
+    payload = b"".join(parts)
+    return FRAME.pack(len(payload)) + payload
+
+
+def encode_results(key_ids, samples, burst, sent_at):
+    """Frame one batch: key_ids[n] has the burst round trips samples[n * burst:(n + 1) * burst]."""
+    ids = array("I", key_ids)
+    rtts = array("f", samples)
+    if SWAP:
+        ids.byteswap()
+        rtts.byteswap()
+    payload = RESULTS_HEADER.pack(RESULTS, sent_at, len(ids), burst) + ids.tobytes() + rtts.tobytes()
+    return FRAME.pack(len(payload)) + payload
+
+
+def decode_keys(payload):
+    """Return [(key id, ip, name)] from a KEYS payload."""
+    _, count = KEYS_HEADER.unpack_from(payload, 0)
+    offset = KEYS_HEADER.size
+    keys = []
+    for _ in range(count):
+        key_id, ip_length, name_length = KEY_ENTRY.unpack_from(payload, offset)
+        offset += KEY_ENTRY.size
+        ip = payload[offset:offset + ip_length].decode("utf-8")
+        offset += ip_length
+        keys.append((key_id, ip, payload[offset:offset + name_length].decode("utf-8")))
+        offset += name_length
+    return keys
+
+
+def decode_results(payload):
+    """Return (unix time sent, burst, key ids, flat RTTs) from a RESULTS payload."""
+    _, sent_at, count, burst = RESULTS_HEADER.unpack_from(payload, 0)
+    ids_at = RESULTS_HEADER.size
+    rtts_at = ids_at + 4 * count
+    if len(payload) != rtts_at + 4 * count * burst:
+        raise ValueError("truncated result batch")
+    ids = array("I")
+    ids.frombytes(payload[ids_at:rtts_at])
+    rtts = array("f")
+    rtts.frombytes(payload[rtts_at:])
+    if SWAP:
+        ids.byteswap()
+        rtts.byteswap()
+    return sent_at, burst, ids, rtts
+
+
+def parse_address(text, default_port=AGGREGATE_PORT):
+    """Split "host[:port]" (or "[v6]:port") into (host, port)."""
+    host, port = text, default_port
+    if text.startswith("["):
+        host, _, rest = text[1:].partition("]")
+        if rest.startswith(":"):
+            port = int(rest[1:])
+    elif text.count(":") == 1:
+        host, port = text.split(":")
+        port = int(port)
+    return host, port
+
+
+class AgentStreamer:
+    """Stream a monitor's probe results to an aggregator in batches.
+
+    submit() is called from the probe engine thread and only stores the
+    target's latest burst; a sender thread ships what was submitted every
+    flush_interval as one RESULTS frame per burst size, preceded by KEYS
+    frames for targets the connection has not named yet. While the
+    aggregator is unreachable results are coalesced per target, so memory
+    stays bounded, and the agent reconnects with exponential back-off.
+    """
+
+    def __init__(self, address, name, flush_interval=AGENT_FLUSH_INTERVAL):
+        self.address = address
+        self.name = name
+        self.flush_interval = flush_interval
+        self.sent = 0  # results delivered
+        self.connected = False
+        self._pending = {}  # ip -> (name, samples), latest per target
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="agent-streamer", daemon=True)
+
+    def submit(self, ip, name, samples):
+        with self._lock:
+            self._pending[ip] = (name, samples)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection(self.address, timeout=5)
+            except OSError as e:
+                print(f"Error connecting to aggregator {self.address[0]}:{self.address[1]}: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, AGENT_RECONNECT_MAX)
+                continue
+            delay = 1
+            self.connected = True
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.sendall(encode_hello(self.name))
+                keys = {}  # ip -> (key id, name) announced on this connection
+                while not self._stop.wait(self.flush_interval):
+                    self._flush(sock, keys)
+                self._flush(sock, keys)
+            except OSError as e:
+                print(f"Lost connection to aggregator {self.address[0]}:{self.address[1]}: {e}")
+            finally:
+                self.connected = False
+                sock.close()
+
+    def _flush(self, sock, keys):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        announce = []
+        batches = {}  # burst -> (key ids, flat samples)
+        for ip, (name, samples) in pending.items():
+            known = keys.get(ip)
+            if known is None or known[1] != name:
+                key_id = known[0] if known is not None else len(keys)
+                keys[ip] = (key_id, name)
+                announce.append((key_id, ip, name))
+            ids, flat = batches.setdefault(len(samples), ([], []))
+            ids.append(keys[ip][0])
+            flat.extend(float("nan") if rtt is None else rtt for rtt in samples)
+        frames = [encode_keys(announce)] if announce else []
+        now = time.time()
+        for burst, (ids, flat) in batches.items():
+            frames.append(encode_results(ids, flat, burst, now))
+        try:
+            sock.sendall(b"".join(frames))
+        except OSError:
+            with self._lock:
+                # Keep the unsent results unless newer ones arrived meanwhile
+                for ip, entry in pending.items():
+                    self._pending.setdefault(ip, entry)
+            raise
+        self.sent += len(pending)
+
+
+def start_agent(monitor, address, name):
+    """Stream monitor's results to the aggregator at address; returns the started AgentStreamer."""
+    streamer = AgentStreamer(address, name)
+    monitor.agent = streamer
+    streamer.start()
+    return streamer
+
+
+class AgentConnection:
+    """Receive buffer and key table of one connected agent."""
+
+    __slots__ = ("sock", "name", "buffer", "keys")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.name = None  # set by the agent's HELLO
+        self.buffer = bytearray()
+        self.keys = {}  # key id -> ip
+
+
+class AggregatorEngine:
+    """ProbeEngine stand-in that takes results from remote agents instead of probing.
+
+    One thread runs a selector over the listening socket and every agent
+    connection, decodes their frames and calls on_result(ip, samples) as a
+    ProbeEngine would, so the Monitor, its alerts and any front end work
+    unchanged. Targets an agent reports that the monitor does not know are
+    added through on_target(ip, name).
+
+    Agents are merged per target: a result is passed on when its agent
+    reached the target, or when no agent currently does, so a target is
+    only down once every agent reporting it has lost it. When some agents
+    lose a target that others still reach, on_partial(ip, agent names) is
+    called, and again with () once they agree again. on_agent(name,
+    connected) reports agents coming and going.
+    """
+
+    def __init__(self, on_result, address, on_target=None, on_partial=None, on_agent=None):
+        self.on_result = on_result
+        self.on_target = on_target
+        self.on_partial = on_partial
+        self.on_agent = on_agent
+        self.address = address
+        self.records = 0  # results received from agents
+        self.first_probe_at = None  # perf_counter() of the first result received
+        self.running = False
+        self.views = {}  # ip -> {agent name: responding in its latest result}
+        self.partial = {}  # ip -> names of the agents alone in losing it
+        self.agents = {}  # agent name -> AgentConnection
+        self._targets = set()
+        self._listener = None
+        self._selector = None
+        self._thread = None
+
+    def add(self, ip):
+        self._targets.add(ip)
+
+    def add_many(self, ips):
+        self._targets.update(ips)
+
+    def remove(self, ip):
+        self._targets.discard(ip)
+        self.views.pop(ip, None)
+        self.partial.pop(ip, None)
+
+    def set_interval(self, ip, interval):
+        pass  # agents schedule their own probes
+
+    def set_probe(self, ip, probe):
+        pass
+
+    def add_block(self, key, block, interval):
+        self._targets.add(key)
+
+    def sweep(self, key, block, on_done):
+        pass
+
+    def task_count(self):
+        return len(self._targets)
+
+    def start(self):
+        self._listener = socket.create_server(self.address)
+        self._listener.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self.running = True
+        self._thread = Thread(target=self._run, name="aggregator", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self._listener.getsockname()[1]
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+
+    def _run(self):
+        while self.running:
+            for key, _ in self._selector.select(0.2):
+                if key.fileobj is self._listener:
+                    self._accept()
+                else:
+                    self._read(key.data)
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        self._selector.register(sock, selectors.EVENT_READ, AgentConnection(sock))
+
+    def _read(self, conn):
+        try:
+            data = conn.sock.recv(1 << 20)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(conn)
+            return
+        buffer = conn.buffer
+        buffer += data
+        offset = 0
+        try:
+            while len(buffer) - offset >= FRAME.size:
+                (length,) = FRAME.unpack_from(buffer, offset)
+                if length > MAX_FRAME or length == 0:
+                    raise ValueError(f"bad frame length {length}")
+                end = offset + FRAME.size + length
+                if end > len(buffer):
+                    break
+                self._handle(conn, bytes(buffer[offset + FRAME.size:end]))
+                offset = end
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            print(f"Dropping agent {conn.name or conn.sock}: {e}")
+            self._drop(conn)
+            return
+        del buffer[:offset]
+
+    def _handle(self, conn, payload):
+        kind = payload[0]
+        if kind == RESULTS:
+            if conn.name is None:
+                raise ValueError("results before hello")
+            self._deliver(conn, *decode_results(payload))
+        elif kind == KEYS:
+            for key_id, ip, name in decode_keys(payload):
+                conn.keys[key_id] = ip
+                if ip not in self._targets and self.on_target is not None:
+                    self.on_target(ip, name)
+        elif kind == HELLO:
+            conn.name = payload[1:].decode("utf-8")
+            previous = self.agents.get(conn.name)
+            if previous is not None and previous is not conn:
+                self._drop(previous)  # the agent reconnected
+            self.agents[conn.name] = conn
+            if self.on_agent is not None:
+                self.on_agent(conn.name, True)
+        else:
+            raise ValueError(f"unknown frame type {kind}")
+
+    def _deliver(self, conn, sent_at, burst, ids, rtts):
+        if self.first_probe_at is None:
+            self.first_probe_at = time.perf_counter()
+        agent = conn.name
+        keys = conn.keys
+        views = self.views
+        limit = burst * CYCLE_LOSS_THRESHOLD
+        for n, key_id in enumerate(ids):
+            ip = keys.get(key_id)
+            if ip is None or ip not in self._targets:
+                continue
+            samples = tuple(None if rtt != rtt else rtt for rtt in rtts[n * burst:(n + 1) * burst])
+            responding = samples.count(None) <= limit
+            view = views.get(ip)
+            if view is None:
+                view = views[ip] = {}
+            view[agent] = responding
+            if responding or not any(view.values()):
+                self.on_result(ip, samples)
+            self._update_partial(ip, view)
+        self.records += len(ids)
+
+    def _update_partial(self, ip, view):
+        reached = sum(view.values())
+        lost = tuple(sorted(agent for agent, ok in view.items() if not ok)) if reached else ()
+        if lost != self.partial.get(ip, ()):
+            if lost:
+                self.partial[ip] = lost
+            else:
+                del self.partial[ip]
+            if self.on_partial is not None:
+                self.on_partial(ip, lost)
+
+    def _drop(self, conn):
+        try:
+            self._selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        conn.sock.close()
+        if conn.name is None or self.agents.get(conn.name) is not conn:
+            return
+        del self.agents[conn.name]
+        if self.on_agent is not None:
+            self.on_agent(conn.name, False)
+        for ip in conn.keys.values():
+            view = self.views.get(ip)
+            if view is not None and view.pop(conn.name, None) is not None:
+                self._update_partial(ip, view)
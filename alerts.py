@@ -0,0 +1,190 @@
+import os
+import platform
+import struct
+import subprocess
+import time
+from threading import Event, Thread
+
+ALERT_DEBOUNCE = 2.0  # Seconds of quiet before a batch of alerts is shown
+ALERT_MAX_DELAY = 10.0  # Show a batch after this long even if alerts keep arriving
+ALERT_MIN_GAP = 15.0  # Minimum seconds between two notifications
+ALERT_NAMES_SHOWN = 8  # Host names listed per line of a grouped notification
+
+# (WAVE format tag, bits per sample) -> aplay raw sample format
+APLAY_FORMATS = {(1, 8): "U8", (1, 16): "S16_LE", (1, 24): "S24_3LE", (1, 32): "S32_LE",
+                 (3, 32): "FLOAT_LE", (3, 64): "FLOAT64_LE"}
+
+
+class AlertDispatcher:
+    """Debounce, rate-limit and group up/down alerts into one notification.
+
+    submit() records an alert; poll() returns the text of the next
+    notification once the batch has been quiet for ALERT_DEBOUNCE (or has
+    waited ALERT_MAX_DELAY) and ALERT_MIN_GAP has passed since the last one.
+    Alerts are batched per target address, so hosts that share a name
+    stay apart; the name is only used in the text. A host that flaps back
+    to the state it had when the batch started is dropped from the batch
+    instead of being reported twice.
+    """
+
+    def __init__(self, debounce=ALERT_DEBOUNCE, max_delay=ALERT_MAX_DELAY, min_gap=ALERT_MIN_GAP):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.min_gap = min_gap
+        self._batch = {}  # ip -> [state before the batch, latest state, latest message, name]
+        self._first_at = None
+        self._last_at = None
+        self._shown_at = None
+        self.flapped = 0
+
+    def submit(self, kind, ip, name, message, now=None):
+        """Record an "up" or "down" alert for target ip, shown as name."""
+        now = time.monotonic() if now is None else now
+        entry = self._batch.get(ip)
+        if entry is None:
+            self._batch[ip] = ["down" if kind == "up" else "up", kind, message, name]
+        else:
+            entry[1], entry[2], entry[3] = kind, message, name
+        if self._first_at is None:
+            self._first_at = now
+        self._last_at = now
+
+    def poll(self, now=None):
+        """Return the next notification text if one is due, else None."""
+        if not self._batch:
+            return None
+        now = time.monotonic() if now is None else now
+        quiet = now - self._last_at >= self.debounce
+        overdue = now - self._first_at >= self.max_delay
+        if not (quiet or overdue):
+            return None
+        if self._shown_at is not None and now - self._shown_at < self.min_gap:
+            return None
+        changed = {ip: entry for ip, entry in self._batch.items() if entry[0] != entry[1]}
+        self.flapped += len(self._batch) - len(changed)
+        self._batch = {}
+        self._first_at = self._last_at = None
+        if not changed:
+            return None
+        self._shown_at = now
+        return self._summary(changed)
+
+    def _summary(self, changed):
+        if len(changed) == 1:
+            return next(iter(changed.values()))[2]
+        lines = []
+        for kind in ("down", "up"):
+            names = sorted(entry[3] for entry in changed.values() if entry[1] == kind)
+            if not names:
+                continue
+            shown = ", ".join(names[:ALERT_NAMES_SHOWN])
+            more = f" (+{len(names) - ALERT_NAMES_SHOWN} more)" if len(names) > ALERT_NAMES_SHOWN else ""
+            if len(names) == 1:
+                label = "1 host stopped responding" if kind == "down" else "1 host is responding"
+            else:
+                label = f"{len(names)} hosts " + ("stopped responding" if kind == "down" else "are responding")
+            lines.append(f"{label}: {shown}{more}")
+        return f"{time.strftime('%Y-%m-%d %H:%M:%S')}\n" + "\n".join(lines)
+
+
+def read_wav(path):
+    """Return (format tag, channels, rate, bits, sample data) from a WAV file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError(f"{path} is not a WAV file")
+    offset = 12
+    fmt = samples = None
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = data[offset + 8:offset + 8 + size]
+        if chunk_id == b"fmt ":
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+            if tag == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE keeps the real tag in the sub-format GUID
+                tag = struct.unpack_from("<H", body, 24)[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            samples = body
+        offset += 8 + size + (size & 1)
+    if fmt is None or samples is None:
+        raise ValueError(f"{path} has no fmt or data chunk")
+    return fmt + (samples,)
+
+
+class SoundPlayer:
+    """Play the notification sound from one worker thread.
+
+    The WAV file is decoded once. On Linux a single long-lived aplay process
+    is fed the raw samples through its stdin, and on Windows the file is
+    played from memory. play() only sets a flag, so any number of alerts
+    in a burst cost at most one playback.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.system = platform.system()
+        self._wanted = Event()
+        self._process = None
+        self._wav = None
+        self._samples = None
+        self._aplay_args = None
+        self._load()
+        Thread(target=self._run, name="sound-player", daemon=True).start()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"Sound file {self.path} not found")
+            return
+        try:
+            if self.system == "Windows":
+                with open(self.path, 'rb') as f:
+                    self._wav = f.read()
+            elif self.system == "Linux":
+                tag, channels, rate, bits, self._samples = read_wav(self.path)
+                sample_format = APLAY_FORMATS.get((tag, bits))
+                if sample_format is None:
+                    raise ValueError(f"unsupported WAV format {tag}/{bits} bits")
+                self._aplay_args = ["aplay", "-q", "-t", "raw", "-f", sample_format, "-c", str(channels),
+                                    "-r", str(rate)]
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error loading sound {self.path}: {e}")
+
+    def play(self):
+        """Request a playback; requests made while one is playing are merged."""
+        self._wanted.set()
+
+    def _run(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            try:
+                self._play_once()
+            except Exception as e:
+                print(f"Error playing sound: {e}")
+
+    def _play_once(self):
+        if self.system == "Windows":
+            import winsound
+            if self._wav is not None:
+                winsound.PlaySound(self._wav, winsound.SND_MEMORY)
+            else:
+                winsound.Beep(1000, 500)
+        elif self.system == "Darwin":  # macOS
+            if os.path.exists(self.path):
+                subprocess.run(["afplay", self.path], check=True, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+        elif self.system == "Linux":
+            if self._samples is None:
+                return
+            for _ in range(2):  # restart aplay once if it has gone away
+                if self._process is None or self._process.poll() is not None:
+                    self._process = subprocess.Popen(self._aplay_args, stdin=subprocess.PIPE,
+                                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    self._process.stdin.write(self._samples)
+                    self._process.stdin.flush()
+                    return
+                except (BrokenPipeError, OSError):
+                    self._process = None
+        else:
+            print(f"Sound playback not supported on {self.system}")
@@ -0,0 +1,226 @@
+"""Benchmark the monitor against a simulated network.
+
+Runs the real Monitor, ProbeEngine and Scheduler on a SimulatedProber for
+each target count, one fresh process per size, and reports probes/sec,
+scheduler lateness, CPU, RSS and queue-to-screen latency. Needs no network
+access or privileges.
+
+With --agents N it instead benchmarks aggregation: N agent processes
+stream result batches for every target over localhost as fast as the
+aggregator takes them, and records/sec, CPU and RSS of the aggregator are
+reported, along with the wire format's own encode and decode rates.
+
+    python3 bench.py [--sizes 100 1000 10000] [--duration 20] [--json]
+    python3 bench.py --agents 3 --sizes 50000 [--duration 10]
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+from core import PING_INTERVAL, PROBE_BURST, Monitor
+from history import percentile
+from simulated import simulated_network
+
+UI_TICK = 0.1  # Seconds between simulated GUI queue drains, as in gui.process_queues
+
+
+class StampedQueue(queue.Queue):
+    """Queue that records when each item was put, to time queue-to-screen latency."""
+
+    def _put(self, item):
+        super()._put((time.perf_counter(), item))
+
+
+def rss_bytes():
+    """Return the current resident set size, or the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_one(count, duration, warmup, seed):
+    """Run count simulated targets for duration seconds and return the measurements."""
+    prober, addresses = simulated_network(count, seed=seed)
+    monitor = Monitor([(ip, f"sim-{n}", {}) for n, ip in enumerate(addresses)], popups=False,
+                      history_file=None, log_file=None, prober=prober, snapshot_file=None)
+    monitor.status_queue = StampedQueue()
+    monitor.start()
+    latencies = []
+    pending = OrderedDict()
+    measuring = False
+    started = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if not measuring and now - started >= warmup:
+            measuring = True
+            monitor.engine.scheduler.lateness_summary()
+            sent_before = prober.sent
+            cpu_before = time.process_time()
+            measured_from = now
+            latencies.clear()
+        if now - started >= warmup + duration:
+            break
+        # Drain and coalesce like the GUI's status pipeline, timing each item
+        drained_at = time.perf_counter()
+        try:
+            while True:
+                stamp, (ip, ok, rtt) = monitor.status_queue.get_nowait()
+                latencies.append(drained_at - stamp)
+                pending[ip] = (ok, rtt)
+        except queue.Empty:
+            pass
+        pending.clear()
+        time.sleep(UI_TICK)
+    elapsed = time.monotonic() - measured_from
+    fired, mean_late, max_late = monitor.engine.scheduler.lateness_summary()
+    result = {
+        "targets": count,
+        "probes_per_sec": (prober.sent - sent_before) / elapsed,
+        "expected_per_sec": count * PROBE_BURST / PING_INTERVAL,
+        "late_mean_ms": mean_late * 1000,
+        "late_max_ms": max_late * 1000,
+        "cpu_percent": (time.process_time() - cpu_before) / elapsed * 100,
+        "rss_mb": rss_bytes() / (1 << 20),
+        "screen_p50_ms": (percentile(sorted(latencies), 0.5) or 0.0) * 1000,
+        "screen_p99_ms": (percentile(sorted(latencies), 0.99) or 0.0) * 1000,
+    }
+    monitor.stop()
+    return result
+
+
+def agent_batch(count, burst, seed):
+    """Return one RESULTS frame with random round trips for key ids 0..count-1."""
+    from agents import encode_results
+    rng = random.Random(seed)
+    samples = [rng.lognormvariate(-3.9, 0.5) if rng.random() > 0.01 else float("nan") for _ in range(count * burst)]
+    return encode_results(range(count), samples, burst, time.time())
+
+
+def feed_agent(port, name, count, duration, seed):
+    """Agent process: announce count targets, then send result batches until duration is up."""
+    from agents import encode_hello, encode_keys
+    sock = socket.create_connection(("127.0.0.1", port))
+    _, addresses = simulated_network(count)
+    sock.sendall(encode_hello(name) + encode_keys([(n, ip, f"sim-{n}") for n, ip in enumerate(addresses)]))
+    batch = agent_batch(count, PROBE_BURST, seed)
+    stop_at = time.monotonic() + duration
+    while time.monotonic() < stop_at:
+        sock.sendall(batch)
+    sock.close()
+
+
+def run_aggregate(count, agents, duration):
+    """Aggregate count targets reported by agents local processes and return the measurements."""
+    from agents import decode_results
+
+    monitor = Monitor([], popups=False, history_file=None, log_file=None, snapshot_file=None,
+                      aggregate=("127.0.0.1", 0))
+    monitor.start()
+    engine = monitor.engine
+    batch = agent_batch(count, PROBE_BURST, 0)
+    started = time.perf_counter()
+    decode_results(batch[4:])
+    decode_rate = count / (time.perf_counter() - started)
+    started = time.perf_counter()
+    agent_batch(count, PROBE_BURST, 0)
+    encode_rate = count / (time.perf_counter() - started)  # includes drawing the random samples
+    feeders = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--feed", str(engine.port), str(n),
+                                 "--sizes", str(count), "--duration", str(duration + 2)]) for n in range(agents)]
+    while len(engine.agents) < agents or len(monitor) < count:
+        time.sleep(0.05)
+    records_before = engine.records
+    cpu_before = time.process_time()
+    measured_from = time.monotonic()
+    while time.monotonic() - measured_from < duration:
+        # Drain like a front end so the queues do not grow without bound
+        for q in (monitor.status_queue, monitor.log_queue):
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+        time.sleep(UI_TICK)
+    elapsed = time.monotonic() - measured_from
+    result = {
+        "agents": agents,
+        "targets": count,
+        "records_per_sec": (engine.records - records_before) / elapsed,
+        "cpu_percent": (time.process_time() - cpu_before) / elapsed * 100,
+        "rss_mb": rss_bytes() / (1 << 20),
+        "encode_per_sec": encode_rate,
+        "decode_per_sec": decode_rate,
+    }
+    for feeder in feeders:
+        feeder.kill()
+    monitor.stop()
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the monitor on a simulated network.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="target counts to benchmark (default: 100 1000 10000)")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per size (default: 20)")
+    parser.add_argument("--warmup", type=float, default=PING_INTERVAL,
+                        help=f"seconds before measuring starts (default: {PING_INTERVAL})")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the simulated network")
+    parser.add_argument("--agents", type=int, default=0,
+                        help="benchmark an aggregator fed by this many local agent processes instead")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per size")
+    parser.add_argument("--feed", nargs=2, metavar=("PORT", "NAME"), help=argparse.SUPPRESS)  # agent feeder mode
+    parser.add_argument("--one", action="store_true", help=argparse.SUPPRESS)  # worker mode: one size, JSON out
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.feed:
+        feed_agent(int(args.feed[0]), args.feed[1], args.sizes[0], args.duration, args.seed)
+        return
+    if args.agents:
+        if not args.json:
+            print(f"{'agents':>6} {'targets':>8} {'records/s':>10} {'cpu %':>6} {'rss MB':>7} "
+                  f"{'encode/s':>10} {'decode/s':>10}")
+        for count in args.sizes:
+            result = run_aggregate(count, args.agents, args.duration)
+            if args.json:
+                print(json.dumps(result), flush=True)
+            else:
+                print(f"{result['agents']:>6} {result['targets']:>8} {result['records_per_sec']:>10.0f} "
+                      f"{result['cpu_percent']:>6.1f} {result['rss_mb']:>7.1f} "
+                      f"{result['encode_per_sec']:>10.0f} {result['decode_per_sec']:>10.0f}", flush=True)
+        return
+    if args.one:
+        print(json.dumps(run_one(args.sizes[0], args.duration, args.warmup, args.seed)))
+        return
+    if not args.json:
+        print(f"{'targets':>8} {'probes/s':>9} {'expected':>9} {'late avg':>9} {'late max':>9} "
+              f"{'cpu %':>6} {'rss MB':>7} {'screen p50':>11} {'screen p99':>11}")
+    for count in args.sizes:
+        # A fresh interpreter per size keeps CPU and RSS figures independent
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--one", "--sizes", str(count),
+                                 "--duration", str(args.duration), "--warmup", str(args.warmup),
+                                 "--seed", str(args.seed)], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if args.json:
+            print(json.dumps(result), flush=True)
+        else:
+            print(f"{result['targets']:>8} {result['probes_per_sec']:>9.1f} {result['expected_per_sec']:>9.1f} "
+                  f"{result['late_mean_ms']:>7.2f}ms {result['late_max_ms']:>7.2f}ms "
+                  f"{result['cpu_percent']:>6.1f} {result['rss_mb']:>7.1f} "
+                  f"{result['screen_p50_ms']:>9.2f}ms {result['screen_p99_ms']:>9.2f}ms", flush=True)
+
+
+if __name__ == "__main__":
+    main()
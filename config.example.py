@@ -2,3 +2,9 @@
 IP_LIST_FILE = "ip_list.txt"
 NOTIFICATION_SOUND = "notification.wav"
 
+# HISTORY_FILE = "rtt_history.seg"  # optional memory-mapped RTT history
+# LOG_FILE = "pinger.log"  # JSON-lines event log, rotated by size
+# SNAPSHOT_FILE = "pinger.snapshot"  # state saved on exit and every minute for warm restarts
+# PROBE_BURST = 3  # echo requests per target per cycle; loss and jitter come from these
+# WORKERS = 4  # probe worker processes for very large target lists
+# METRICS_PORT = 9374  # serve Prometheus metrics at http://127.0.0.1:9374/metrics
@@ -0,0 +1,851 @@
+import os
+import queue
+import re
+import socket
+import struct
+import time
+from threading import Event, Lock, Thread
+
+try:
+    import config  # optional: copy config.example.py → config.py to override defaults
+except ImportError:
+    config = None
+
+# Get absolute path to the directory where this script lives
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Constants
+PING_INTERVAL = 5  # Seconds between pings
+PING_TIMEOUT = 2  # Seconds to wait for an echo reply
+CONFIRM_INTERVAL = 1  # Seconds between probes while confirming a missed reply
+DOWN_AFTER_MISSES = 3  # Consecutive missed replies before a host is reported down
+BACKOFF_MAX_INTERVAL = 300  # Longest period a dead host's probes back off to
+PROBE_RATE_LIMIT = 2000  # Most probe bursts sent per second across all targets
+CYCLE_LOSS_THRESHOLD = 0.5  # A cycle losing more than this fraction of its burst counts as a miss
+EWMA_ALPHA = 0.125  # Weight of the newest sample in the smoothed RTT and loss
+JITTER_GAIN = 1 / 16  # RFC 3550 interarrival jitter smoothing
+SWEEP_INTERVAL = 60  # Seconds between sweeps of a CIDR block or address range
+RELOAD_INTERVAL = 2  # Seconds between checks of the target list file for changes
+SNAPSHOT_INTERVAL = 60  # Seconds between periodic state snapshots
+DEPENDENT_INTERVAL_FACTOR = 6  # Dependents of a down parent are probed this many times less often
+HISTORY_SAMPLES = 720  # RTT samples kept in memory per target (an hour at PING_INTERVAL with no burst)
+# Notification sound file in the same folder
+SOUND_FILE = os.path.join(SCRIPT_DIR, getattr(config, "NOTIFICATION_SOUND", "notification.wav"))
+IP_FILE = os.path.join(SCRIPT_DIR, getattr(config, "IP_LIST_FILE", "ip_list.txt"))  # File to store IPs and names
+HISTORY_FILE = getattr(config, "HISTORY_FILE", None)  # Optional memory-mapped RTT segment file
+LOG_FILE = os.path.join(SCRIPT_DIR, getattr(config, "LOG_FILE", "pinger.log"))  # JSON-lines event log
+SNAPSHOT_FILE = os.path.join(SCRIPT_DIR, getattr(config, "SNAPSHOT_FILE", "pinger.snapshot"))  # Warm-restart state
+METRICS_PORT = getattr(config, "METRICS_PORT", None)  # Optional Prometheus exporter port
+WORKERS = getattr(config, "WORKERS", 1)  # Probe worker processes; 1 probes in-process
+PROBE_BURST = getattr(config, "PROBE_BURST", 3)  # Echo requests sent back to back per target per cycle
+# Defaults of optional features, kept here so parsing options does not import them
+METRICS_ADDRESS = "127.0.0.1"  # Interface the Prometheus exporter listens on by default
+AGGREGATE_PORT = 9375  # Port an aggregator listens on for agents by default
+AGGREGATE_ADDRESS = "127.0.0.1"  # Interface it listens on; agents on other hosts need 0.0.0.0
+STATS_INTERVAL = 30  # Seconds between stats dumps of headless --stats
+
+DEFAULT_IPS = [("8.8.8.8", "Google DNS", {}), ("1.1.1.1", "Cloudflare DNS", {}), ("192.168.1.1", "Router", {})]
+IP_PATTERN = re.compile(
+    r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$")
+# RFC 1123 host name: dot-separated labels of letters, digits and inner hyphens
+HOSTNAME_PATTERN = re.compile(
+    r"^(?=.{1,253}\.?$)(?!-)[A-Za-z0-9-]{1,63}(?<!-)(?:\.(?!-)[A-Za-z0-9-]{1,63}(?<!-))*\.?$")
+
+
+class TargetBlock:
+    """An inclusive IPv4 address range that expands lazily when iterated."""
+
+    __slots__ = ("first", "last")
+
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+
+    def __len__(self):
+        return self.last - self.first + 1
+
+    def __iter__(self):
+        pack = struct.Struct("!I").pack
+        for n in range(self.first, self.last + 1):
+            yield socket.inet_ntoa(pack(n))
+
+    def __contains__(self, ip):
+        try:
+            n = struct.unpack("!I", socket.inet_aton(ip))[0]
+        except OSError:
+            return False
+        return self.first <= n <= self.last
+
+
+def ip_to_int(ip):
+    """Convert a dotted IPv4 address to an integer."""
+    return struct.unpack("!I", socket.inet_aton(ip))[0]
+
+
+def parse_block(text):
+    """Parse "a.b.c.d/nn", "a.b.c.d-a.b.c.e" or "a.b.c.d-e" into a TargetBlock, or return None.
+
+    CIDR blocks of /30 and wider exclude their network and broadcast addresses.
+    """
+    if '/' in text:
+        address, _, prefix = text.partition('/')
+        if not validate_ip(address) or not prefix.isdigit() or not 0 <= int(prefix) <= 32:
+            return None
+        prefix = int(prefix)
+        mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+        first = ip_to_int(address) & mask
+        last = first | (~mask & 0xFFFFFFFF)
+        if prefix < 31:
+            first, last = first + 1, last - 1
+        return TargetBlock(first, last)
+    if '-' in text:
+        start, _, end = text.partition('-')
+        if not validate_ip(start):
+            return None
+        if end.isdigit() and int(end) <= 255:
+            end = start.rsplit('.', 1)[0] + '.' + end
+        if not validate_ip(end) or ip_to_int(end) < ip_to_int(start):
+            return None
+        return TargetBlock(ip_to_int(start), ip_to_int(end))
+    return None
+
+
+def parse_ip_line(line):
+    """Split an ip_list.txt line into (ip, name, options).
+
+    Lines are "ip,name" optionally followed by ",key=value" fields, e.g.
+    "192.168.0.5,proxmox,parent=192.168.0.1". The ip may also be a CIDR
+    block or address range, which is swept as one target.
+    """
+    parts = line.strip().split(',')
+    options = {}
+    while len(parts) > 2 and '=' in parts[-1]:
+        key, _, value = parts.pop().partition('=')
+        options[key.strip()] = value.strip()
+    ip = parts[0].strip()
+    name = ','.join(parts[1:]).strip() or "N/A"
+    return ip, name, dict(reversed(options.items())) if options else options
+
+
+def load_ip_list(path=IP_FILE, default=DEFAULT_IPS):
+    """Load (ip, name, options) entries from file.
+
+    Returns default when the file is missing, unreadable or holds no valid
+    target. Reloads pass default=None, so a list caught half-written never
+    replaces the running targets with the defaults.
+    """
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                targets = []
+                for line in f:
+                    ip, name, options = parse_ip_line(line)
+                    if validate_target(ip):
+                        targets.append((ip, name, options))
+                return targets if targets else default
+        except Exception as e:
+            print(f"Error loading IP list: {e}")
+    return default
+
+
+def save_ip_list(targets, path=IP_FILE):
+    """Save (ip, name, options) entries to file."""
+    try:
+        with open(path, 'w') as f:
+            for ip, name, options in targets:
+                f.write(f"{ip},{name}" + "".join(f",{key}={value}" for key, value in options.items()) + "\n")
+    except Exception as e:
+        print(f"Error saving IP list: {e}")
+
+
+def validate_ip(ip):
+    """Validate IP address format."""
+    return bool(IP_PATTERN.match(ip))
+
+
+def validate_ipv6(ip):
+    """Validate an IPv6 address."""
+    try:
+        socket.inet_pton(socket.AF_INET6, ip)
+        return True
+    except OSError:
+        return False
+
+
+def validate_hostname(name):
+    """Validate a host name.
+
+    The last label must contain a letter, as top-level domains do, so
+    malformed addresses and ranges such as "10.0.0.256" or "10.0.0.5-3"
+    are rejected rather than sent to the resolver.
+    """
+    return bool(HOSTNAME_PATTERN.match(name)) and not name.rstrip('.').rsplit('.', 1)[-1].replace('-', '').isdigit()
+
+
+def is_hostname(target):
+    """Tell a host name from an address among single targets that already passed validate_target()."""
+    return ':' not in target and not target.rpartition('.')[2].replace('-', '').isdigit()
+
+
+def parse_probe(text):
+    """Parse a probe= option: "icmp", "tcp:PORT" or "udp:PORT".
+
+    Returns None for ICMP and (protocol, port) otherwise; raises ValueError
+    when the option is malformed.
+    """
+    protocol, _, port = text.strip().lower().partition(':')
+    if protocol == "icmp" and not port:
+        return None
+    if protocol in ("tcp", "udp") and port.isdigit() and 0 < int(port) < 65536:
+        return protocol, int(port)
+    raise ValueError(f"expected icmp, tcp:PORT or udp:PORT, not {text!r}")
+
+
+def validate_target(target):
+    """Validate an IPv4/IPv6 address, host name, CIDR block or address range."""
+    return (validate_ip(target) or validate_ipv6(target) or parse_block(target) is not None
+            or validate_hostname(target))
+
+
+class IpListWatcher:
+    """Notice edits to the target list file by polling its mtime and size.
+
+    A change is only reported once the file has looked the same on two
+    polls in a row, so a list that is still being written is not loaded.
+    """
+
+    def __init__(self, path=IP_FILE):
+        self.path = path
+        self._stamp = self._read_stamp()
+        self._pending = None  # stamp seen on the last poll, not yet settled
+
+    def _read_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def changed(self):
+        """Return True once after each change to an existing file, when it has settled."""
+        stamp = self._read_stamp()
+        if stamp == self._stamp:
+            self._pending = None
+            return False
+        if stamp != self._pending:
+            self._pending = stamp
+            return False
+        self._stamp = stamp
+        self._pending = None
+        return stamp is not None
+
+
+class TargetState:
+    """Everything the monitor tracks for one target, in one slotted record.
+
+    Records are created and dropped under Monitor.lock, but their probe
+    state is only written by the thread delivering results, so updates
+    need no lock.
+    """
+
+    __slots__ = ("ip", "name", "options", "parent", "block", "probe", "members", "up", "last_seen", "last_rtt",
+                 "updated_at", "changed_at", "misses", "interval", "probes", "lost", "received", "rtt_sum", "ewma",
+                 "jitter", "loss_ewma", "prev_rtt", "history")
+
+    def __init__(self, ip, name, options):
+        self.ip = ip
+        self.name = name
+        self.options = options
+        self.parent = None  # ip of the gateway this target sits behind
+        self.block = None  # TargetBlock for a CIDR/range target, swept as a whole
+        self.probe = None  # ("tcp" | "udp", port) from the probe= option; None probes with ICMP
+        self.members = None  # addresses that answered the block's last sweep
+        self.up = False  # last reported state: True once "is responding" was alerted
+        self.last_seen = None  # unix time of the latest reply
+        self.changed_at = None  # unix time of the latest up/down transition
+        self.last_rtt = None  # mean of the latest burst's replies in seconds, None when all were lost
+        self.updated_at = None  # unix time of the latest result
+        self.misses = 0  # consecutive missed cycles
+        self.interval = None  # probe period requested from the engine (None = default)
+        # Streaming estimators, O(1) per sample
+        self.probes = 0  # echo requests with a result
+        self.lost = 0
+        self.received = 0
+        self.rtt_sum = 0.0
+        self.ewma = None  # smoothed RTT
+        self.jitter = 0.0  # RFC 3550 interarrival jitter of consecutive replies
+        self.loss_ewma = 0.0  # smoothed loss fraction
+        self.prev_rtt = None
+        self.history = None  # RingBuffer of recent RTTs, created on the first result
+
+    def display_name(self):
+        """Return the name shown for this target in messages."""
+        return self.name if self.name != "N/A" else f"IP {self.ip}"
+
+    def observe(self, response_time):
+        """Feed one echo request's round trip (None when lost) to the estimators."""
+        self.probes += 1
+        if response_time is None:
+            self.lost += 1
+            self.loss_ewma += (1.0 - self.loss_ewma) * EWMA_ALPHA
+            return
+        self.loss_ewma -= self.loss_ewma * EWMA_ALPHA
+        self.received += 1
+        self.rtt_sum += response_time
+        self.ewma = response_time if self.ewma is None else self.ewma + (response_time - self.ewma) * EWMA_ALPHA
+        if self.prev_rtt is not None:
+            # RFC 3550: RTT differences stand in for transit-time differences
+            self.jitter += (abs(response_time - self.prev_rtt) - self.jitter) * JITTER_GAIN
+        self.prev_rtt = response_time
+
+    def link_stats(self):
+        """Return loss (overall and smoothed), mean RTT, smoothed RTT and jitter."""
+        return {
+            "probes": self.probes,
+            "loss": self.lost / self.probes if self.probes else 0.0,
+            "loss_ewma": self.loss_ewma,
+            "mean": self.rtt_sum / self.received if self.received else None,
+            "ewma": self.ewma,
+            "jitter": self.jitter,
+        }
+
+
+class Alert:
+    """An up, down, sweep or partial-outage notice; its text is only built when it is shown.
+
+    str(alert) formats the message, so log consumers can print alerts as
+    they are, while the probe thread only stores a few references.
+    """
+
+    __slots__ = ("kind", "ip", "name", "at", "detail")
+
+    def __init__(self, kind, ip, name, at, detail=None):
+        self.kind = kind  # "up", "down", "sweep", "partial" or "agent"
+        self.ip = ip
+        self.name = name
+        self.at = at  # unix time
+        # Dependents affected (down), (responding, total, appeared, vanished) (sweep)
+        # the agents alone in losing the target, () once they agree again (partial)
+        # or whether the agent connected (agent)
+        self.detail = detail
+
+    def display_name(self):
+        return self.name if self.name != "N/A" else f"IP {self.ip}"
+
+    def __str__(self):
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.at))
+        if self.kind == "up":
+            return f"{stamp}: {self.display_name()} is responding"
+        if self.kind == "sweep":
+            responding, total, appeared, vanished = self.detail
+            return (f"{stamp}: {self.display_name()} {responding}/{total} responding "
+                    f"({appeared} appeared, {vanished} vanished)")
+        if self.kind == "agent":
+            return f"{stamp}: Agent {self.name} {'connected' if self.detail else 'disconnected'}"
+        if self.kind == "partial":
+            if not self.detail:
+                return f"{stamp}: agents agree on {self.display_name()} again"
+            return (f"{stamp}: {self.display_name()} is down from agent{'s' if len(self.detail) != 1 else ''} "
+                    f"{', '.join(self.detail)} only")
+        message = f"{stamp}: {self.display_name()} stopped responding"
+        if self.detail:
+            message += f" (outage: {self.detail} dependent host{'s' if self.detail != 1 else ''} affected)"
+        return message
+
+
+class Monitor:
+    """Target table, probe engine and up/down alert logic, with no GUI attached.
+
+    Front ends consume status_queue, log_queue and popup_queue; status
+    entries are (ip, is_responding, response_time) tuples, and log and
+    popup entries are Alert records that format themselves with str().
+
+    Every cycle sends a burst of echo requests per target. A cycle that
+    loses more than CYCLE_LOSS_THRESHOLD of its burst is a miss; otherwise
+    the target is responding with the mean RTT of the replies.
+
+    Per-target state lives in one TargetState record per target, looked
+    up by ip in table. Results are applied to the record without taking
+    the lock; the lock only guards adding and removing records.
+
+    Probe periods adapt per target: after a missed reply the target is
+    re-probed every CONFIRM_INTERVAL until it answers or misses
+    DOWN_AFTER_MISSES in a row and is reported down, and a dead target
+    then backs off exponentially up to BACKOFF_MAX_INTERVAL.
+
+    A target whose options name a parent (its gateway) is a dependent of
+    it. While a parent is reported down, its dependents are probed less
+    often and their own down alerts are folded into the parent's outage
+    alert; a parent that merely misses a reply, or never answered at all,
+    hides nothing.
+
+    With aggregate=(address, port) the monitor probes nothing itself: it
+    listens for agents (other monitors started with agents.start_agent())
+    and merges their results, adding the targets they report and noting
+    targets that only some agents can reach in partial.
+
+    With a snapshot file, the target table and recent history are saved
+    every SNAPSHOT_INTERVAL and on stop, and restored on construction, so
+    a restart carries on from the last known up/down state instead of
+    announcing every live host again.
+    """
+
+    def __init__(self, targets, popups=True, history_file=HISTORY_FILE, log_file=LOG_FILE, prober=None,
+                 workers=WORKERS, burst=PROBE_BURST, snapshot_file=SNAPSHOT_FILE, aggregate=None):
+        self.table = {}  # ip -> TargetState
+        self.children = {}  # parent ip -> set of dependent ips
+        self.failing = set()  # targets currently reported down; their dependents are behind an outage
+        self.lock = Lock()
+        for ip, name, options in targets:
+            self._set_target(ip, name, options)
+        self.popups = popups
+        self.popup_queue = queue.Queue()
+        self.status_queue = queue.Queue()
+        self.log_queue = queue.Queue()
+        # Optional on-disk RTT store, next to the in-memory ring buffers
+        self.store = None
+        if history_file:
+            from history import SegmentStore
+            self.store = SegmentStore(history_file)
+        # Structured event log, written off-thread
+        self.events = None
+        if log_file:
+            from event_log import EventLog
+            self.events = EventLog(log_file)
+        # Host name targets resolve through a shared, TTL-aware cache
+        self.resolver = None
+        # Optional exporter histograms, attached by metrics.start_exporter()
+        self.metrics = None
+        # Optional result stream to an aggregator, attached by agents.start_agent()
+        self.agent = None
+        self.aggregate = aggregate  # (address, port) to take agents' results on instead of probing
+        self.partial = {}  # ip -> agents alone in losing it, when aggregating
+        self.agent_targets = set()  # ips added because an agent reported them, not from the target list
+        # Hot-path counters for the stats pane and --stats
+        from stats import Stats
+        self.stats = Stats()
+        self.prober = prober  # probe backend; None for real ICMP
+        self.workers = workers  # > 1 shards single targets over worker processes
+        self.burst = burst  # echo requests per target per cycle
+        self.engine = None
+        # Warm restart: state saved by the previous run, if any
+        self.snapshot_file = snapshot_file
+        self.restored = None  # (targets restored, seconds taken, unix time saved) after a warm start
+        self._snapshot_stop = Event()
+        if snapshot_file:
+            self._restore()
+
+    def start(self):
+        """Create the probe engine and start probing every known target."""
+        from probe_engine import ProbeEngine
+        from resolver import ResolverCache
+
+        self.resolver = ResolverCache()
+        if not self.aggregate:
+            # Only names need a lookup; addresses are served by lookup() itself on their first probe
+            self.resolver.prefetch(state.ip for state in self.table.values()
+                                   if state.block is None and is_hostname(state.ip))
+        if self.aggregate:
+            from agents import AggregatorEngine
+            self.engine = AggregatorEngine(self.handle_result, self.aggregate, on_target=self.handle_agent_target,
+                                           on_partial=self.handle_partial, on_agent=self.handle_agent)
+        elif self.workers > 1:
+            from shards import ShardedEngine
+            self.engine = ShardedEngine(self.handle_result, self.workers, 2 * len(self.table),
+                                        interval=PING_INTERVAL, timeout=PING_TIMEOUT, on_sweep=self.handle_sweep,
+                                        resolve=self.resolver.lookup, max_rate=PROBE_RATE_LIMIT, burst=self.burst)
+        else:
+            self.engine = ProbeEngine(self.handle_result, interval=PING_INTERVAL, timeout=PING_TIMEOUT,
+                                      on_sweep=self.handle_sweep, resolve=self.resolver.lookup,
+                                      max_rate=PROBE_RATE_LIMIT, prober=self.prober, burst=self.burst)
+        self._probe(list(self.table))
+        for state in self.table.values():
+            if state.misses or (state.parent is not None and self.behind_outage(state.ip) is not None):
+                self._adapt_interval(state)  # restored hosts keep their confirm, back-off or dependent period
+        self.engine.start()
+        self._event("start", targets=len(self.table))
+        if self.snapshot_file:
+            Thread(target=self._snapshot_loop, name="snapshot", daemon=True).start()
+
+    def stop(self):
+        """Stop the probe engine and save a final snapshot."""
+        if self.engine is not None:
+            self.engine.stop()
+        self._snapshot_stop.set()
+        if self.snapshot_file:
+            self.save_snapshot()
+        if self.store is not None:
+            self.store.close()
+        if self.events is not None:
+            self._event("stop")
+            self.events.close()
+
+    def save_snapshot(self):
+        """Write the target table and recent history to the snapshot file."""
+        from snapshot import save_snapshot
+        try:
+            save_snapshot(self, self.snapshot_file)
+        except OSError as e:
+            print(f"Error saving snapshot {self.snapshot_file}: {e}")
+
+    def _snapshot_loop(self):
+        while not self._snapshot_stop.wait(SNAPSHOT_INTERVAL):
+            self.save_snapshot()
+
+    def _restore(self):
+        from snapshot import load_snapshot
+        started = time.perf_counter()
+        try:
+            loaded = load_snapshot(self, self.snapshot_file)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error loading snapshot {self.snapshot_file}: {e}")
+            return
+        if loaded is None:
+            return
+        restored, saved_at = loaded
+        self.restored = (restored, time.perf_counter() - started, saved_at)
+        # Show the last known state right away rather than "Unknown" until the first probe, and
+        # keep hosts that were reported down as outages so their dependents stay quiet
+        for state in self.table.values():
+            if state.updated_at is not None:
+                self.status_queue.put((state.ip, state.up, state.last_rtt or 0))
+            if not state.up and state.changed_at is not None:
+                self.failing.add(state.ip)
+        self._event("restore", targets=restored, saved_at=round(saved_at, 3))
+
+    def __contains__(self, ip):
+        return ip in self.table
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, ip):
+        """Return ip's TargetState, or None."""
+        return self.table.get(ip)
+
+    def targets(self):
+        """Return (ip, name, options) for every target, e.g. for save_ip_list."""
+        return [(state.ip, state.name, state.options) for state in self.table.values()]
+
+    def add(self, ip, name="N/A", options=None):
+        """Add a target and start probing it."""
+        with self.lock:
+            state = self._set_target(ip, name, options or {})
+        if self.engine is not None:
+            if state.block is None and not self.aggregate and is_hostname(ip):
+                self.resolver.prefetch([ip])
+            self._probe([ip])
+
+    def remove(self, ip):
+        """Stop probing a target and drop it."""
+        if self.engine is not None:
+            self.engine.remove(ip)
+            self.resolver.forget(ip)
+        if self.metrics is not None:
+            self.metrics.forget(ip)
+        self.forget(ip)
+
+    def reload(self, targets):
+        """Apply a freshly loaded target list as a diff against the running set.
+
+        Only added and removed targets are started or stopped; targets that
+        stay keep their schedule, state and history, and only have their
+        name and options updated. Returns (added, removed, updated) ip lists.
+        """
+        wanted = {ip: (name, options) for ip, name, options in targets}
+        table = self.table
+        # Targets agents reported are not in the list; they stay until removed by hand
+        removed = [ip for ip in table if ip not in wanted and ip not in self.agent_targets]
+        added = [ip for ip in wanted if ip not in table]
+        updated = [ip for ip in wanted if ip in table and (table[ip].name, table[ip].options) != wanted[ip]]
+        for ip in removed:
+            self.remove(ip)
+        with self.lock:
+            for ip in updated:
+                probe = table[ip].probe
+                self._set_target(ip, *wanted[ip])
+                if self.engine is not None and table[ip].probe != probe and table[ip].block is None:
+                    self.engine.set_probe(ip, table[ip].probe)
+            for ip in added:
+                self._set_target(ip, *wanted[ip])
+        if self.engine is not None and added:
+            if not self.aggregate:
+                self.resolver.prefetch(ip for ip in added if table[ip].block is None and is_hostname(ip))
+            self._probe(added)
+        if added or removed or updated:
+            self._event("reload", added=len(added), removed=len(removed), updated=len(updated))
+        return added, removed, updated
+
+    def rename(self, old_ip, new_ip, name):
+        """Stop probing a target's old address and start probing the new one under name.
+
+        When only the name changes the record is updated in place, keeping
+        its probes, counters and history.
+        """
+        state = self.table.get(old_ip)
+        options = state.options if state is not None else {}
+        if new_ip == old_ip and state is not None:
+            with self.lock:
+                self._set_target(old_ip, name, options)
+            return
+        self.remove(old_ip)
+        self.add(new_ip, name, options)
+
+    def task_count(self):
+        """Return the number of live probe tasks; more than len(self) means probes leaked."""
+        return self.engine.task_count() if self.engine is not None else 0
+
+    def forget(self, ip):
+        """Drop a target's record and dependency links; its probes keep running, see remove()."""
+        with self.lock:
+            state = self.table.pop(ip, None)
+            if state is None:
+                return
+            self.failing.discard(ip)
+            self.partial.pop(ip, None)
+            self.agent_targets.discard(ip)
+            self._unlink_parent(state)
+
+    def _probe(self, ips):
+        table = self.table
+        singles = [ip for ip in ips if table[ip].block is None]
+        for ip in singles:
+            if table[ip].probe is not None:
+                self.engine.set_probe(ip, table[ip].probe)
+        if singles:
+            self.engine.add_many(singles)
+        for ip in ips:
+            if table[ip].block is not None:
+                self.engine.add_block(ip, table[ip].block, SWEEP_INTERVAL)
+
+    def _set_target(self, ip, name, options):
+        # Create ip's record, or update the name, options and parent of an existing one
+        state = self.table.get(ip)
+        if state is None:
+            state = TargetState(ip, name, options)
+            state.block = parse_block(ip)  # None for an address or name, without another regex match
+            self.table[ip] = state
+        else:
+            state.name = name
+            state.options = options
+            self._unlink_parent(state)
+        state.probe = None
+        if "probe" in options:
+            try:
+                state.probe = parse_probe(options["probe"])
+            except ValueError as e:
+                print(f"Invalid probe option for {ip}, using ICMP: {e}")
+        parent = options.get("parent")
+        if parent and parent != ip:
+            state.parent = parent
+            self.children.setdefault(parent, set()).add(ip)
+        return state
+
+    def _unlink_parent(self, state):
+        if state.parent is not None:
+            self.children.get(state.parent, set()).discard(state.ip)
+            state.parent = None
+
+    def dependents(self, ip):
+        """Return every target behind ip, directly or through other dependents."""
+        found = set()
+        stack = [ip]
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                if child not in found and child != ip:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def behind_outage(self, ip):
+        """Return the nearest failing ancestor of ip, or None."""
+        seen = set()
+        state = self.table.get(ip)
+        parent = state.parent if state is not None else None
+        while parent is not None and parent not in seen:
+            if parent in self.failing:
+                return parent
+            seen.add(parent)
+            state = self.table.get(parent)
+            parent = state.parent if state is not None else None
+        return None
+
+    def display_name(self, ip):
+        """Return the name shown for ip in messages."""
+        state = self.table.get(ip)
+        return state.display_name() if state is not None else f"IP {ip}"
+
+    def link_stats(self, ip):
+        """Return ip's streaming loss, mean, smoothed RTT and jitter estimates."""
+        state = self.table.get(ip)
+        return state.link_stats() if state is not None else None
+
+    def rtt_stats(self, ip, window=None):
+        """Return min/avg/p95/p99 RTT and loss over ip's newest window samples."""
+        state = self.table.get(ip)
+        if state is None or state.history is None:
+            return None
+        return state.history.stats(window)
+
+    def handle_sweep(self, key, responders, total):
+        """Record a block sweep: log hosts that appeared or vanished, then treat the block as one target."""
+        state = self.table.get(key)
+        if state is None:
+            return
+        members = set(responders)
+        previous = state.members
+        state.members = members
+        if previous is not None and members != previous:
+            appeared, vanished = members - previous, previous - members
+            self.log_queue.put(Alert("sweep", key, state.name, time.time(),
+                                     (len(members), total, len(appeared), len(vanished))))
+            self._event("sweep", ip=key, responding=len(members), total=total,
+                        appeared=sorted(appeared), vanished=sorted(vanished))
+        rtts = sorted(responders.values())
+        self.handle_result(key, (rtts[len(rtts) // 2] if rtts else None,))
+
+    def handle_result(self, ip, samples):
+        """Record one cycle's burst of round trips for ip and queue status, log and popup updates."""
+        state = self.table.get(ip)
+        if state is None:
+            return  # removed while the probe was in flight
+        self.stats.observe_burst(samples)
+        if self.agent is not None:
+            self.agent.submit(ip, state.name, samples)
+        try:
+            current_time = time.time()
+            response_time = self._record(state, samples, current_time)
+            lost = samples.count(None)
+            is_responding = lost <= len(samples) * CYCLE_LOSS_THRESHOLD and response_time is not None
+            self.status_queue.put((ip, is_responding, response_time if is_responding else 0))
+            was_up = state.up
+            if is_responding:
+                state.misses = 0
+            else:
+                state.misses += 1
+
+            if is_responding and not was_up:
+                self._alert(Alert("up", ip, state.name, current_time))
+                self._event("up", ip=ip, name=state.name, rtt_ms=round(response_time * 1000, 3))
+                state.up = True
+                state.changed_at = current_time
+                if ip in self.failing:
+                    self._track_parent(ip, False)
+            elif not is_responding and was_up:
+                if self.behind_outage(ip) is not None:
+                    pass  # reported as part of the parent's outage; re-checked once it recovers
+                elif state.misses >= DOWN_AFTER_MISSES:
+                    self._report_down(state, current_time)
+            self._adapt_interval(state)
+            if self.metrics is not None:
+                self.metrics.touch(ip)
+        except Exception as e:
+            print(f"Error handling result for {ip}: {e}")
+
+    def handle_agent(self, name, connected):
+        """Log an agent connecting to or leaving the aggregator."""
+        self.log_queue.put(Alert("agent", name, name, time.time(), connected))
+        self._event("agent", agent=name, connected=connected)
+
+    def handle_agent_target(self, ip, name):
+        """Add a target first reported by an agent."""
+        if validate_target(ip):
+            if ip not in self.table:
+                self.agent_targets.add(ip)
+            self.add(ip, name)
+            self._event("agent_target", ip=ip, name=name)
+
+    def handle_partial(self, ip, agents):
+        """Log that only agents lose ip while others reach it, or () once they agree again."""
+        state = self.table.get(ip)
+        if state is None:
+            return
+        if agents:
+            self.partial[ip] = agents
+        else:
+            self.partial.pop(ip, None)
+        # Logged but not popped up: the target itself is still reachable
+        self.log_queue.put(Alert("partial", ip, state.name, time.time(), agents))
+        self._event("partial", ip=ip, name=state.name, down_from=list(agents))
+
+    def _report_down(self, state, current_time):
+        affected = 0
+        for child in self.dependents(state.ip):
+            child_state = self.table.get(child)
+            if child_state is not None and child_state.up:
+                affected += 1
+        self._alert(Alert("down", state.ip, state.name, current_time, affected))
+        self._event("down", ip=state.ip, name=state.name, last_seen=state.last_seen, dependents_affected=affected,
+                    loss=round(state.loss_ewma, 3))
+        state.up = False
+        state.changed_at = current_time
+        self._track_parent(state.ip, True)
+
+    def _track_parent(self, ip, down):
+        # Slow dependents down while their parent is reported down and restore them when it recovers;
+        # any down target is kept so dependents linked later by a reload see the outage too
+        if down:
+            self.failing.add(ip)
+        else:
+            self.failing.discard(ip)
+        if ip not in self.children:
+            return
+        for child in self.dependents(ip):
+            state = self.table.get(child)
+            if state is not None:
+                self._adapt_interval(state)
+
+    def _adapt_interval(self, state):
+        # Confirm a first miss quickly, back off on dead hosts, and slow
+        # dependents of a failing parent; only changes reach the engine
+        if self.engine is None or state.block is not None:
+            return
+        misses = state.misses
+        if misses == 0:
+            interval = None
+        elif misses < DOWN_AFTER_MISSES:
+            interval = CONFIRM_INTERVAL
+        else:
+            interval = min(PING_INTERVAL * 2 ** min(misses - DOWN_AFTER_MISSES, 16), BACKOFF_MAX_INTERVAL)
+        if state.parent is not None and self.behind_outage(state.ip) is not None:
+            interval = max(interval or PING_INTERVAL, PING_INTERVAL * DEPENDENT_INTERVAL_FACTOR)
+        if interval != state.interval:
+            state.interval = interval
+            self.engine.set_interval(state.ip, interval)
+
+    def _record(self, state, samples, current_time):
+        # Feed every request of the burst to the estimators and history; returns the mean RTT or None
+        ring = self.history_for(state)
+        total = 0.0
+        received = 0
+        for response_time in samples:
+            state.observe(response_time)
+            ring.append(response_time)
+            if self.metrics is not None:
+                self.metrics.observe(state.ip, response_time)
+            if self.store is not None:
+                self.store.append(current_time, state.ip, response_time)
+            if response_time is not None:
+                total += response_time
+                received += 1
+        state.updated_at = current_time
+        state.last_rtt = total / received if received else None
+        if received:
+            state.last_seen = current_time
+        return state.last_rtt
+
+    def history_for(self, state):
+        """Return state's RTT ring buffer, creating it on first use."""
+        if state.history is None:
+            from history import RingBuffer
+            state.history = RingBuffer(HISTORY_SAMPLES)
+        return state.history
+
+    def _event(self, kind, **fields):
+        if self.events is not None:
+            self.events.write({"ts": round(time.time(), 3), "event": kind, **fields})
+
+    def _alert(self, alert):
+        if self.popups:
+            self.popup_queue.put(alert)
+        self.log_queue.put(alert)
@@ -0,0 +1,78 @@
+import json
+import os
+import queue
+from threading import Thread
+
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the event log past this size
+LOG_BACKUPS = 3  # Rotated files kept as .1 (newest) to .N
+LOG_BATCH = 1000  # Events written per bulk write
+
+
+class EventLog:
+    """Write structured events as JSON lines from a background thread.
+
+    write() only enqueues, so probe and UI threads never block on disk.
+    The writer drains whatever has accumulated, serialises it into one
+    buffer and issues a single write per batch, rotating the file by size.
+    """
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._thread = Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def write(self, event):
+        """Queue a dict to be written as one JSON line."""
+        self._queue.put(event)
+
+    def close(self):
+        """Flush pending events and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+    def _open(self):
+        self._file = open(self.path, 'a', encoding="utf-8")
+
+    def _rotate(self):
+        self._file.close()
+        for n in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{n}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{n + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _run(self):
+        try:
+            self._open()
+        except OSError as e:
+            print(f"Error opening event log {self.path}: {e}")
+            return
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < LOG_BATCH:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                stopping = True
+                batch = [event for event in batch if event is not None]
+            if not batch:
+                continue
+            try:
+                self._file.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch))
+                self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Error writing event log: {e}")
+        self._file.close()
@@ -0,0 +1,544 @@
+import tkinter as tk
+from tkinter import messagebox, Entry, Button, Frame, Label, Scrollbar, Text, OptionMenu
+from collections import OrderedDict
+import queue
+import time
+import os
+import sys
+
+from core import (HISTORY_FILE, IP_FILE, LOG_FILE, METRICS_ADDRESS, PROBE_BURST, RELOAD_INTERVAL, SCRIPT_DIR,
+                  SNAPSHOT_FILE, SOUND_FILE, WORKERS,
+                  IpListWatcher, Monitor, load_ip_list, save_ip_list, validate_target)
+from alerts import AlertDispatcher, SoundPlayer
+from target_list import TargetList
+
+CONFIG_FILE = os.path.join(SCRIPT_DIR, "config.txt")  # File to store theme preference
+
+# Theme definitions
+THEMES = {
+    "Light": {
+        "window_bg": "#FFFFFF",
+        "frame_bg": "#FFFFFF",
+        "label_bg": "#FFFFFF",
+        "label_fg": "#000000",
+        "button_bg": "#E0E0E0",
+        "button_fg": "#000000",
+        "canvas_bg": "#FFFFFF",
+        "text_bg": "#FFFFFF",
+        "text_fg": "#000000",
+        "highlight_bg": "#FFFF00",  # Yellow for selected IP
+        "status_online": "#00FF00",
+        "status_offline": "#FF0000",
+        "status_unknown": "#CCCCCC"
+    },
+    "Dark": {
+        "window_bg": "#2E2E2E",
+        "frame_bg": "#2E2E2E",
+        "label_bg": "#2E2E2E",
+        "label_fg": "#FFFFFF",
+        "button_bg": "#4A4A4A",
+        "button_fg": "#FFFFFF",
+        "canvas_bg": "#2E2E2E",
+        "text_bg": "#1E1E1E",
+        "text_fg": "#FFFFFF",
+        "highlight_bg": "#FFFF00",  # Yellow for selected IP
+        "status_online": "#00FF00",
+        "status_offline": "#FF0000",
+        "status_unknown": "#555555"
+    }
+}
+
+# Monitoring core: target names, probe engine and the popup/status/log queues
+monitor = None
+ip_file = IP_FILE  # List the targets are loaded from and saved to
+history_file = HISTORY_FILE  # Optional on-disk RTT history
+log_file = LOG_FILE  # JSON-lines event log
+snapshot_file = SNAPSHOT_FILE  # Warm-restart state snapshot
+metrics_port = None  # Prometheus exporter port, if enabled
+metrics_address = METRICS_ADDRESS  # Interface the exporter listens on
+workers = WORKERS  # Probe worker processes
+burst = PROBE_BURST  # Echo requests per target per cycle
+aggregate = None  # (address, port) to merge remote agents' results on instead of probing
+# Global flag for popup activation (disabled on startup)
+popups_enabled = False
+# Alerts are debounced and grouped, then shown in one reusable window
+alert_dispatcher = AlertDispatcher()
+notification = None
+notification_label = None
+sound_player = None  # Created on the first notification
+# Seconds of queue work allowed per process_queues tick; the rest carries over
+FRAME_BUDGET = 0.025
+STATUS_BUDGET_SHARE = 0.7  # Fraction of the frame budget given to status rows
+STATUS_DRAIN_LIMIT = 20000  # Most status messages coalesced per tick before drawing, time permitting
+LOG_LINES = 500  # Event log lines kept in the log window
+# Latest (is_responding, response_time) per IP not yet drawn, oldest first
+pending_status = OrderedDict()
+ip_list_watcher = None  # Polls ip_file for edits made outside the GUI
+# Global variables for GUI
+target_list = None  # Virtualized IP/name/status/response time rows
+tasks_label = None  # Target and live probe task counts
+tasks_shown = None  # (targets, tasks) last written to tasks_label
+stats_window = None  # Optional stats pane, open while shown
+stats_label = None
+STATS_REFRESH = 1000  # Milliseconds between stats pane refreshes
+log_text = None
+selected_ip = None  # Track selected IP
+current_theme = "Light"  # Default theme
+# Flag to stop queue processing
+running = True
+
+
+def load_config():
+    """Load theme from config file, return default if file doesn't exist."""
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                theme = f.read().strip()
+                return theme if theme in THEMES else "Light"
+        except Exception as e:
+            print(f"Error loading config: {e}")
+    return "Light"
+
+
+def save_config(theme):
+    """Save theme to config file."""
+    try:
+        with open(CONFIG_FILE, 'w') as f:
+            f.write(theme)
+    except Exception as e:
+        print(f"Error saving config: {e}")
+
+
+def apply_theme(theme_name):
+    """Apply the specified theme to all widgets."""
+    global current_theme
+    current_theme = theme_name
+    theme = THEMES[theme_name]
+
+    try:
+        # Update root window
+        root.configure(bg=theme["window_bg"])
+
+        # Update frames
+        ip_frame.configure(bg=theme["frame_bg"])
+        button_frame.configure(bg=theme["frame_bg"])
+        log_frame.configure(bg=theme["frame_bg"])
+
+        # Update labels
+        for child in root.winfo_children():
+            if isinstance(child, Label):
+                child.configure(bg=theme["label_bg"], fg=theme["label_fg"])
+
+        # Update the visible target rows
+        target_list.apply_theme(theme)
+
+        # Update buttons and theme menu
+        for child in button_frame.winfo_children():
+            if isinstance(child, (Button, OptionMenu)):
+                child.configure(bg=theme["button_bg"], fg=theme["button_fg"])
+
+        # Update log text
+        log_text.configure(bg=theme["text_bg"], fg=theme["text_fg"])
+
+        # Save theme
+        save_config(theme_name)
+
+        print(f"Applied theme: {theme_name}")
+    except Exception as e:
+        print(f"Error applying theme {theme_name}: {e}")
+
+
+def show_popup(message):
+    """Show message in the shared, non-modal notification window and play a sound."""
+    global notification, notification_label, sound_player
+    theme = THEMES[current_theme]
+    if notification is None or not notification.winfo_exists():
+        notification = tk.Toplevel(root)
+        notification.title("IP Status")
+        notification.protocol("WM_DELETE_WINDOW", notification.withdraw)
+        notification_label = Label(notification, justify=tk.LEFT, padx=10, pady=10)
+        notification_label.pack()
+        tk.Button(notification, text="OK", command=notification.withdraw).pack(pady=5)
+    notification.configure(bg=theme["window_bg"])
+    for child in notification.winfo_children():
+        if isinstance(child, Button):
+            child.configure(bg=theme["button_bg"], fg=theme["button_fg"])
+    notification_label.configure(text=message, bg=theme["label_bg"], fg=theme["label_fg"])
+    notification.deiconify()
+    notification.lift()
+    if sound_player is None:
+        sound_player = SoundPlayer(SOUND_FILE)
+    sound_player.play()
+
+
+def process_popup_queue(deadline):
+    """Feed queued alerts to the dispatcher and show its next grouped notification."""
+    try:
+        while time.perf_counter() < deadline:
+            alert = monitor.popup_queue.get_nowait()
+            if popups_enabled:
+                alert_dispatcher.submit(alert.kind, alert.ip, alert.display_name(), str(alert))
+    except queue.Empty:
+        pass
+    summary = alert_dispatcher.poll()
+    if summary is not None:
+        show_popup(summary)
+
+
+def process_status_queue(deadline):
+    """Coalesce queued status updates per IP, then draw them until deadline."""
+    try:
+        for _ in range(STATUS_DRAIN_LIMIT):
+            if time.perf_counter() >= deadline:
+                break
+            ip, is_responding, response_time = monitor.status_queue.get_nowait()
+            if ip not in target_list and ip in monitor:
+                target_list.add(ip, monitor.get(ip).name)  # first reported by an agent
+            # A newer update replaces a stale one but keeps its place in line
+            pending_status[ip] = (is_responding, response_time)
+    except queue.Empty:
+        pass
+    # Only rows whose text or colour actually change touch the canvas
+    while pending_status and time.perf_counter() < deadline:
+        ip, (is_responding, response_time) = pending_status.popitem(last=False)
+        target_list.set_status(ip, is_responding, f"{int(response_time * 1000)} ms" if is_responding else "N/A")
+
+
+def process_log_queue(deadline):
+    """Append queued log alerts to the log window in one insert, keeping the last LOG_LINES.
+
+    Alerts format themselves here, so only lines that reach the window cost a string.
+    """
+    messages = []
+    try:
+        while len(messages) < LOG_LINES and time.perf_counter() < deadline:
+            messages.append(monitor.log_queue.get_nowait())
+    except queue.Empty:
+        pass
+    if not messages:
+        return
+    log_text.config(state="normal")
+    log_text.insert(tk.END, "".join(f"{message}\n" for message in messages))
+    excess = int(log_text.index("end-1c").split(".")[0]) - 1 - LOG_LINES
+    if excess > 0:
+        log_text.delete("1.0", f"{excess + 1}.0")
+    log_text.see(tk.END)
+    log_text.config(state="disabled")
+
+
+def process_queues():
+    """Process all queues within the per-tick frame budget."""
+    if not running:
+        return
+    start = time.perf_counter()
+    deadline = start + FRAME_BUDGET
+    # Status rows get most of the budget but cannot starve the log
+    process_status_queue(start + FRAME_BUDGET * STATUS_BUDGET_SHARE)
+    process_log_queue(deadline)
+    process_popup_queue(deadline)
+    target_list.advance_sparklines()
+    update_task_count()
+    monitor.stats.tick.observe(time.perf_counter() - start)
+    root.after(100, process_queues)
+
+
+def target_history(ip):
+    """Return ip's in-memory RTT ring buffer for its sparkline, or None before its first result."""
+    state = monitor.get(ip)
+    return state.history if state is not None else None
+
+
+def update_task_count():
+    """Show how many targets are listed and how many probe tasks are live."""
+    global tasks_shown
+    counts = (len(monitor), monitor.task_count())
+    if counts != tasks_shown:
+        tasks_shown = counts
+        tasks_label.configure(text=f"{counts[0]} targets, {counts[1]} probe tasks")
+
+
+def toggle_stats():
+    """Open the stats pane, or close it if it is open."""
+    global stats_window, stats_label
+    if stats_window is not None:
+        stats_window.destroy()
+        stats_window = None
+        return
+    theme = THEMES[current_theme]
+    stats_window = tk.Toplevel(root)
+    stats_window.title("Stats")
+    stats_window.configure(bg=theme["window_bg"])
+    stats_window.protocol("WM_DELETE_WINDOW", toggle_stats)
+    stats_label = tk.Label(stats_window, font=("Courier", 9), justify=tk.LEFT, anchor="w",
+                           bg=theme["label_bg"], fg=theme["label_fg"])
+    stats_label.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+    refresh_stats()
+
+
+def refresh_stats():
+    """Redraw the stats pane while it is open; queue depths are sampled here, not per message."""
+    if not running or stats_window is None:
+        return
+    from stats import format_report
+    rows = monitor.stats.report(monitor)
+    recent = monitor.rtt_stats(selected_ip) if selected_ip is not None else None
+    if recent is not None and recent["samples"]:
+        rows.append(("selected", format_rtt_stats(monitor.display_name(selected_ip), recent)))
+    stats_label.configure(text=format_report(rows))
+    stats_window.after(STATS_REFRESH, refresh_stats)
+
+
+def format_rtt_stats(name, recent):
+    """Summarize an rtt_stats() window for the stats pane."""
+    figures = "/".join("-" if recent[key] is None else f"{recent[key] * 1000:.1f}"
+                       for key in ("min", "avg", "p95", "p99"))
+    return f"{name}: min/avg/p95/p99 {figures} ms, {recent['loss'] * 100:.1f}% loss over {recent['samples']} samples"
+
+
+def check_ip_list():
+    """Reload the target list if its file changed and apply only the differences."""
+    global selected_ip
+    if not running:
+        return
+    try:
+        reloaded = load_ip_list(ip_file, default=None) if ip_list_watcher.changed() else None
+        if reloaded is not None:
+            added, removed, updated = monitor.reload(reloaded)
+            for ip in removed:
+                target_list.remove(ip)
+                if ip == selected_ip:
+                    selected_ip = None
+            for ip in added:
+                target_list.add(ip, monitor.get(ip).name)
+            for ip in updated:
+                target_list.set_name(ip, monitor.get(ip).name)
+    except Exception as e:
+        print(f"Error reloading IP list: {e}")
+    root.after(RELOAD_INTERVAL * 1000, check_ip_list)
+
+
+def create_gui():
+    """Create the main GUI window."""
+    global root, ip_frame, button_frame, log_frame, popup_button, target_list, tasks_label, log_text, monitor, \
+        ip_list_watcher
+    root = tk.Tk()
+    root.title("Hip-no-ping IP Monitor By Richeee")
+    root.geometry("500x900")  # Reduced height due to horizontal buttons
+
+    # Handle window close
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+
+    # Load and apply theme
+    global current_theme
+    current_theme = load_config()
+
+    # Frame for IP list and status
+    tk.Label(root, text="IP Addresses and Status:").pack(pady=5)
+    ip_frame = Frame(root)
+    ip_frame.pack(pady=5, padx=5, fill=tk.BOTH, expand=True)
+
+    # Virtualized list: only the rows in view have canvas items
+    target_list = TargetList(ip_frame, THEMES[current_theme], on_select=select_ip)
+    target_list.history_source = target_history
+    target_list.pack(fill=tk.BOTH, expand=True)
+    tasks_label = tk.Label(root, text="")
+    tasks_label.pack()
+
+    # Load initial IPs and names
+    ip_list_watcher = IpListWatcher(ip_file)
+    targets = load_ip_list(ip_file)
+    monitor = Monitor(targets, history_file=history_file, log_file=log_file, workers=workers, burst=burst,
+                      snapshot_file=snapshot_file, aggregate=aggregate)
+    if metrics_port:
+        from metrics import start_exporter
+        start_exporter(monitor, metrics_port, metrics_address)
+    for ip, name, _ in targets:
+        target_list.add(ip, name)
+
+    # Button frame for horizontal layout
+    button_frame = Frame(root)
+    button_frame.pack(pady=5, fill=tk.X)
+    tk.Button(button_frame, text="Add", command=add_ip).pack(side=tk.LEFT, padx=2)
+    tk.Button(button_frame, text="Edit", command=edit_ip).pack(side=tk.LEFT, padx=2)
+    tk.Button(button_frame, text="Remove", command=remove_ip).pack(side=tk.LEFT, padx=2)
+    tk.Button(button_frame, text="Save", command=save_ips).pack(side=tk.LEFT, padx=2)
+    popup_button = tk.Button(button_frame, text="Enable Popups", command=toggle_popups)
+    popup_button.pack(side=tk.LEFT, padx=2)
+    tk.Button(button_frame, text="Stats", command=toggle_stats).pack(side=tk.LEFT, padx=2)
+
+    # Theme selection menu
+    theme_var = tk.StringVar(value=current_theme)
+    theme_menu = OptionMenu(button_frame, theme_var, *THEMES.keys(), command=lambda theme: apply_theme(theme))
+    theme_menu.configure(width=8)
+    theme_menu.pack(side=tk.LEFT, padx=2)
+
+    # Log window
+    tk.Label(root, text="Event Log:").pack(pady=5)
+    log_frame = Frame(root)
+    log_frame.pack(pady=5, padx=5, fill=tk.BOTH, expand=False)
+    log_text = Text(log_frame, height=10, width=40, state="disabled")
+    log_scrollbar = Scrollbar(log_frame, orient="vertical", command=log_text.yview)
+    log_text.configure(yscrollcommand=log_scrollbar.set)
+    log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    # Apply initial theme
+    apply_theme(current_theme)
+
+    # Start the shared probe engine
+    monitor.start()
+
+    root.after(100, process_queues)
+    root.after(RELOAD_INTERVAL * 1000, check_ip_list)
+    root.mainloop()
+
+
+def select_ip(ip):
+    """Highlight the selected IP."""
+    global selected_ip
+    try:
+        selected_ip = target_list.select(ip)
+    except Exception as e:
+        print(f"Error in select_ip for IP {ip}: {e}")
+
+
+def add_ip():
+    """Open a dialog to add a new IP."""
+    dialog = tk.Toplevel(root)
+    dialog.title("Add IP")
+    dialog.geometry("250x250")
+    dialog.configure(bg=THEMES[current_theme]["window_bg"])
+    tk.Label(dialog, text="Enter IP:", bg=THEMES[current_theme]["label_bg"], fg=THEMES[current_theme]["label_fg"]).pack(
+        pady=5)
+    ip_entry = Entry(dialog)
+    ip_entry.pack(pady=5)
+    tk.Label(dialog, text="Enter Name (optional):", bg=THEMES[current_theme]["label_bg"],
+             fg=THEMES[current_theme]["label_fg"]).pack(pady=5)
+    name_entry = Entry(dialog)
+    name_entry.pack(pady=5)
+
+    def submit():
+        ip = ip_entry.get().strip()
+        name = name_entry.get().strip() or "N/A"
+        if validate_target(ip):
+            if ip not in target_list:
+                monitor.add(ip, name)
+                target_list.add(ip, name)
+                dialog.destroy()
+            else:
+                messagebox.showerror("Error", "IP already in list")
+        else:
+            messagebox.showerror("Error", "Invalid IP address or host name")
+
+    tk.Button(dialog, text="Submit", bg=THEMES[current_theme]["button_bg"], fg=THEMES[current_theme]["button_fg"],
+              command=submit).pack(pady=5)
+
+
+def edit_ip():
+    """Open a dialog to edit the selected IP."""
+    global selected_ip
+    if not selected_ip:
+        messagebox.showerror("Error", "Select an IP to edit")
+        return
+    try:
+        old_ip = selected_ip
+        old_name = monitor.get(old_ip).name if old_ip in monitor else "N/A"
+
+        dialog = tk.Toplevel(root)
+        dialog.title("Edit IP")
+        dialog.geometry("250x250")
+        dialog.configure(bg=THEMES[current_theme]["window_bg"])
+        tk.Label(dialog, text="Edit IP:", bg=THEMES[current_theme]["label_bg"],
+                 fg=THEMES[current_theme]["label_fg"]).pack(pady=5)
+        ip_entry = Entry(dialog)
+        ip_entry.insert(0, old_ip)
+        ip_entry.pack(pady=5)
+        tk.Label(dialog, text="Edit Name (optional):", bg=THEMES[current_theme]["label_bg"],
+                 fg=THEMES[current_theme]["label_fg"]).pack(pady=5)
+        name_entry = Entry(dialog)
+        name_entry.insert(0, old_name if old_name != "N/A" else "")
+        name_entry.pack(pady=5)
+
+        def submit():
+            global selected_ip
+            new_ip = ip_entry.get().strip()
+            new_name = name_entry.get().strip() or "N/A"
+            if not validate_target(new_ip):
+                messagebox.showerror("Error", "Invalid IP address or host name")
+                return
+            if new_ip in target_list and new_ip != old_ip:
+                messagebox.showerror("Error", "IP already in list")
+                return
+            if new_ip == old_ip:
+                # Only the name changed: keep the row, probes and history
+                target_list.set_name(old_ip, new_name)
+                monitor.rename(old_ip, new_ip, new_name)
+                dialog.destroy()
+                return
+            # Update the row in place
+            target_list.rename(old_ip, new_ip, new_name)
+            # Start probing the new IP
+            monitor.rename(old_ip, new_ip, new_name)
+            selected_ip = None
+            dialog.destroy()
+
+        tk.Button(dialog, text="Submit", bg=THEMES[current_theme]["button_bg"], fg=THEMES[current_theme]["button_fg"],
+                  command=submit).pack(pady=5)
+    except Exception as e:
+        print(f"Error editing IP: {e}")
+
+
+def remove_ip():
+    """Remove the selected IP."""
+    global selected_ip
+    if not selected_ip:
+        messagebox.showerror("Error", "Select an IP to remove")
+        return
+    try:
+        ip = selected_ip
+        monitor.remove(ip)
+        target_list.remove(ip)
+        selected_ip = None
+    except Exception as e:
+        print(f"Error removing IP: {e}")
+
+
+def save_ips():
+    """Save the current IP list to file."""
+    try:
+        save_ip_list([(ip, name, monitor.get(ip).options if ip in monitor else {})
+                      for ip, name in target_list.items()], ip_file)
+        messagebox.showinfo("Success", "IP list saved")
+    except Exception as e:
+        print(f"Error saving IPs: {e}")
+
+
+def toggle_popups():
+    """Toggle popups and update button text."""
+    global popups_enabled
+    popups_enabled = not popups_enabled
+    popup_button.config(text="Disable Popups" if popups_enabled else "Enable Popups")
+
+
+def on_closing():
+    """Handle window close event."""
+    global running
+    running = False
+    monitor.stop()
+    root.destroy()
+    sys.exit()
+
+
+def main(args):
+    """Run the Tk front end."""
+    global ip_file, history_file, log_file, snapshot_file, metrics_port, metrics_address, workers, burst, aggregate
+    ip_file = args.ip_file
+    history_file = args.history or HISTORY_FILE
+    log_file = args.log_file
+    snapshot_file = args.snapshot
+    metrics_port = args.metrics_port
+    metrics_address = args.metrics_address
+    workers = args.workers
+    burst = args.burst
+    aggregate = (args.aggregate_address, args.aggregate) if args.aggregate else None
+    create_gui()
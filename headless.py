@@ -0,0 +1,110 @@
+import signal
+import sys
+import time
+from threading import Event
+import queue
+
+from core import (HISTORY_FILE, PING_TIMEOUT, RELOAD_INTERVAL, STATS_INTERVAL, IpListWatcher, Monitor, load_ip_list,
+                  parse_block)
+from stats import format_report
+
+
+def drain(q, handle=None):
+    """Consume everything currently queued on q."""
+    try:
+        while True:
+            item = q.get_nowait()
+            if handle is not None:
+                handle(item)
+    except queue.Empty:
+        pass
+
+
+def sweep_main(args):
+    """Sweep one CIDR block or address range once and print the hosts that answered."""
+    from probe_engine import ProbeEngine
+
+    block = parse_block(args.sweep)
+    if block is None:
+        print(f"Not a CIDR block or address range: {args.sweep}")
+        sys.exit(2)
+    done = Event()
+    result = {}
+
+    def finished(key, responders, total):
+        result.update(responders=responders, total=total)
+        done.set()
+
+    engine = ProbeEngine(None, timeout=PING_TIMEOUT, sweep_rate=args.sweep_rate)
+    engine.start()
+    started = time.monotonic()
+    engine.sweep(args.sweep, block, finished)
+    # Paced sends plus the last reply's timeout, with slack for a paused sweep; never hang on a stuck engine
+    finished_in_time = done.wait(len(block) / args.sweep_rate + PING_TIMEOUT * 2 + 5)
+    elapsed = time.monotonic() - started
+    engine.stop()
+    if not finished_in_time:
+        print(f"Sweep of {args.sweep} did not finish after {elapsed:.0f} s")
+        sys.exit(1)
+    responders = result["responders"]
+    for ip in sorted(responders, key=lambda ip: tuple(int(part) for part in ip.split('.'))):
+        print(f"{ip}\t{responders[ip] * 1000:.1f} ms")
+    print(f"{len(responders)}/{result['total']} responding, swept in {elapsed:.2f} s")
+
+
+def main(args):
+    """Run the monitor without any GUI, printing events to stdout until signalled."""
+    stop = Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    watcher = IpListWatcher(args.ip_file)
+    targets = load_ip_list(args.ip_file)
+    monitor = Monitor(targets, popups=False, history_file=args.history or HISTORY_FILE,
+                      log_file=args.log_file, workers=args.workers, burst=args.burst, snapshot_file=args.snapshot,
+                      aggregate=(args.aggregate_address, args.aggregate) if args.aggregate else None)
+    if monitor.restored is not None:
+        restored, seconds, saved_at = monitor.restored
+        print(f"Restored {restored} targets from snapshot saved {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(saved_at))} "
+              f"in {seconds * 1000:.1f} ms", flush=True)
+    exporter = None
+    if args.metrics_port:
+        from metrics import start_exporter
+        exporter = start_exporter(monitor, args.metrics_port, args.metrics_address)
+    agent = None
+    if args.agent:
+        from agents import parse_address, start_agent
+        agent = start_agent(monitor, parse_address(args.agent), args.agent_name)
+    monitor.start()
+    startup_reported = False
+    next_reload_check = time.monotonic() + RELOAD_INTERVAL
+    next_stats = time.monotonic() + STATS_INTERVAL
+
+    while not stop.wait(0.2):
+        if not startup_reported and monitor.engine.first_probe_at is not None:
+            startup_ms = (monitor.engine.first_probe_at - args.started_at) * 1000
+            print(f"Startup to first probe: {startup_ms:.1f} ms ({len(targets)} targets)", flush=True)
+            startup_reported = True
+        if time.monotonic() >= next_reload_check:
+            next_reload_check += RELOAD_INTERVAL
+            reloaded = load_ip_list(args.ip_file, default=None) if watcher.changed() else None
+            if reloaded is not None:
+                added, removed, updated = monitor.reload(reloaded)
+                print(f"Reloaded {args.ip_file}: {len(added)} added, {len(removed)} removed, "
+                      f"{len(updated)} updated; {monitor.task_count()} probe tasks", flush=True)
+        tick_started = time.perf_counter()
+        drain(monitor.status_queue)
+        drain(monitor.log_queue, lambda message: print(message, flush=True))
+        monitor.stats.tick.observe(time.perf_counter() - tick_started)
+        if args.stats and time.monotonic() >= next_stats:
+            next_stats += STATS_INTERVAL
+            print(format_report(monitor.stats.report(monitor)), flush=True)
+
+    if args.stats:
+        print(format_report(monitor.stats.report(monitor)), flush=True)
+    if exporter is not None:
+        exporter.stop()
+    monitor.stop()
+    if agent is not None:
+        agent.stop()
+    sys.exit()
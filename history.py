@@ -0,0 +1,213 @@
+import math
+import mmap
+import os
+import struct
+from array import array
+from threading import Lock
+
+NAN = float("nan")
+SEGMENT_MAGIC = b"PNGSEG1\x00"
+SEGMENT_HEADER = struct.Struct("<8sQ")  # magic, record count
+SEGMENT_RECORD = struct.Struct("<dIf")  # unix time, target id, rtt in seconds (NaN = lost)
+SEGMENT_GROW = 1 << 16  # records added each time the file is extended
+SCAN_CHUNK = 4096  # records unpacked per step of a scan
+
+
+def percentile(ordered, fraction):
+    """Return the nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return None
+    rank = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def _unpack(mapping, start, end, target_id, since):
+    # Records in mapping[start:end] at or after since, for target_id (all when None)
+    with memoryview(mapping)[start:end] as view:
+        return [record for record in SEGMENT_RECORD.iter_unpack(view)
+                if record[0] >= since and (target_id is None or record[1] == target_id)]
+
+
+class RingBuffer:
+    """Fixed-size RTT history for one target, stored in a flat array of doubles.
+
+    A lost probe is stored as NaN, so loss and RTT share one slot per sample
+    and appending never allocates.
+    """
+
+    __slots__ = ("samples", "capacity", "count", "head")
+
+    def __init__(self, capacity=720):
+        self.samples = array("d", bytes(8 * capacity))
+        self.capacity = capacity
+        self.count = 0
+        self.head = 0  # index the next sample is written to
+
+    def __len__(self):
+        return self.count
+
+    def append(self, response_time):
+        """Record a sample; response_time is seconds, or None when the probe was lost."""
+        self.samples[self.head] = NAN if response_time is None else response_time
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, samples):
+        """Append an array of samples (NaN = lost), oldest first, in bulk."""
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        first = min(n, self.capacity - self.head)
+        self.samples[self.head:self.head + first] = samples[:first]
+        self.samples[:n - first] = samples[first:]
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def latest(self, n=None):
+        """Return the newest n samples (all by default), oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        start = (self.head - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.samples[start:start + n]
+        return self.samples[start:] + self.samples[:self.head]
+
+    def stats(self, window=None):
+        """Return min/avg/p95/p99 RTT and loss fraction over the newest window samples."""
+        window_samples = self.latest(window)
+        ordered = sorted(x for x in window_samples if x == x)  # NaN != NaN drops losses
+        total = len(window_samples)
+        return {
+            "samples": total,
+            "loss": (total - len(ordered)) / total if total else 0.0,
+            "min": ordered[0] if ordered else None,
+            "avg": sum(ordered) / len(ordered) if ordered else None,
+            "p95": percentile(ordered, 0.95),
+            "p99": percentile(ordered, 0.99),
+        }
+
+
+class SegmentStore:
+    """Append-only, memory-mapped file of fixed-size RTT records.
+
+    Records are (time, target id, rtt); target ids index the keys sidecar
+    file, one key per line. When a segment reaches max_records it is moved
+    to path + ".1" and a new one is started, so retention is bounded at two
+    segments. scan() walks the mapping in place without reading it into RAM,
+    and may run on any thread: it reads a chunk at a time under a lock
+    that append() takes only while it grows or rotates the segment.
+    """
+
+    def __init__(self, path, max_records=1 << 22):
+        self.path = path
+        self.max_records = max_records
+        self.keys_path = path + ".keys"
+        self.ids = {}
+        self.keys = []
+        self._lock = Lock()  # held while the mapping is replaced and while scan() reads a chunk of it
+        self._segment = 0  # bumped by every rotation, so a scan notices its segment was moved away
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'r') as f:
+                for line in f:
+                    self._remember(line.rstrip("\n"))
+        self._keys_file = open(self.keys_path, 'a')
+        self._open_segment()
+
+    def _remember(self, key):
+        self.ids[key] = len(self.keys)
+        self.keys.append(key)
+
+    def _open_segment(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._file = os.fdopen(fd, 'r+b')
+        size = os.fstat(fd).st_size
+        if size < SEGMENT_HEADER.size:
+            size = SEGMENT_HEADER.size + SEGMENT_GROW * SEGMENT_RECORD.size
+            self._file.truncate(size)
+        self._map = mmap.mmap(fd, size)
+        magic, count = SEGMENT_HEADER.unpack_from(self._map, 0)
+        if magic != SEGMENT_MAGIC:
+            count = 0
+            SEGMENT_HEADER.pack_into(self._map, 0, SEGMENT_MAGIC, count)
+        self.count = count
+
+    def _capacity(self):
+        return (len(self._map) - SEGMENT_HEADER.size) // SEGMENT_RECORD.size
+
+    def _grow(self):
+        size = len(self._map) + SEGMENT_GROW * SEGMENT_RECORD.size
+        with self._lock:
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _rotate(self):
+        with self._lock:
+            self.close_segment()
+            os.replace(self.path, self.path + ".1")
+            self._open_segment()
+            self._segment += 1
+
+    def append(self, timestamp, key, response_time):
+        """Append one record; response_time is seconds, or None when the probe was lost."""
+        target_id = self.ids.get(key)
+        if target_id is None:
+            self._remember(key)
+            target_id = self.ids[key]
+            self._keys_file.write(key + "\n")
+            self._keys_file.flush()
+        if self.count >= self.max_records:
+            self._rotate()
+        elif self.count >= self._capacity():
+            self._grow()
+        offset = SEGMENT_HEADER.size + self.count * SEGMENT_RECORD.size
+        SEGMENT_RECORD.pack_into(self._map, offset, timestamp, target_id,
+                                 NAN if response_time is None else response_time)
+        self.count += 1
+        SEGMENT_HEADER.pack_into(self._map, 0, SEGMENT_MAGIC, self.count)
+
+    def scan(self, key=None, since=0.0):
+        """Yield (time, key, rtt or None) records, oldest first, optionally for one key.
+
+        Safe while another thread appends; a scan overtaken by a rotation
+        stops at the end of the records it had already reached.
+        """
+        target_id = None if key is None else self.ids.get(key, -1)
+        with self._lock:
+            segment, count = self._segment, self.count
+            try:
+                f = open(self.path + ".1", 'rb')
+            except FileNotFoundError:
+                f = None
+        if f is not None:
+            with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as old:
+                yield from self._scan_map(old, SEGMENT_HEADER.unpack_from(old, 0)[1], target_id, since)
+        yield from self._scan_map(None, count, target_id, since, segment)
+
+    def _scan_map(self, old, count, target_id, since, segment=None):
+        # Unpack a chunk at a time under the lock and drop the buffer export
+        # before yielding, so a concurrent append can still grow (remap) the
+        # live segment between chunks; old is a read-only map of path + ".1"
+        for first in range(0, count, SCAN_CHUNK):
+            start = SEGMENT_HEADER.size + first * SEGMENT_RECORD.size
+            end = SEGMENT_HEADER.size + min(count, first + SCAN_CHUNK) * SEGMENT_RECORD.size
+            if old is not None:
+                chunk = _unpack(old, start, end, target_id, since)
+            else:
+                with self._lock:
+                    if self._segment != segment:
+                        return  # rotated away under the scan
+                    chunk = _unpack(self._map, start, end, target_id, since)
+            for timestamp, record_id, rtt in chunk:
+                yield timestamp, self.keys[record_id], None if rtt != rtt else rtt
+
+    def close_segment(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+    def close(self):
+        """Flush and close the segment and keys files."""
+        with self._lock:
+            self.close_segment()
+            self._segment += 1  # ends any scan still running
+        self._keys_file.close()
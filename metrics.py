@@ -0,0 +1,196 @@
+import gzip
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+from core import METRICS_ADDRESS
+
+# Upper bounds in seconds of the RTT histogram buckets (+Inf is implicit)
+RTT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SCRAPE_CACHE_SECONDS = 1.0  # Scrapes this close together share one rendered body
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+FAMILIES = (  # name, type, help; one section of the exposition each
+    ("pinger_up", "gauge", "1 if the target is considered up, 0 if down or not yet seen."),
+    ("pinger_rtt_last_seconds", "gauge", "Round trip of the latest probe; NaN when it was lost."),
+    ("pinger_probes_total", "counter", "Probes whose result has been recorded."),
+    ("pinger_probes_lost_total", "counter", "Probes that timed out or failed."),
+    ("pinger_rtt_ewma_seconds", "gauge", "Exponentially weighted moving average of the round trip."),
+    ("pinger_jitter_seconds", "gauge", "RFC 3550 interarrival jitter of consecutive replies."),
+    ("pinger_rtt_p95_seconds", "gauge", "95th percentile round trip over the recent history; NaN without replies."),
+    ("pinger_rtt_p99_seconds", "gauge", "99th percentile round trip over the recent history; NaN without replies."),
+    ("pinger_rtt_seconds", "histogram", "Round trip time of answered probes."),
+)
+BUCKET_LABELS = tuple(repr(bound) for bound in RTT_BUCKETS) + ("+Inf",)
+
+
+def escape_label(value):
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class RttHistogram:
+    """Cumulative RTT histogram of one target."""
+
+    __slots__ = ("buckets", "rtt_sum")
+
+    def __init__(self):
+        self.buckets = [0] * (len(RTT_BUCKETS) + 1)  # per bucket, not cumulative
+        self.rtt_sum = 0.0
+
+
+class MetricsRegistry:
+    """RTT histograms for the exporter, rendered with a per-target cache.
+
+    Up/down state and probe counters come from the monitor's TargetState
+    records; observe() is called from the probe engine thread and only
+    adds the RTT to the target's histogram, and touch() flags the target
+    once its whole result is recorded. render() runs on the HTTP thread
+    without taking the monitor's lock; it re-renders only the flagged
+    targets (and renamed ones), reuses every other target's lines, and
+    keeps the escaped label strings for as long as the target exists.
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.histograms = {}  # ip -> RttHistogram
+        self._labels = {}  # ip -> (name, escaped label set)
+        self._rendered = {}  # ip -> (name, per-family text)
+        self._dirty = set()  # ips with a result recorded since their lines were rendered
+        self._body = None
+        self._body_at = 0.0
+        self._render_lock = Lock()
+
+    def observe(self, ip, response_time):
+        """Record one probe result; response_time is seconds, or None when lost."""
+        if response_time is None:
+            return
+        histogram = self.histograms.get(ip)
+        if histogram is None:
+            histogram = self.histograms[ip] = RttHistogram()
+        histogram.buckets[bisect_left(RTT_BUCKETS, response_time)] += 1
+        histogram.rtt_sum += response_time
+
+    def touch(self, ip):
+        """Flag ip's lines for re-rendering; called after a result has updated its record."""
+        self._dirty.add(ip)
+
+    def forget(self, ip):
+        """Drop a removed target's series."""
+        self._dirty.discard(ip)
+        self.histograms.pop(ip, None)
+        self._labels.pop(ip, None)
+        self._rendered.pop(ip, None)
+
+    def render(self):
+        """Return the exposition text, reusing a body rendered within SCRAPE_CACHE_SECONDS."""
+        with self._render_lock:
+            now = time.monotonic()
+            if self._body is None or now - self._body_at >= SCRAPE_CACHE_SECONDS:
+                self._body = self._render().encode("utf-8")
+                self._body_at = now
+            return self._body
+
+    def _render(self):
+        sections = [[] for _ in FAMILIES]
+        rendered = self._rendered
+        empty = RttHistogram()
+        # Pop rather than swap the set: a touch() racing this loop stays flagged for the next scrape
+        dirty = self._dirty
+        stale = set()
+        while dirty:
+            stale.add(dirty.pop())
+        for state in list(self.monitor.table.values()):
+            if not state.probes:
+                continue  # no result yet
+            ip, name = state.ip, state.name
+            cached = rendered.get(ip)
+            if cached is None or ip in stale or cached[0] != name:
+                histogram = self.histograms.get(ip, empty)
+                cached = rendered[ip] = (name, self._render_target(state, histogram))
+            for section, text in zip(sections, cached[1]):
+                section.append(text)
+        out = []
+        for (family, kind, help_text), section in zip(FAMILIES, sections):
+            out.append(f"# HELP {family} {help_text}\n# TYPE {family} {kind}\n")
+            out.extend(section)
+        return "".join(out)
+
+    def _render_target(self, state, histogram):
+        ip, name = state.ip, state.name
+        labels = self._labels.get(ip)
+        if labels is None or labels[0] != name:
+            labels = self._labels[ip] = (name, f'target="{escape_label(ip)}",name="{escape_label(name)}"')
+        label_set = labels[1]
+        last = "NaN" if state.last_rtt is None else repr(state.last_rtt)
+        recent = state.history.stats() if state.history is not None else {}
+        p95, p99 = recent.get("p95"), recent.get("p99")
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKET_LABELS, histogram.buckets):
+            cumulative += count
+            lines.append(f'pinger_rtt_seconds_bucket{{{label_set},le="{bound}"}} {cumulative}\n')
+        lines.append(f"pinger_rtt_seconds_sum{{{label_set}}} {histogram.rtt_sum!r}\n"
+                     f"pinger_rtt_seconds_count{{{label_set}}} {cumulative}\n")
+        return (f"pinger_up{{{label_set}}} {1 if state.up else 0}\n",
+                f"pinger_rtt_last_seconds{{{label_set}}} {last}\n",
+                f"pinger_probes_total{{{label_set}}} {state.probes}\n",
+                f"pinger_probes_lost_total{{{label_set}}} {state.lost}\n",
+                f"pinger_rtt_ewma_seconds{{{label_set}}} {'NaN' if state.ewma is None else repr(state.ewma)}\n",
+                f"pinger_jitter_seconds{{{label_set}}} {state.jitter!r}\n",
+                f"pinger_rtt_p95_seconds{{{label_set}}} {'NaN' if p95 is None else repr(p95)}\n",
+                f"pinger_rtt_p99_seconds{{{label_set}}} {'NaN' if p99 is None else repr(p99)}\n",
+                "".join(lines))
+
+
+class MetricsExporter:
+    """Serve a MetricsRegistry over HTTP at /metrics from a background thread."""
+
+    def __init__(self, registry, port, address=METRICS_ADDRESS):
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render()
+                encoding = None
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=1)
+                    encoding = "gzip"
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would flood stdout
+
+        self.server = ThreadingHTTPServer((address, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_exporter(monitor, port, address=METRICS_ADDRESS):
+    """Attach a registry to monitor and serve it on address:port; returns the exporter or None."""
+    registry = MetricsRegistry(monitor)
+    try:
+        exporter = MetricsExporter(registry, port, address)
+    except OSError as e:
+        print(f"Error starting metrics exporter on {address}:{port}: {e}")
+        return None
+    monitor.metrics = registry
+    exporter.start()
+    return exporter
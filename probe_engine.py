@@ -0,0 +1,625 @@
+import errno
+import os
+import queue
+import selectors
+import socket
+import struct
+import time
+from collections import deque
+from threading import Thread
+
+from resolver import PENDING
+from scheduler import Scheduler
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+ICMP_HEADER = struct.Struct("!BBHHH")
+PAYLOAD = b"pinger-probe-pad"
+RECV_BUFFER = 1 << 20  # room for a burst of replies from thousands of targets
+SWEEP_RATE = 1000  # echo requests per second sent by a block sweep
+MAX_SWEEP_RATE = 10000  # highest sweep_rate accepted on the command line
+MAX_SWEEP_PENDING = 0x8000  # sweeps pause while this many requests are unanswered, half of the sequence numbers
+SEND_RETRY_INTERVAL = 0.001  # seconds before retrying a send that found the socket buffer full
+PORT_POLL_INTERVAL = 0.01  # seconds between checks of port probes where the selector has no descriptor
+
+
+def checksum(data):
+    """Compute the RFC 1071 internet checksum of data."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(ident, seq, family=socket.AF_INET):
+    """Build an ICMP (or ICMPv6) echo request packet."""
+    if family == socket.AF_INET6:
+        # The kernel fills in the ICMPv6 checksum, which covers a pseudo-header
+        return ICMP_HEADER.pack(ICMPV6_ECHO_REQUEST, 0, 0, ident, seq) + PAYLOAD
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = checksum(header + PAYLOAD)
+    return ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, csum, ident, seq) + PAYLOAD
+
+
+def open_icmp_socket(family=socket.AF_INET):
+    """Open a raw ICMP socket, falling back to an unprivileged datagram one."""
+    proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+    try:
+        return socket.socket(family, socket.SOCK_RAW, proto), True
+    except PermissionError:
+        # Linux allows SOCK_DGRAM ICMP for groups in net.ipv4.ping_group_range
+        return socket.socket(family, socket.SOCK_DGRAM, proto), False
+
+
+def resolve_literal(key):
+    """Default resolver: targets are already IP addresses."""
+    return key
+
+
+class IcmpProber:
+    """Probe backend that sends real ICMP/ICMPv6 echo requests.
+
+    A prober is the engine's only contact with the network:
+
+      open() / close()     acquire and release resources
+      selectables()        objects for the engine's selector; receive() is
+                           called with one when it becomes readable
+      send(address, seq)   send one echo request, False if it could not go
+      receive(fileobj)     yield (seq, source address, received_at) replies
+      poll(now)            yield replies that arrive without a readable
+                           object (simulated backends)
+      next_wakeup()        monotonic time poll() next has a reply, or None
+
+    Errors are raised as OSError, which the engine reports per target.
+    """
+
+    def __init__(self):
+        self.ident = os.getpid() & 0xFFFF
+        self._socks = {}  # address family -> (socket, is_raw)
+
+    def open(self):
+        for family, label in ((socket.AF_INET, "ICMP"), (socket.AF_INET6, "ICMPv6")):
+            try:
+                sock, raw = open_icmp_socket(family)
+                sock.setblocking(False)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+                self._socks[family] = (sock, raw)
+            except OSError as e:
+                print(f"Error opening {label} socket: {e}")
+
+    def close(self):
+        for sock, _ in self._socks.values():
+            sock.close()
+        self._socks = {}
+
+    def selectables(self):
+        return [sock for sock, _ in self._socks.values()]
+
+    def send(self, address, seq):
+        family = socket.AF_INET6 if ':' in address else socket.AF_INET
+        sock = self._socks.get(family)
+        if sock is None:
+            return False
+        sock[0].sendto(build_echo_request(self.ident, seq, family), (address, 0))
+        return True
+
+    def receive(self, sock):
+        family = sock.family
+        raw = self._socks[family][1]
+        reply_type = ICMPV6_ECHO_REPLY if family == socket.AF_INET6 else ICMP_ECHO_REPLY
+        while True:
+            try:
+                packet, addr = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print(f"Error reading ICMP socket: {e}")
+                return
+            received_at = time.monotonic()
+            # Raw IPv4 sockets deliver the IP header too; IPv6 ones never do
+            offset = (packet[0] & 0x0F) * 4 if raw and family == socket.AF_INET else 0
+            if len(packet) < offset + ICMP_HEADER.size:
+                continue
+            icmp_type, _, _, ident, seq = ICMP_HEADER.unpack_from(packet, offset)
+            # The kernel rewrites the identifier on datagram sockets and
+            # only delivers our own replies, so it is only checked on raw ones
+            if icmp_type != reply_type or (raw and ident != self.ident):
+                continue
+            yield seq, addr[0].split('%', 1)[0], received_at
+
+    def poll(self, now):
+        return ()
+
+    def next_wakeup(self):
+        return None
+
+
+class PortProber:
+    """Unprivileged TCP-connect and UDP request/response probes.
+
+    Each probe is one non-blocking socket registered on this prober's own
+    epoll (or kqueue) selector, whose descriptor the engine watches next
+    to the ICMP sockets, so thousands of probes can be in flight without
+    a thread each. A completed TCP handshake, a UDP reply or a refusal
+    (RST or ICMP port unreachable) proves the host is up and counts as
+    the reply; other errors leave the probe to time out as lost.
+
+    Implements the IcmpProber interface, except that send() takes the
+    probe's (protocol, port) and discard() drops a probe that timed out.
+    """
+
+    def __init__(self):
+        self._selector = None
+        self._probes = {}  # seq -> socket
+        self._done = []  # (seq, address, received_at) settled by connect() itself, handed out by poll()
+
+    def __contains__(self, seq):
+        return seq in self._probes
+
+    def __len__(self):
+        return len(self._probes)
+
+    def open(self):
+        self._selector = selectors.DefaultSelector()
+
+    def close(self):
+        for sock in self._probes.values():
+            sock.close()
+        self._probes = {}
+        self._done = []
+        if self._selector is not None:
+            self._selector.close()
+
+    def selectables(self):
+        # Only selectors with a descriptor of their own (epoll, kqueue, devpoll) can be watched;
+        # elsewhere poll() checks the probes without blocking on every engine wake-up
+        return [self] if hasattr(self._selector, "fileno") else []
+
+    def fileno(self):
+        return self._selector.fileno()
+
+    def send(self, probe, address, seq):
+        protocol, port = probe
+        family = socket.AF_INET6 if ':' in address else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM if protocol == "tcp" else socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            result = sock.connect_ex((address, port))
+            if protocol == "udp" and result == 0:
+                sock.send(PAYLOAD)
+                events = selectors.EVENT_READ
+            elif result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                events = selectors.EVENT_WRITE
+            elif result in (0, errno.ECONNREFUSED):
+                sock.close()
+                self._done.append((seq, address, time.monotonic()))
+                return True
+            else:
+                raise OSError(result, os.strerror(result))
+        except OSError:
+            sock.close()
+            raise
+        self._selector.register(sock, events, (seq, address))
+        self._probes[seq] = sock
+        return True
+
+    def discard(self, seq):
+        """Close the socket of a probe that timed out or was cancelled."""
+        sock = self._probes.pop(seq, None)
+        if sock is not None:
+            self._selector.unregister(sock)
+            sock.close()
+
+    def receive(self, fileobj):
+        return self._ready(0)
+
+    def poll(self, now):
+        done, self._done = self._done, []
+        yield from done
+        if self._probes and not hasattr(self._selector, "fileno"):
+            yield from self._ready(0)
+
+    def next_wakeup(self):
+        if self._done:
+            return time.monotonic()
+        if self._probes and not hasattr(self._selector, "fileno"):
+            return time.monotonic() + PORT_POLL_INTERVAL
+        return None
+
+    def _ready(self, timeout):
+        for key, events in self._selector.select(timeout):
+            seq, address = key.data
+            sock = key.fileobj
+            if events & selectors.EVENT_WRITE:
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            else:
+                try:
+                    sock.recv(2048)
+                    error = 0
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except OSError as e:
+                    error = e.errno
+            received_at = time.monotonic()
+            self.discard(seq)
+            if error in (0, errno.ECONNREFUSED):
+                yield seq, address, received_at
+
+
+class Sweep:
+    """One paced pass of echo requests over every address in a block."""
+
+    __slots__ = ("key", "addresses", "rate", "on_done", "responders", "started_at", "sent", "last_sent_at",
+                 "exhausted", "retry")
+
+    def __init__(self, key, block, rate, on_done, now):
+        self.key = key
+        self.addresses = iter(block)  # expanded lazily, one address per send
+        self.rate = rate
+        self.on_done = on_done
+        self.responders = {}  # ip -> rtt
+        self.started_at = now
+        self.sent = 0
+        self.last_sent_at = now
+        self.exhausted = False
+        self.retry = None  # address whose send found the socket buffer full
+
+    def next_send_at(self):
+        return self.started_at + self.sent / self.rate
+
+
+class Burst:
+    """The echo requests sent back to back to one target in one cycle."""
+
+    __slots__ = ("samples", "outstanding", "seqs", "sent")
+
+    def __init__(self, size):
+        self.samples = [None] * size  # rtt per request in send order, None until answered
+        self.outstanding = size
+        self.seqs = []  # sequence numbers of the requests sent
+        self.sent = 0  # requests sent or failed so far; the rest wait for room in the socket buffer
+
+
+class ProbeEngine:
+    """Probe every target from one thread over one shared prober.
+
+    Replies are matched to outstanding requests by identifier and sequence
+    number, so the cost of a target is one dict entry rather than a thread.
+    Probes are fired on an absolute, staggered schedule by a Scheduler.
+    Each firing sends a burst of echo requests back to back; once all of
+    them are answered or timed out, on_result(ip, samples) is called from
+    the engine thread with a tuple of round trips in seconds, in send
+    order, with None for each request that timed out or failed.
+
+    Address blocks are swept instead: every address is sent one request at
+    a paced rate, all on the same socket, and on_sweep(key, responders,
+    total) reports the {ip: rtt} replies one timeout after the last send.
+    A sweep pauses while MAX_SWEEP_PENDING requests are unanswered, so it
+    never uses up the sequence numbers that scheduled probes need.
+
+    resolve(key) maps a target to an IPv4/IPv6 address without blocking; it
+    may return None (unresolvable, reported as a failed probe) or
+    resolver.PENDING (skipped until the next period).
+
+    max_rate caps scheduled probes per second across all targets (a block
+    sweep counts once; its own pace is sweep_rate). prober is the network
+    backend, IcmpProber by default; see simulated.py for a stand-in.
+    set_probe() switches a target to TCP-connect or UDP probes, which a
+    PortProber runs on the same thread and selector.
+    """
+
+    def __init__(self, on_result, interval=5, timeout=2, on_sweep=None, sweep_rate=SWEEP_RATE,
+                 resolve=resolve_literal, max_rate=None, prober=None, burst=1):
+        self.on_result = on_result
+        self.burst = burst
+        self.prober = prober if prober is not None else IcmpProber()
+        self.ports = PortProber()
+        self.resolve = resolve
+        self.on_sweep = on_sweep
+        self.sweep_rate = sweep_rate
+        self.interval = interval
+        self.timeout = timeout
+        self.running = False
+        self.first_probe_at = None  # perf_counter() of the first successful send
+        self.scheduler = Scheduler(interval, rate=max_rate)
+        self._in_flight = {}  # ip -> Burst still waiting for replies
+        self._stalled = {}  # ip -> (address, Burst) whose sends stopped on a full socket buffer, resumed next pass
+        self._pending = {}  # seq -> (key, sent_at, sweep or None, address, Burst or None, index in burst)
+        self._blocks = {}  # scheduled key -> block swept when the key fires
+        self._probes = {}  # key -> (protocol, port) for targets not probed with ICMP
+        self._sweeps = {}  # key -> Sweep in progress
+        self._one_off_sweeps = 0  # sweeps of unscheduled keys; written by the engine thread only, for task_count()
+        self._sent_order = deque()  # (sent_at, seq) in send order, for expiry
+        self._seq = 0
+        self._commands = queue.SimpleQueue()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._thread = None
+
+    def add(self, ip):
+        """Start probing ip; safe to call from any thread."""
+        self._command("add", ip)
+
+    def add_many(self, ips):
+        """Start probing every ip in one batch; safe to call from any thread."""
+        self._command("add_many", list(ips))
+
+    def remove(self, ip):
+        """Stop probing ip, dropping a burst still waiting for replies; safe to call from any thread."""
+        self._command("remove", ip)
+
+    def add_block(self, key, block, interval):
+        """Sweep block every interval seconds under key; safe to call from any thread."""
+        self._command("add_block", (key, block, interval))
+
+    def sweep(self, key, block, on_done):
+        """Sweep block once now and call on_done(key, responders, total); safe from any thread."""
+        self._command("sweep", (key, block, on_done))
+
+    def set_interval(self, ip, interval):
+        """Change ip's probe period (None for the default); safe to call from any thread."""
+        self._command("interval", (ip, interval))
+
+    def set_probe(self, ip, probe):
+        """Probe ip with ("tcp" | "udp", port), or None for ICMP; safe to call from any thread."""
+        self._command("probe", (ip, probe))
+
+    def task_count(self):
+        """Return how many targets and blocks are scheduled, to make leaked probes visible."""
+        return len(self.scheduler) + self._one_off_sweeps
+
+    def start(self):
+        """Open the probers and start the engine thread."""
+        self.prober.open()
+        self.ports.open()
+        self.running = True
+        self._thread = Thread(target=self._run, name="probe-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the engine thread and close the probers."""
+        self.running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.prober.close()
+        self.ports.close()
+
+    def _command(self, action, arg):
+        self._commands.put((action, arg))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\x00")
+        except (BlockingIOError, OSError):
+            pass  # a wake-up is already pending
+
+    def _apply_commands(self, now):
+        applied = False
+        while True:
+            try:
+                action, arg = self._commands.get_nowait()
+            except queue.Empty:
+                if applied:
+                    self._count_sweeps()
+                return
+            applied = True
+            if action == "add":
+                self.scheduler.add(arg, now)
+            elif action == "add_many":
+                self.scheduler.add_many(arg, now)
+            elif action == "interval":
+                self.scheduler.set_interval(*arg, now)
+            elif action == "probe":
+                key, probe = arg
+                if probe is None:
+                    self._probes.pop(key, None)
+                else:
+                    self._probes[key] = probe
+            elif action == "add_block":
+                key, block, interval = arg
+                self._blocks[key] = block
+                self.scheduler.add(key, now)
+                self.scheduler.set_interval(key, interval)
+            elif action == "sweep":
+                key, block, on_done = arg
+                self._sweeps[key] = Sweep(key, block, self.sweep_rate, on_done, now)
+            else:
+                self.scheduler.remove(arg)
+                self._blocks.pop(arg, None)
+                self._sweeps.pop(arg, None)
+                self._probes.pop(arg, None)
+                self._cancel(arg)
+
+    def _count_sweeps(self):
+        # Recount on the engine thread so task_count() never iterates _sweeps from another thread
+        self._one_off_sweeps = sum(1 for key in self._sweeps if key not in self._blocks)
+
+    def _cancel(self, ip):
+        # Forget ip's outstanding requests so neither a late reply nor the timeout reports them
+        self._stalled.pop(ip, None)
+        burst = self._in_flight.pop(ip, None)
+        if burst is not None:
+            for seq in burst.seqs:
+                self._pending.pop(seq, None)
+                self.ports.discard(seq)
+
+    def _next_seq(self):
+        # A sequence number no outstanding request uses, or None when all 65536 are in use
+        for _ in range(0x10000):
+            self._seq = (self._seq + 1) & 0xFFFF
+            if self._seq not in self._pending:
+                return self._seq
+        return None
+
+    def _send_due(self, now):
+        for ip, (address, burst) in list(self._stalled.items()):
+            del self._stalled[ip]
+            if not self._send_burst(ip, address, burst):
+                return  # socket buffer still full
+        for ip, _, _ in self.scheduler.pop_due(now):
+            if ip in self._blocks:
+                if ip not in self._sweeps:  # skip a period if the last sweep is still running
+                    self._sweeps[ip] = Sweep(ip, self._blocks[ip], self.sweep_rate, self.on_sweep, now)
+                continue
+            if ip in self._in_flight:
+                continue  # previous burst has not been answered or timed out yet
+            address = self.resolve(ip)
+            if address is PENDING:
+                continue  # first resolution still running; try next period
+            if address is None:
+                self.on_result(ip, (None,) * self.burst)
+                continue
+            self._in_flight[ip] = burst = Burst(self.burst)
+            if not self._send_burst(ip, address, burst):
+                return  # socket buffer full; the rest of the burst and other due keys go on the next pass
+
+    def _send_burst(self, ip, address, burst):
+        # Send the rest of ip's burst; False if the socket buffer filled up, leaving it stalled
+        while burst.sent < len(burst.samples):
+            try:
+                seq = self._send(ip, address, None, burst, burst.sent)
+            except BlockingIOError:
+                self._stalled[ip] = (address, burst)
+                return False
+            burst.sent += 1
+            if seq is None:
+                burst.outstanding -= 1
+        if not burst.outstanding:
+            self._in_flight.pop(ip, None)
+            self.on_result(ip, tuple(burst.samples))
+        return True
+
+    def _send(self, key, address, sweep, burst=None, index=0):
+        # BlockingIOError (socket buffer full) propagates so the caller retries the request on the next pass
+        seq = self._next_seq()
+        if seq is None:
+            if sweep is None:
+                print(f"Error pinging {key}: no free ICMP sequence numbers")
+            return None
+        probe = self._probes.get(key) if sweep is None else None
+        try:
+            if probe is not None:
+                self.ports.send(probe, address, seq)
+            elif not self.prober.send(address, seq):
+                return None
+        except BlockingIOError:
+            raise
+        except OSError as e:
+            if sweep is None:
+                print(f"Error pinging {key}: {e}")
+            return None
+        sent_at = time.monotonic()
+        if self.first_probe_at is None:
+            self.first_probe_at = time.perf_counter()
+        self._pending[seq] = (key, sent_at, sweep, address, burst, index)
+        if burst is not None:
+            burst.seqs.append(seq)
+        self._sent_order.append((sent_at, seq))
+        return seq
+
+    def _advance_sweeps(self, now):
+        for key, sweep in list(self._sweeps.items()):
+            while not sweep.exhausted and sweep.next_send_at() <= now and len(self._pending) < MAX_SWEEP_PENDING:
+                ip = sweep.retry or next(sweep.addresses, None)
+                if ip is None:
+                    sweep.exhausted = True
+                    break
+                try:
+                    self._send(ip, ip, sweep)  # sweeps send one request per address
+                except BlockingIOError:
+                    sweep.retry = ip
+                    return  # socket buffer full, retry on the next pass
+                sweep.retry = None
+                sweep.sent += 1
+                sweep.last_sent_at = now
+            if sweep.exhausted and now - sweep.last_sent_at >= self.timeout:
+                del self._sweeps[key]
+                self._count_sweeps()
+                if sweep.on_done is not None:
+                    sweep.on_done(key, sweep.responders, sweep.sent)
+
+    def _handle_replies(self, replies):
+        for seq, source, received_at in replies:
+            entry = self._pending.get(seq)
+            if entry is None or entry[3] != source:
+                continue
+            del self._pending[seq]
+            key, sent_at, sweep, address, burst, index = entry
+            if sweep is not None:
+                sweep.responders[address] = received_at - sent_at
+            else:
+                burst.samples[index] = received_at - sent_at
+                self._settle(key, burst)
+
+    def _expire(self, now):
+        order = self._sent_order
+        while order and now - order[0][0] >= self.timeout:
+            _, seq = order.popleft()
+            entry = self._pending.pop(seq, None)
+            if entry is not None and entry[2] is None:
+                self.ports.discard(seq)
+                self._settle(entry[0], entry[4])
+
+    def _settle(self, ip, burst):
+        # One request of the burst was answered or timed out
+        burst.outstanding -= 1
+        if burst.outstanding:
+            return
+        self._in_flight.pop(ip, None)
+        self.on_result(ip, tuple(burst.samples))
+
+    def _next_wakeup(self, now):
+        deadlines = [self.timeout + self._sent_order[0][0]] if self._sent_order else []
+        next_due = self.scheduler.next_deadline()
+        if next_due is not None:
+            deadlines.append(next_due)
+        paused = len(self._pending) >= MAX_SWEEP_PENDING  # resumes once replies or expiries free sequence numbers
+        for sweep in self._sweeps.values():
+            if sweep.exhausted:
+                deadlines.append(sweep.last_sent_at + self.timeout)
+            elif sweep.retry is not None:
+                deadlines.append(now + SEND_RETRY_INTERVAL)
+            elif not paused:
+                deadlines.append(sweep.next_send_at())
+        if self._stalled:
+            deadlines.append(now + SEND_RETRY_INTERVAL)
+        for prober in (self.prober, self.ports):
+            next_reply = prober.next_wakeup()
+            if next_reply is not None:
+                deadlines.append(next_reply)
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - now)
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._wake_r, selectors.EVENT_READ)
+        for prober in (self.prober, self.ports):
+            for fileobj in prober.selectables():
+                selector.register(fileobj, selectors.EVENT_READ, prober)
+        while self.running:
+            now = time.monotonic()
+            self._apply_commands(now)
+            self._send_due(now)
+            self._advance_sweeps(now)
+            for key, _ in selector.select(self._next_wakeup(now)):
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._handle_replies(key.data.receive(key.fileobj))
+            now = time.monotonic()
+            self._handle_replies(self.prober.poll(now))
+            self._handle_replies(self.ports.poll(now))
+            self._expire(now)
+        selector.close()
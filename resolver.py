@@ -0,0 +1,119 @@
+import queue
+import socket
+import time
+from threading import Lock, Thread
+
+DNS_DEFAULT_TTL = 300  # Seconds a name is cached when the resolver reports no TTL
+DNS_NEGATIVE_TTL = 30  # Seconds a failed lookup is remembered before retrying
+DNS_REFRESH_AHEAD = 0.8  # Refresh in the background once this fraction of the TTL has passed
+DNS_WORKERS = 4  # Background resolver threads
+
+PENDING = object()  # lookup() result while a name's first resolution is still running
+
+
+def literal_address(text):
+    """Return text in canonical form if it is an IPv4 or IPv6 literal, else None.
+
+    Replies are matched by the address the socket reports, so "2001:DB8:0::1"
+    must be probed as "2001:db8::1".
+    """
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            return socket.inet_ntop(family, socket.inet_pton(family, text))
+        except OSError:
+            pass
+    return None
+
+
+def system_resolve(name):
+    """Resolve name to (address, ttl) with dnspython when installed, else getaddrinfo.
+
+    getaddrinfo does not expose TTLs, so its answers get DNS_DEFAULT_TTL.
+    """
+    try:
+        import dns.resolver
+    except ImportError:
+        infos = socket.getaddrinfo(name, None, proto=socket.IPPROTO_TCP)
+        # Prefer IPv4, matching what ping does for dual-stack names
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        return infos[0][4][0], DNS_DEFAULT_TTL
+    for record_type in ("A", "AAAA"):
+        try:
+            answer = dns.resolver.resolve(name, record_type)
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+            continue
+        return answer[0].to_text(), answer.rrset.ttl
+    raise OSError(f"no A or AAAA record for {name}")
+
+
+class ResolverCache:
+    """Name -> address cache that never blocks its caller.
+
+    lookup() only reads the cache. Misses and entries past DNS_REFRESH_AHEAD
+    of their TTL are queued for background worker threads, and the old
+    address keeps being served until the refresh lands. Failures are
+    cached for DNS_NEGATIVE_TTL. resolve(name) -> (address, ttl) can be
+    replaced, e.g. by a local stub in tests.
+    """
+
+    def __init__(self, resolve=system_resolve, negative_ttl=DNS_NEGATIVE_TTL, workers=DNS_WORKERS):
+        self.resolve = resolve
+        self.negative_ttl = negative_ttl
+        self._entries = {}  # name -> (address or None, refresh_at, expires_at)
+        self._queued = set()
+        self._lock = Lock()
+        self._queue = queue.SimpleQueue()
+        for n in range(workers):
+            Thread(target=self._run, name=f"resolver-{n}", daemon=True).start()
+
+    def lookup(self, name):
+        """Return name's address, None if it failed to resolve, or PENDING."""
+        entry = self._entries.get(name)
+        if entry is None:
+            address = literal_address(name)
+            if address is not None:
+                self._entries[name] = (address, float("inf"), float("inf"))
+                return address
+            self._request(name)
+            return PENDING
+        address, refresh_at, expires_at = entry
+        now = time.monotonic()
+        if now >= refresh_at:
+            self._request(name)
+        if address is None and now >= expires_at:
+            return PENDING  # negative entry expired; wait for the retry
+        return address
+
+    def prefetch(self, names):
+        """Start resolving names in the background."""
+        for name in names:
+            self.lookup(name)
+
+    def forget(self, name):
+        """Drop name from the cache."""
+        self._entries.pop(name, None)
+
+    def _request(self, name):
+        with self._lock:
+            if name in self._queued:
+                return
+            self._queued.add(name)
+        self._queue.put(name)
+
+    def _run(self):
+        while True:
+            name = self._queue.get()
+            try:
+                address, ttl = self.resolve(name)
+            except Exception:
+                address, ttl = None, self.negative_ttl
+            now = time.monotonic()
+            ttl = max(ttl, 1)
+            previous = self._entries.get(name)
+            if address is None and previous is not None and previous[0] is not None and now < previous[2]:
+                # Keep serving the last good answer until it really expires
+                address, ttl = previous[0], previous[2] - now
+            refresh_after = ttl if address is None else ttl * DNS_REFRESH_AHEAD
+            self._entries[name] = (address, now + refresh_after, now + ttl)
+            with self._lock:
+                self._queued.discard(name)
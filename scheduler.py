@@ -0,0 +1,138 @@
+import heapq
+
+from stats import LatencyHistogram
+
+GOLDEN_RATIO_FRACTION = 0.6180339887498949
+RATE_BURST = 0.1  # Seconds of rate budget that may be spent at once
+
+
+class Scheduler:
+    """Fire keys on an absolute period from a heap of deadlines.
+
+    Each key keeps a fixed phase within the interval, so its deadlines are
+    start + phase + k * interval no matter how long a probe took. Phases are
+    spread with a golden-ratio sequence, which keeps the send rate flat as
+    keys are added one at a time as well as in bulk.
+
+    With a rate set, a token bucket caps how many keys fire per second;
+    keys over budget stay due and fire late, skipping missed periods.
+    """
+
+    def __init__(self, interval, rate=None):
+        self.interval = interval  # default period; set_interval() overrides it per key
+        self.rate = rate  # most firings per second, or None for no limit
+        self._burst = max(1.0, rate * RATE_BURST) if rate else 0.0
+        self._tokens = self._burst
+        self._refilled_at = None
+        self._intervals = {}
+        self._last = {}  # key -> deadline it last fired at
+        self._heap = []  # (deadline, generation, key)
+        self._entries = {}  # key -> generation of its live heap entry
+        self._generation = 0
+        self._added = 0
+        self.lateness = {}  # key -> seconds the last firing was behind schedule
+        self.late_total = 0.0
+        self.late_max = 0.0
+        self.fired = 0
+        self.late_histogram = LatencyHistogram()  # every firing's lateness, for the stats report
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, now):
+        """Schedule key, staggered into the interval starting at now."""
+        if key in self._entries:
+            return
+        phase = (self._added * GOLDEN_RATIO_FRACTION) % 1.0
+        self._added += 1
+        self._push(key, now + phase * self.interval)
+
+    def add_many(self, keys, now):
+        """Schedule a batch of keys, building the heap in one pass."""
+        for key in keys:
+            if key in self._entries:
+                continue
+            phase = (self._added * GOLDEN_RATIO_FRACTION) % 1.0
+            self._added += 1
+            self._generation += 1
+            self._entries[key] = self._generation
+            self._heap.append((now + phase * self.interval, self._generation, key))
+        heapq.heapify(self._heap)
+
+    def remove(self, key):
+        """Unschedule key; its stale heap entry is dropped when reached."""
+        self._entries.pop(key, None)
+        self._intervals.pop(key, None)
+        self._last.pop(key, None)
+        self.lateness.pop(key, None)
+
+    def set_interval(self, key, interval, now=None):
+        """Change key's period; None restores the default.
+
+        A key that has fired is rescheduled one new period after its last
+        firing (but not before now), so shortening the period takes effect
+        right away.
+        """
+        previous = self._intervals.get(key, self.interval)
+        if interval is None or interval == self.interval:
+            self._intervals.pop(key, None)
+        elif key in self._entries:
+            self._intervals[key] = interval
+        current = self._intervals.get(key, self.interval)
+        if current != previous and key in self._last and key in self._entries:
+            deadline = self._last[key] + current
+            self._push(key, deadline if now is None else max(deadline, now))
+
+    def next_deadline(self):
+        """Return the earliest live deadline, or None when nothing is scheduled."""
+        heap = self._heap
+        while heap and self._entries.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        if self.rate and self._tokens < 1:
+            # Out of budget: nothing can fire before the next token arrives
+            return max(heap[0][0], self._refilled_at + (1 - self._tokens) / self.rate)
+        return heap[0][0]
+
+    def pop_due(self, now):
+        """Yield (key, deadline, lateness) for every key due at now, within the rate budget, and reschedule it."""
+        heap = self._heap
+        if self.rate:
+            if self._refilled_at is not None:
+                self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+        while heap and heap[0][0] <= now:
+            if self.rate and self._tokens < 1:
+                return
+            deadline, generation, key = heapq.heappop(heap)
+            if self._entries.get(key) != generation:
+                continue
+            if self.rate:
+                self._tokens -= 1
+            self._last[key] = deadline
+            late = now - deadline
+            self.lateness[key] = late
+            self.late_total += late
+            self.late_max = max(self.late_max, late)
+            self.late_histogram.observe(late)
+            self.fired += 1
+            # Skip whole periods that were missed instead of firing a burst
+            interval = self._intervals.get(key, self.interval)
+            missed = int(late // interval)
+            self._push(key, deadline + (missed + 1) * interval)
+            yield key, deadline, late
+
+    def lateness_summary(self):
+        """Return (fired, mean lateness, max lateness) and reset the counters."""
+        fired, total, worst = self.fired, self.late_total, self.late_max
+        self.fired, self.late_total, self.late_max = 0, 0.0, 0.0
+        return fired, (total / fired if fired else 0.0), worst
+
+    def _push(self, key, deadline):
+        self._generation += 1
+        self._entries[key] = self._generation
+        heapq.heappush(self._heap, (deadline, self._generation, key))
@@ -0,0 +1,319 @@
+import math
+import multiprocessing
+import queue
+import struct
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from threading import Thread
+
+NAN = float("nan")
+SHARD_MIN_SLOTS = 4096  # Smallest results table allocated for a sharded monitor
+SHARD_POLL_INTERVAL = 0.05  # Seconds between reads of the workers' update rings
+
+
+class ResultsTable:
+    """Fixed-layout probe results shared between processes.
+
+    Target slot i owns rtt[i * burst:(i + 1) * burst] (one round trip per
+    request of its latest burst in seconds, NaN = lost), updated_at[i]
+    (unix time) and version[i], a sequence lock that is odd while the slot
+    is being written. Each worker also owns a ring of updated slot numbers
+    and a head counter, so the reader can find new results without
+    scanning the table or exchanging pickled messages.
+    """
+
+    def __init__(self, capacity, workers, ring_size, burst=1, name=None):
+        self.capacity = capacity
+        self.workers = workers
+        self.ring_size = ring_size
+        self.burst = burst
+        size = capacity * 8 * (burst + 1) + workers * 8 * 2 + capacity * 4 + workers * ring_size * 4
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        offset = 0
+
+        def column(fmt, count):
+            nonlocal offset
+            start, offset = offset, offset + count * struct.calcsize(fmt)
+            return buf[start:offset].cast(fmt)
+
+        # 8-byte columns first so every column stays naturally aligned
+        self.rtt = column("d", capacity * burst)
+        self.updated_at = column("d", capacity)
+        self.heads = column("Q", workers)  # updates published by each worker
+        self.first_probe_at = column("d", workers)  # perf_counter() of each worker's first send
+        self.version = column("I", capacity)
+        self.rings = column("I", workers * ring_size)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, worker, slot, samples):
+        """Store one burst's round trips in slot and publish it on worker's ring."""
+        version = self.version[slot]
+        self.version[slot] = version + 1
+        base = slot * self.burst
+        for index, response_time in enumerate(samples):
+            self.rtt[base + index] = NAN if response_time is None else response_time
+        self.updated_at[slot] = time.time()
+        self.version[slot] = version + 2
+        head = self.heads[worker]
+        self.rings[worker * self.ring_size + head % self.ring_size] = slot
+        self.heads[worker] = head + 1
+
+    def read(self, slot):
+        """Return slot's (samples, updated_at, version), retrying torn reads."""
+        base = slot * self.burst
+        while True:
+            before = self.version[slot]
+            samples = self.rtt[base:base + self.burst].tolist()
+            updated_at = self.updated_at[slot]
+            if before % 2 == 0 and self.version[slot] == before:
+                return tuple(None if rtt != rtt else rtt for rtt in samples), updated_at, before
+
+    def close(self, unlink=False):
+        for view in (self.rtt, self.updated_at, self.heads, self.first_probe_at, self.version, self.rings):
+            view.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def worker_main(table_name, worker, capacity, workers, ring_size, burst, commands, interval, timeout, max_rate):
+    """Entry point of a probe worker process: run a ProbeEngine for one shard."""
+    from probe_engine import ProbeEngine
+    from resolver import ResolverCache
+
+    table = ResultsTable(capacity, workers, ring_size, burst, name=table_name)
+    slots = {}  # ip -> slot
+
+    def on_result(ip, samples):
+        slot = slots.get(ip)
+        if slot is not None:
+            table.write(worker, slot, samples)
+
+    resolver = ResolverCache()
+    engine = ProbeEngine(on_result, interval=interval, timeout=timeout, resolve=resolver.lookup, max_rate=max_rate,
+                         burst=burst)
+    engine.start()
+    try:
+        while True:
+            try:
+                action, arg = commands.get(timeout=1)
+            except queue.Empty:
+                action, arg = None, None
+            if engine.first_probe_at is not None and not table.first_probe_at[worker]:
+                table.first_probe_at[worker] = engine.first_probe_at
+            if action == "add":
+                for ip, slot, probe in arg:
+                    slots[ip] = slot
+                    if probe is not None:
+                        engine.set_probe(ip, probe)
+                resolver.prefetch(ip for ip, _, _ in arg)
+                engine.add_many([ip for ip, _, _ in arg])
+            elif action == "remove":
+                slots.pop(arg, None)
+                resolver.forget(arg)
+                engine.remove(arg)
+            elif action == "interval":
+                engine.set_interval(*arg)
+            elif action == "probe":
+                engine.set_probe(*arg)
+            elif action == "stop":
+                break
+    except KeyboardInterrupt:
+        pass  # the parent stops workers itself
+    finally:
+        engine.stop()
+        table.close()
+
+
+class ShardedEngine:
+    """ProbeEngine stand-in that spreads single targets over worker processes.
+
+    Each worker runs its own ProbeEngine on its share of the targets and
+    writes results into a shared ResultsTable. A reader thread in this
+    process follows the workers' update rings and calls on_result(ip,
+    samples) as ProbeEngine would. Blocks, sweeps and any targets
+    beyond the table's capacity run on a local ProbeEngine, whose results
+    are queued to the same reader thread, so on_result and on_sweep are
+    only ever called from one thread.
+    """
+
+    def __init__(self, on_result, workers, capacity, interval=5, timeout=2, on_sweep=None, resolve=None,
+                 max_rate=None, burst=1):
+        from probe_engine import ProbeEngine, resolve_literal
+
+        self.on_result = on_result
+        self.workers = workers
+        self.capacity = max(capacity, SHARD_MIN_SLOTS)
+        self.ring_size = max(SHARD_MIN_SLOTS, 2 * math.ceil(self.capacity / workers))
+        self.table = ResultsTable(self.capacity, workers, self.ring_size, burst)
+        self.on_sweep = on_sweep
+        self._local_results = queue.SimpleQueue()  # (callback, args) from the local engine's thread
+        self.local = ProbeEngine(self._queue_result, interval=interval, timeout=timeout,
+                                 on_sweep=self._queue_sweep if on_sweep is not None else None,
+                                 resolve=resolve or resolve_literal, max_rate=max_rate, burst=burst)
+        self.scheduler = self.local.scheduler
+        self.slots = {}  # ip -> slot
+        self.probes = {}  # ip -> (protocol, port) for targets not probed with ICMP
+        self.keys = [None] * self.capacity  # slot -> ip
+        self._free = deque(range(self.capacity - 1, -1, -1))  # pop() takes the lowest free slot
+        self._tails = [0] * workers
+        self._seen = [0] * self.capacity  # version last delivered per slot
+        context = multiprocessing.get_context("spawn")
+        self._commands = [context.Queue() for _ in range(workers)]
+        per_worker_rate = max_rate / workers if max_rate else None
+        self._processes = [context.Process(target=worker_main, name=f"probe-worker-{n}", daemon=True,
+                                           args=(self.table.name, n, self.capacity, workers, self.ring_size,
+                                                 burst, self._commands[n], interval, timeout, per_worker_rate))
+                           for n in range(workers)]
+        self.running = False
+        self._thread = None
+
+    @property
+    def first_probe_at(self):
+        started = [t for t in self.table.first_probe_at if t] + (
+            [self.local.first_probe_at] if self.local.first_probe_at is not None else [])
+        return min(started) if started else None
+
+    def add(self, ip):
+        self.add_many([ip])
+
+    def add_many(self, ips):
+        batches = [[] for _ in range(self.workers)]
+        for ip in ips:
+            if ip in self.slots:
+                continue
+            if not self._free:
+                # Table full; probe it in this process instead
+                if ip in self.probes:
+                    self.local.set_probe(ip, self.probes[ip])
+                self.local.add(ip)
+                continue
+            slot = self._free.pop()
+            self.slots[ip] = slot
+            self.keys[slot] = ip
+            batches[slot % self.workers].append((ip, slot, self.probes.get(ip)))
+        for worker, batch in enumerate(batches):
+            if batch:
+                self._commands[worker].put(("add", batch))
+
+    def remove(self, ip):
+        self.probes.pop(ip, None)
+        slot = self.slots.pop(ip, None)
+        if slot is None:
+            self.local.remove(ip)
+            return
+        self._commands[slot % self.workers].put(("remove", ip))
+        self.keys[slot] = None
+        self._free.appendleft(slot)  # reuse freed slots last, after in-flight writes have landed
+
+    def set_interval(self, ip, interval):
+        slot = self.slots.get(ip)
+        if slot is None:
+            self.local.set_interval(ip, interval)
+        else:
+            self._commands[slot % self.workers].put(("interval", (ip, interval)))
+
+    def set_probe(self, ip, probe):
+        # Remembered for add_many(), which hands it to the target's worker with the target
+        if probe is None:
+            self.probes.pop(ip, None)
+        else:
+            self.probes[ip] = probe
+        slot = self.slots.get(ip)
+        if slot is None:
+            self.local.set_probe(ip, probe)
+        else:
+            self._commands[slot % self.workers].put(("probe", (ip, probe)))
+
+    def task_count(self):
+        return len(self.slots) + self.local.task_count()
+
+    def add_block(self, key, block, interval):
+        self.local.add_block(key, block, interval)
+
+    def sweep(self, key, block, on_done):
+        self.local.sweep(key, block, on_done)
+
+    def latest(self, ip):
+        """Return ip's latest (samples, unix time) straight from the shared table."""
+        slot = self.slots.get(ip)
+        if slot is None:
+            return None
+        samples, updated_at, _ = self.table.read(slot)
+        return samples, updated_at
+
+    def start(self):
+        for process in self._processes:
+            process.start()
+        self.local.start()
+        self.running = True
+        self._thread = Thread(target=self._run, name="shard-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        for commands in self._commands:
+            commands.put(("stop", None))
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self.local.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.table.close(unlink=True)
+
+    def _queue_result(self, ip, samples):
+        self._local_results.put((self.on_result, (ip, samples)))
+
+    def _queue_sweep(self, key, responders, total):
+        self._local_results.put((self.on_sweep, (key, responders, total)))
+
+    def _run(self):
+        while self.running:
+            for worker in range(self.workers):
+                self._drain(worker)
+            self._deliver_local(SHARD_POLL_INTERVAL)
+
+    def _deliver_local(self, timeout):
+        # Pass on the local engine's results as they arrive until the next poll of the rings
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                callback, args = self._local_results.get(timeout=remaining)
+            except queue.Empty:
+                return
+            callback(*args)
+
+    def _drain(self, worker):
+        table = self.table
+        head = table.heads[worker]
+        tail = self._tails[worker]
+        if head - tail > self.ring_size:
+            # The ring wrapped before it was read: fall back to a scan of the shard
+            updated = [slot for slot in range(worker, self.capacity, self.workers)
+                       if table.version[slot] != self._seen[slot]]
+        else:
+            base = worker * self.ring_size
+            updated = [table.rings[base + n % self.ring_size] for n in range(tail, head)]
+        self._tails[worker] = head
+        for slot in updated:
+            ip = self.keys[slot]
+            if ip is None:
+                continue  # removed since the worker wrote it
+            samples, _, version = table.read(slot)
+            if version == self._seen[slot]:
+                continue  # listed twice on the ring; already delivered
+            self._seen[slot] = version
+            self.on_result(ip, samples)
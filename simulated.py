@@ -0,0 +1,109 @@
+import heapq
+import math
+import random
+import socket
+import struct
+import time
+
+SIM_BASE_ADDRESS = "10.0.0.1"  # First address handed out by simulated_network()
+
+
+def normal_latency(mean, stddev):
+    """Latency model: normally distributed RTT in seconds, clipped at zero."""
+    return lambda rng: max(0.0, rng.gauss(mean, stddev))
+
+
+def lognormal_latency(median, sigma):
+    """Latency model: log-normal RTT with the given median, for long-tailed links."""
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+class SimulatedHost:
+    """Reply behaviour of one simulated address.
+
+    latency(rng) draws an RTT in seconds. Each request is lost with
+    probability loss. A flapping host is down for down_for seconds out of
+    every flap_every, starting phase seconds into the cycle.
+    """
+
+    __slots__ = ("latency", "loss", "flap_every", "down_for", "phase")
+
+    def __init__(self, latency, loss=0.0, flap_every=None, down_for=0.0, phase=0.0):
+        self.latency = latency
+        self.loss = loss
+        self.flap_every = flap_every
+        self.down_for = down_for
+        self.phase = phase
+
+    def is_up(self, now):
+        if self.flap_every is None:
+            return True
+        return (now + self.phase) % self.flap_every >= self.down_for
+
+
+class SimulatedProber:
+    """Probe backend that answers from a model of hosts instead of the network.
+
+    Implements the IcmpProber interface. Replies are queued on a heap by
+    arrival time and handed to the engine through poll(), so no sockets or
+    privileges are needed and thousands of hosts cost only memory.
+    """
+
+    def __init__(self, hosts, seed=0):
+        self.hosts = hosts  # address -> SimulatedHost
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.replied = 0
+        self._replies = []  # (arrival time, seq, address)
+
+    def open(self):
+        pass
+
+    def close(self):
+        self._replies = []
+
+    def selectables(self):
+        return []
+
+    def send(self, address, seq):
+        host = self.hosts.get(address)
+        if host is None:
+            raise OSError(f"simulated host {address} does not exist")
+        self.sent += 1
+        now = time.monotonic()
+        if host.is_up(now) and self.rng.random() >= host.loss:
+            heapq.heappush(self._replies, (now + host.latency(self.rng), seq, address))
+        return True
+
+    def receive(self, fileobj):
+        return ()
+
+    def poll(self, now):
+        replies = self._replies
+        while replies and replies[0][0] <= now:
+            arrival, seq, address = heapq.heappop(replies)
+            self.replied += 1
+            yield seq, address, arrival
+
+    def next_wakeup(self):
+        return self._replies[0][0] if self._replies else None
+
+
+def simulated_network(count, latency=None, loss=0.01, flapping=0.05, flap_every=60.0, down_for=20.0, seed=0):
+    """Build a SimulatedProber for count hosts and return (prober, addresses).
+
+    Addresses are consecutive from SIM_BASE_ADDRESS. A flapping fraction of
+    the hosts go down for down_for seconds every flap_every, at random phases.
+    """
+    rng = random.Random(seed)
+    latency = latency if latency is not None else lognormal_latency(0.020, 0.5)
+    first = struct.unpack("!I", socket.inet_aton(SIM_BASE_ADDRESS))[0]
+    hosts = {}
+    for n in range(count):
+        address = socket.inet_ntoa(struct.pack("!I", first + n))
+        if rng.random() < flapping:
+            hosts[address] = SimulatedHost(latency, loss, flap_every, down_for, rng.uniform(0, flap_every))
+        else:
+            hosts[address] = SimulatedHost(latency, loss)
+    return SimulatedProber(hosts, seed), list(hosts)
@@ -0,0 +1,93 @@
+import os
+import struct
+import time
+from array import array
+
+NAN = float("nan")
+SNAPSHOT_MAGIC = b"PNGSNAP1"
+SNAPSHOT_HEADER = struct.Struct("<8sdIII")  # magic, saved at, targets, samples per target, key bytes
+# up, misses, samples kept, probes, lost, received, rtt sum, ewma, jitter, loss ewma, prev rtt,
+# last rtt, last seen, updated at, changed at (NaN = None)
+SNAPSHOT_RECORD = struct.Struct("<BIIQQQddddddddd")
+SNAPSHOT_SAMPLES = 120  # Newest RTT samples saved per target
+
+
+def _float(value):
+    return NAN if value is None else value
+
+
+def _optional(value):
+    return None if value != value else value
+
+
+def save_snapshot(monitor, path, samples=SNAPSHOT_SAMPLES):
+    """Write the monitor's target table and recent history to path, atomically.
+
+    The file is a header, the newline-joined target keys, one fixed-size
+    record per target and a block of samples doubles per target, so it is
+    written and read with a handful of bulk operations.
+    """
+    states = list(monitor.table.values())
+    keys = "\n".join(state.ip for state in states).encode("utf-8")
+    records = bytearray(SNAPSHOT_RECORD.size * len(states))
+    history = array("d", bytes(8 * samples * len(states)))
+    for n, state in enumerate(states):
+        kept = 0
+        if state.history is not None:
+            recent = state.history.latest(samples)
+            kept = len(recent)
+            history[n * samples:n * samples + kept] = recent
+        SNAPSHOT_RECORD.pack_into(records, n * SNAPSHOT_RECORD.size, state.up, state.misses, kept, state.probes,
+                                  state.lost, state.received, state.rtt_sum, _float(state.ewma), state.jitter,
+                                  state.loss_ewma, _float(state.prev_rtt), _float(state.last_rtt),
+                                  _float(state.last_seen), _float(state.updated_at), _float(state.changed_at))
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, time.time(), len(states), samples, len(keys)))
+        f.write(keys)
+        f.write(records)
+        history.tofile(f)
+    os.replace(temporary, path)
+    return len(states)
+
+
+def load_snapshot(monitor, path):
+    """Restore saved state into the monitor's targets that are still configured.
+
+    Returns (targets restored, unix time the snapshot was saved), or None
+    when there is no usable snapshot.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < SNAPSHOT_HEADER.size:
+        return None
+    magic, saved_at, count, samples, key_bytes = SNAPSHOT_HEADER.unpack_from(data, 0)
+    records_at = SNAPSHOT_HEADER.size + key_bytes
+    history_at = records_at + count * SNAPSHOT_RECORD.size
+    if magic != SNAPSHOT_MAGIC or len(data) != history_at + 8 * samples * count:
+        return None
+    keys = data[SNAPSHOT_HEADER.size:records_at].decode("utf-8").split("\n") if count else []
+    history = array("d")
+    history.frombytes(data[history_at:])
+    restored = 0
+    table = monitor.table
+    for n, record in enumerate(SNAPSHOT_RECORD.iter_unpack(data[records_at:history_at])):
+        state = table.get(keys[n])
+        if state is None:
+            continue  # no longer in the target list
+        (up, state.misses, kept, state.probes, state.lost, state.received, state.rtt_sum, ewma, state.jitter,
+         state.loss_ewma, prev_rtt, last_rtt, last_seen, updated_at, changed_at) = record
+        state.up = bool(up)
+        state.ewma = _optional(ewma)
+        state.prev_rtt = _optional(prev_rtt)
+        state.last_rtt = _optional(last_rtt)
+        state.last_seen = _optional(last_seen)
+        state.updated_at = _optional(updated_at)
+        state.changed_at = _optional(changed_at)
+        if kept:
+            monitor.history_for(state).extend(history[n * samples:n * samples + kept])
+        restored += 1
+    return restored, saved_at
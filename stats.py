@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Upper bounds in seconds of the latency histogram buckets: 10 us doubling up to ~10 s (+Inf is implicit)
+LATENCY_BUCKETS = tuple(0.00001 * 2 ** n for n in range(21))
+PROFILE_INTERVAL = 0.005  # Seconds between stack samples of the sampling profiler
+PROFILE_DEPTH = 40  # Innermost frames kept per sampled stack
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in seconds, cheap enough for the hot path.
+
+    observe() is one bisect and a few increments and takes no lock: the
+    histogram has a single writer thread and readers tolerate a sample
+    being counted in one field a moment before another.
+    """
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding quantile q (the max for the last bucket), or None."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        """Return 'n=…, mean/p50/p99/max' in milliseconds."""
+        if not self.count:
+            return "n=0"
+        return (f"n={self.count} mean {self.total / self.count * 1000:.2f} ms, p50 {self.quantile(0.5) * 1000:.2f} ms, "
+                f"p99 {self.quantile(0.99) * 1000:.2f} ms, max {self.max * 1000:.2f} ms")
+
+
+class Stats:
+    """Hot-path counters of one Monitor, rendered on demand for the stats pane and --stats.
+
+    The probe path feeds rtt, the scheduler its own late_histogram and the
+    UI or headless loop tick; queue depths and thread counts are sampled
+    when a report is built, so reading them costs nothing in between.
+    """
+
+    def __init__(self):
+        self.rtt = LatencyHistogram()  # send-to-reply time of answered probes
+        self.lost = 0  # probes that timed out or failed
+        self.results = 0  # bursts recorded
+        self.tick = LatencyHistogram()  # duration of one queue-processing tick
+        self.queue_peaks = {}  # queue name -> deepest depth seen by sample_queues()
+        self.started_at = time.monotonic()
+
+    def observe_burst(self, samples):
+        # Called for every recorded burst from the probe engine's thread
+        self.results += 1
+        rtt = self.rtt
+        for response_time in samples:
+            if response_time is None:
+                self.lost += 1
+            else:
+                rtt.observe(response_time)
+
+    def sample_queues(self, monitor):
+        """Return {name: depth} of the monitor's queues and keep each one's peak."""
+        depths = {"status_queue": monitor.status_queue.qsize(), "log_queue": monitor.log_queue.qsize(),
+                  "popup_queue": monitor.popup_queue.qsize()}
+        peaks = self.queue_peaks
+        for name, depth in depths.items():
+            peaks[name] = max(peaks.get(name, 0), depth)
+        return depths
+
+    def report(self, monitor):
+        """Return the current figures as a list of (label, text) rows."""
+        uptime = time.monotonic() - self.started_at
+        rows = [("uptime", f"{uptime:.0f} s"),
+                ("targets", f"{len(monitor)} ({monitor.task_count()} probe tasks)"),
+                ("threads", str(threading.active_count())),
+                ("bursts", f"{self.results} ({self.results / uptime if uptime else 0.0:.1f}/s), {self.lost} probes lost"),
+                ("probe rtt", self.rtt.summary())]
+        scheduler = getattr(monitor.engine, "scheduler", None)
+        if scheduler is not None:
+            rows.append(("sched late", scheduler.late_histogram.summary()))
+        for name, depth in self.sample_queues(monitor).items():
+            rows.append((name, f"{depth} (peak {self.queue_peaks[name]})"))
+        rows.append(("tick", self.tick.summary()))
+        return rows
+
+
+def format_report(rows):
+    """Render report() rows as aligned text lines."""
+    width = max(len(label) for label, _ in rows)
+    return "\n".join(f"{label:>{width}}  {text}" for label, text in rows)
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler: samples every thread's stack at a fixed period.
+
+    Stacks are counted in collapsed form ("thread;outer;...;inner"), which
+    flamegraph.pl and speedscope read directly, so finding where time goes
+    at thousands of targets needs no external tracer. Sampling costs one
+    sys._current_frames() walk per interval in its own thread. Samples are
+    wall-clock, so an idle thread is counted at the line it waits on. stop()
+    writes the stacks to path and prints the hottest frames.
+    """
+
+    def __init__(self, path, interval=PROFILE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+        try:
+            self.write(self.path)
+        except OSError as e:
+            print(f"Error writing profile {self.path}: {e}")
+            return
+        print(f"Profile: {self.samples} samples written to {self.path}; hottest frames:")
+        for share, frame in self.top():
+            print(f"  {share * 100:5.1f}%  {frame}")
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, n=15):
+        """Return [(share of samples, innermost frame)] for the n frames most often on top of a stack."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [(count / total, frame) for frame, count in leaves.most_common(n)]
+
+    def write(self, path):
+        """Write the collapsed stacks to path, one "stack count" line each."""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
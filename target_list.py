@@ -0,0 +1,322 @@
+import math
+import tkinter as tk
+from tkinter import Canvas, Frame, Scrollbar
+
+ROW_HEIGHT = 22
+# Column x offsets and widths in pixels: address, name, status, response time, sparkline
+COLUMNS = {"ip": (4, 120), "name": (128, 130), "status": (264, 76), "rtt": (348, 80), "spark": (432, 60)}
+SPARK_POINTS = 31  # Newest RTT samples drawn per sparkline, oldest on the left
+SPARK_MIN = 0.0005  # Seconds at the bottom of the sparkline's fixed log scale
+SPARK_MAX = 1.0  # Seconds at the top; the fixed scale means a new sample never rescales old ones
+
+
+class Sparkline:
+    """Pooled line segments of one visible slot's sparkline.
+
+    Segment items are recycled in a ring: a new sample moves the whole
+    line one step left with a single tag move and re-points the segment
+    that fell off the left edge at the new right-hand end, so each sample
+    costs a few canvas calls no matter how long the line is.
+    """
+
+    __slots__ = ("items", "tag", "first", "key", "history", "head", "last_y")
+
+    def __init__(self, items, tag):
+        self.items = items  # segment item ids; items[first] is the leftmost
+        self.tag = tag
+        self.first = 0
+        self.key = None  # row drawn in the slot
+        self.history = None  # that row's RingBuffer, when it has one
+        self.head = None  # history.head when last drawn
+        self.last_y = None  # y of the newest point, None when it was lost
+
+
+class TargetList(Frame):
+    """Scrolling target list that only draws the rows in view.
+
+    Rows live in a plain model (key -> [name, status, rtt text]); the canvas
+    holds one pooled set of items per visible slot, which are re-pointed at
+    different model rows as the list scrolls. Theme changes, selection and
+    status updates therefore touch O(visible rows) canvas items no matter
+    how many targets are loaded.
+    """
+
+    def __init__(self, master, theme, on_select=None):
+        super().__init__(master)
+        self.theme = theme
+        self.on_select = on_select
+        self.order = []  # keys in row order
+        self.index = {}  # key -> row number
+        self.rows = {}  # key -> [name, status (None/True/False), rtt text]
+        self.selected = None
+        self.top = 0  # first row in view
+        self.slots = []  # pooled canvas item ids, one dict per visible slot
+        self.sparks = []  # Sparkline per visible slot
+        self.history_source = None  # key -> RingBuffer of recent RTTs or None; enables sparklines
+        self.canvas = Canvas(self, highlightthickness=0)
+        self.scrollbar = Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.bind("<Configure>", lambda e: self._resize(e.height))
+        self.canvas.bind("<Button-1>", self._click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 * (e.delta // 120), "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))  # Linux/macOS
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))  # Linux/macOS
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.order)
+
+    def items(self):
+        """Return (key, name) pairs in display order."""
+        return [(key, self.rows[key][0]) for key in self.order]
+
+    def add(self, key, name):
+        """Append a row for key."""
+        if key in self.rows:
+            return
+        self.index[key] = len(self.order)
+        self.order.append(key)
+        self.rows[key] = [name, None, "N/A"]
+        if self.index[key] < self.top + len(self.slots):
+            self._draw_row(key)
+        self._update_scrollbar()
+
+    def remove(self, key):
+        """Delete key's row."""
+        row = self.index.pop(key, None)
+        if row is None:
+            return
+        del self.order[row]
+        del self.rows[key]
+        for later in self.order[row:]:
+            self.index[later] -= 1
+        if self.selected == key:
+            self.selected = None
+        self.top = self._clamp_top(self.top)
+        self.redraw()
+
+    def rename(self, old_key, new_key, name):
+        """Move old_key's row to new_key with a new name, resetting its status."""
+        row = self.index.pop(old_key)
+        del self.rows[old_key]
+        self.order[row] = new_key
+        self.index[new_key] = row
+        self.rows[new_key] = [name, None, "N/A"]
+        if self.selected == old_key:
+            self.selected = None
+        self._draw_row(new_key)
+
+    def set_name(self, key, name):
+        """Change the name shown for key."""
+        values = self.rows.get(key)
+        if values is not None and values[0] != name:
+            values[0] = name
+            self._draw_row(key)
+
+    def set_status(self, key, status, rtt_text):
+        """Set key's status and response time; returns False if nothing changed."""
+        values = self.rows.get(key)
+        if values is None or (values[1] == status and values[2] == rtt_text):
+            return False
+        values[1] = status
+        values[2] = rtt_text
+        self._draw_row(key)
+        return True
+
+    def select(self, key):
+        """Highlight key's row (or clear the highlight when key is None)."""
+        previous = self.selected
+        self.selected = key if key in self.rows else None
+        if previous in self.rows:
+            self._draw_row(previous)
+        if self.selected is not None:
+            self._draw_row(self.selected)
+        return self.selected
+
+    def apply_theme(self, theme):
+        """Recolour the canvas and the visible rows."""
+        self.theme = theme
+        self.configure(bg=theme["frame_bg"])
+        self.canvas.configure(bg=theme["canvas_bg"])
+        for spark in self.sparks:
+            self.canvas.itemconfigure(spark.tag, fill=theme["label_fg"])
+        self.redraw()
+
+    def advance_sparklines(self):
+        """Append new samples to the visible sparklines; call once per UI tick."""
+        if self.history_source is None:
+            return
+        for slot, spark in enumerate(self.sparks):
+            if spark.key is None:
+                continue
+            history = self.history_source(spark.key)
+            if history is not spark.history:
+                self._draw_spark(slot, spark.key)
+                continue
+            if history is None:
+                continue
+            added = (history.head - spark.head) % history.capacity
+            if added == 0:
+                continue
+            if added >= SPARK_POINTS:
+                self._draw_spark(slot, spark.key)
+                continue
+            samples = history.latest(added)
+            spark.head = history.head
+            for rtt in samples:
+                self._push_spark(slot, spark, rtt)
+
+    def yview(self, *args):
+        """Scrollbar and mouse wheel callback; moves the first visible row."""
+        visible = len(self.slots)
+        if args[0] == "moveto":
+            top = int(float(args[1]) * len(self.order))
+        else:
+            step = visible if args[2] == "pages" else 1
+            top = self.top + int(args[1]) * step
+        top = self._clamp_top(top)
+        if top != self.top:
+            self.top = top
+            self.redraw()
+
+    def redraw(self):
+        """Re-point every pooled slot at the row now shown in it."""
+        for slot in range(len(self.slots)):
+            row = self.top + slot
+            self._draw_slot(slot, self.order[row] if row < len(self.order) else None)
+        self._update_scrollbar()
+
+    def _clamp_top(self, top):
+        # The last slot is only partly on screen, so scrolling stops with the last row in the one above it
+        return max(0, min(top, len(self.order) - len(self.slots) + 1))
+
+    def _resize(self, height):
+        wanted = height // ROW_HEIGHT + 1
+        while len(self.slots) < wanted:
+            self.slots.append(self._create_slot(len(self.slots)))
+            self.sparks.append(self._create_spark(len(self.sparks)))
+        while len(self.slots) > wanted:
+            for item in self.slots.pop().values():
+                self.canvas.delete(item)
+            self.canvas.delete(self.sparks.pop().tag)
+        self.redraw()
+
+    def _create_slot(self, slot):
+        y = slot * ROW_HEIGHT
+        mid = y + ROW_HEIGHT // 2
+        c = self.canvas
+        status_x, status_w = COLUMNS["status"]
+        return {
+            "bg": c.create_rectangle(0, y, COLUMNS["ip"][0] + COLUMNS["ip"][1], y + ROW_HEIGHT - 2, width=0),
+            "ip": c.create_text(COLUMNS["ip"][0], mid, anchor="w"),
+            "name": c.create_text(COLUMNS["name"][0], mid, anchor="w", width=COLUMNS["name"][1]),
+            "status_bg": c.create_rectangle(status_x, y + 1, status_x + status_w, y + ROW_HEIGHT - 3, width=0),
+            "status": c.create_text(status_x + status_w // 2, mid),
+            "rtt": c.create_text(COLUMNS["rtt"][0], mid, anchor="w"),
+        }
+
+    def _create_spark(self, slot):
+        tag = f"spark{slot}"
+        items = [self.canvas.create_line(0, 0, 0, 0, width=1, state="hidden", tags=(tag,))
+                 for _ in range(SPARK_POINTS - 1)]
+        return Sparkline(items, tag)
+
+    def _spark_y(self, slot, rtt):
+        # Fixed log scale, so 5 ms and 900 ms stay apart on every row
+        if rtt != rtt:
+            return None
+        top = slot * ROW_HEIGHT + 3
+        height = ROW_HEIGHT - 8
+        span = math.log(max(SPARK_MIN, min(SPARK_MAX, rtt)) / SPARK_MIN) / math.log(SPARK_MAX / SPARK_MIN)
+        return top + height * (1 - span)
+
+    def _draw_spark(self, slot, key):
+        # Lay the whole line out again: the slot shows a different row or fell too far behind
+        spark = self.sparks[slot]
+        c = self.canvas
+        spark.key = key
+        history = self.history_source(key) if key is not None and self.history_source is not None else None
+        spark.history = history
+        if history is None:
+            spark.head = None
+            c.itemconfigure(spark.tag, state="hidden")
+            return
+        spark.head = history.head
+        samples = history.latest(SPARK_POINTS)
+        ys = [None] * (SPARK_POINTS - len(samples)) + [self._spark_y(slot, rtt) for rtt in samples]
+        x, width = COLUMNS["spark"]
+        step = width / (SPARK_POINTS - 1)
+        spark.first = 0
+        c.itemconfigure(spark.tag, fill=self.theme["label_fg"])
+        for n, item in enumerate(spark.items):
+            y0, y1 = ys[n], ys[n + 1]
+            if y0 is None or y1 is None:
+                c.itemconfigure(item, state="hidden")
+            else:
+                c.coords(item, x + n * step, y0, x + (n + 1) * step, y1)
+                c.itemconfigure(item, state="normal")
+        spark.last_y = ys[-1]
+
+    def _push_spark(self, slot, spark, rtt):
+        c = self.canvas
+        x, width = COLUMNS["spark"]
+        step = width / (SPARK_POINTS - 1)
+        y = self._spark_y(slot, rtt)
+        c.move(spark.tag, -step, 0)
+        item = spark.items[spark.first]
+        spark.first = (spark.first + 1) % len(spark.items)
+        if y is None or spark.last_y is None:
+            c.itemconfigure(item, state="hidden")
+        else:
+            c.coords(item, x + width - step, spark.last_y, x + width, y)
+            c.itemconfigure(item, state="normal")
+        spark.last_y = y
+
+    def _draw_row(self, key):
+        slot = self.index[key] - self.top
+        if 0 <= slot < len(self.slots):
+            self._draw_slot(slot, key)
+
+    def _draw_slot(self, slot, key):
+        items = self.slots[slot]
+        c = self.canvas
+        theme = self.theme
+        if self.sparks[slot].key != key:
+            self._draw_spark(slot, key)
+        if key is None:
+            for item in items.values():
+                c.itemconfigure(item, state="hidden")
+            return
+        name, status, rtt_text = self.rows[key]
+        if status is None:
+            status_text, status_bg = "Unknown", theme["status_unknown"]
+        elif status:
+            status_text, status_bg = "Online", theme["status_online"]
+        else:
+            status_text, status_bg = "Offline", theme["status_offline"]
+        row_bg = theme["highlight_bg"] if key == self.selected else theme["label_bg"]
+        fg = "#000000" if key == self.selected else theme["label_fg"]
+        c.itemconfigure(items["bg"], fill=row_bg, state="normal")
+        c.itemconfigure(items["ip"], text=key, fill=fg, state="normal")
+        c.itemconfigure(items["name"], text=name, fill=theme["label_fg"], state="normal")
+        c.itemconfigure(items["status_bg"], fill=status_bg, state="normal")
+        c.itemconfigure(items["status"], text=status_text, fill=theme["label_fg"], state="normal")
+        c.itemconfigure(items["rtt"], text=rtt_text, fill=theme["label_fg"], state="normal")
+
+    def _click(self, event):
+        row = self.top + event.y // ROW_HEIGHT
+        key = self.order[row] if row < len(self.order) else None
+        if self.on_select is not None:
+            self.on_select(key)
+        else:
+            self.select(key)
+
+    def _update_scrollbar(self):
+        total = len(self.order)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + len(self.slots)) / total))
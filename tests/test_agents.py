@@ -0,0 +1,230 @@
+import math
+import socket
+import time
+
+import pytest
+
+from agents import (FRAME, AgentStreamer, AggregatorEngine, decode_keys, decode_results, encode_hello, encode_keys,
+                    encode_results, parse_address)
+from core import Monitor
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def aggregator(targets=()):
+    monitor = Monitor(list(targets), popups=False, history_file=None, log_file=None, snapshot_file=None,
+                      aggregate=("127.0.0.1", 0))
+    monitor.start()
+    return monitor
+
+
+def read_frames(sock, count):
+    frames = []
+    data = b""
+    while len(frames) < count:
+        data += sock.recv(65536)
+        while len(data) >= FRAME.size and len(data) >= FRAME.size + FRAME.unpack_from(data)[0]:
+            end = FRAME.size + FRAME.unpack_from(data)[0]
+            frames.append(data[FRAME.size:end])
+            data = data[end:]
+    return frames
+
+
+class Recorder:
+    """Collects an AggregatorEngine's callbacks."""
+
+    def __init__(self):
+        self.results = []
+        self.targets = []
+        self.partial = []
+        self.agents = []
+
+    def engine(self, targets):
+        engine = AggregatorEngine(lambda ip, samples: self.results.append((ip, samples)), ("127.0.0.1", 0),
+                                  on_target=lambda ip, name: self.targets.append((ip, name)),
+                                  on_partial=lambda ip, agents: self.partial.append((ip, agents)),
+                                  on_agent=lambda name, connected: self.agents.append((name, connected)))
+        engine.add_many(targets)
+        engine.start()
+        return engine
+
+
+def streamer(engine, name):
+    agent = AgentStreamer(("127.0.0.1", engine.port), name, flush_interval=0.02)
+    agent.start()
+    assert wait_for(lambda: name in engine.agents)
+    return agent
+
+
+def submit(agent, ip, samples):
+    sent = agent.sent
+    agent.submit(ip, ip, samples)
+    assert wait_for(lambda: agent.sent > sent)
+
+
+def test_wire_format_round_trip():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(encode_hello("east-1") + encode_keys([(0, "10.0.0.1", "gateway"), (7, "2001:db8::1", "höst")])
+                     + encode_results([7, 0], [0.001, float("nan"), 0.25, 0.5], 2, 1700000000.5))
+        hello, keys, results = read_frames(right, 3)
+    finally:
+        left.close()
+        right.close()
+    assert hello == b"\x01east-1"
+    assert decode_keys(keys) == [(0, "10.0.0.1", "gateway"), (7, "2001:db8::1", "höst")]
+    sent_at, burst, ids, rtts = decode_results(results)
+    assert (sent_at, burst, list(ids)) == (1700000000.5, 2, [7, 0])
+    assert rtts[0] == pytest.approx(0.001) and math.isnan(rtts[1])
+    assert list(rtts[2:]) == [0.25, 0.5]
+
+
+def test_truncated_results_are_rejected():
+    payload = encode_results([1, 2], [0.1, 0.2], 1, 0.0)[FRAME.size:]
+    with pytest.raises(ValueError):
+        decode_results(payload[:-4])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("collector", ("collector", 9375)),
+    ("collector:9000", ("collector", 9000)),
+    ("[2001:db8::1]:9000", ("2001:db8::1", 9000)),
+    ("2001:db8::1", ("2001:db8::1", 9375)),
+])
+def test_parse_address(text, expected):
+    assert parse_address(text) == expected
+
+
+def test_results_from_agents_are_merged():
+    recorder = Recorder()
+    engine = recorder.engine(["10.0.0.1"])
+    east, west = streamer(engine, "east"), streamer(engine, "west")
+    try:
+        submit(east, "10.0.0.1", (0.01,))
+        assert wait_for(lambda: recorder.results == [("10.0.0.1", (pytest.approx(0.01),))])
+
+        # West alone loses the target: its miss is not passed on but noted as a partial outage
+        submit(west, "10.0.0.1", (None,))
+        assert wait_for(lambda: recorder.partial == [("10.0.0.1", ("west",))])
+        assert len(recorder.results) == 1
+
+        # Once east loses it too the target is down
+        submit(east, "10.0.0.1", (None,))
+        assert wait_for(lambda: recorder.results[-1] == ("10.0.0.1", (None,)))
+        assert recorder.partial[-1] == ("10.0.0.1", ())
+        assert engine.records == 3
+    finally:
+        east.stop()
+        west.stop()
+        engine.stop()
+
+
+def test_unknown_targets_are_reported_once():
+    recorder = Recorder()
+    engine = recorder.engine([])
+    east = streamer(engine, "east")
+    try:
+        submit(east, "10.0.0.9", (0.01,))
+        submit(east, "10.0.0.9", (0.02,))
+        assert wait_for(lambda: recorder.targets == [("10.0.0.9", "10.0.0.9")])
+        assert recorder.results == []  # not a target until the monitor adds it
+    finally:
+        east.stop()
+        engine.stop()
+
+
+def test_disconnect_clears_the_agents_view():
+    recorder = Recorder()
+    engine = recorder.engine(["10.0.0.1"])
+    east, west = streamer(engine, "east"), streamer(engine, "west")
+    try:
+        submit(east, "10.0.0.1", (0.01,))
+        submit(west, "10.0.0.1", (None,))
+        assert wait_for(lambda: recorder.partial == [("10.0.0.1", ("west",))])
+        west.stop()
+        assert wait_for(lambda: ("west", False) in recorder.agents)
+        assert wait_for(lambda: recorder.partial[-1] == ("10.0.0.1", ()))
+        assert engine.views["10.0.0.1"] == {"east": True}
+        assert "west" not in engine.agents
+    finally:
+        east.stop()
+        engine.stop()
+
+
+def test_reconnecting_agent_replaces_its_old_connection():
+    recorder = Recorder()
+    engine = recorder.engine(["10.0.0.1"])
+    try:
+        first = socket.create_connection(("127.0.0.1", engine.port))
+        first.sendall(encode_hello("east"))
+        assert wait_for(lambda: "east" in engine.agents)
+        old = engine.agents["east"]
+        second = socket.create_connection(("127.0.0.1", engine.port))
+        second.sendall(encode_hello("east") + encode_keys([(0, "10.0.0.1", "gateway")])
+                       + encode_results([0], [0.01], 1, time.time()))
+        assert wait_for(lambda: len(recorder.results) == 1)
+        assert engine.agents["east"] is not old
+        first.settimeout(5)
+        assert first.recv(1) == b""  # the stale connection was closed
+        first.close()
+        second.close()
+    finally:
+        engine.stop()
+
+
+def test_malformed_frames_drop_the_agent():
+    recorder = Recorder()
+    engine = recorder.engine(["10.0.0.1"])
+    try:
+        sock = socket.create_connection(("127.0.0.1", engine.port))
+        sock.sendall(encode_results([0], [0.01], 1, time.time()))  # results before hello
+        sock.settimeout(5)
+        assert sock.recv(1) == b""
+        sock.close()
+        assert recorder.results == []
+    finally:
+        engine.stop()
+
+
+def test_reload_keeps_agent_targets():
+    monitor = aggregator([("10.9.9.9", "listed", {})])
+    try:
+        sock = socket.create_connection(("127.0.0.1", monitor.engine.port))
+        sock.sendall(encode_hello("east") + encode_keys([(0, "10.1.1.1", "agent-only")])
+                     + encode_results([0], [0.01], 1, time.time()))
+        assert wait_for(lambda: monitor.get("10.1.1.1") is not None and monitor.get("10.1.1.1").probes == 1)
+
+        added, removed, _ = monitor.reload([])
+        assert removed == ["10.9.9.9"]
+        assert "10.1.1.1" in monitor
+
+        # Results keep arriving on the same connection, without a new KEYS frame
+        sock.sendall(encode_results([0], [0.02], 1, time.time()))
+        assert wait_for(lambda: monitor.get("10.1.1.1").probes == 2)
+        sock.close()
+    finally:
+        monitor.stop()
+
+
+def test_removing_an_agent_target_by_hand_drops_it():
+    monitor = aggregator()
+    try:
+        sock = socket.create_connection(("127.0.0.1", monitor.engine.port))
+        sock.sendall(encode_hello("east") + encode_keys([(0, "10.1.1.1", "agent-only")])
+                     + encode_results([0], [0.01], 1, time.time()))
+        assert wait_for(lambda: "10.1.1.1" in monitor)
+        monitor.remove("10.1.1.1")
+        assert "10.1.1.1" not in monitor.agent_targets
+        sock.sendall(encode_results([0], [0.02], 1, time.time()))
+        time.sleep(0.3)
+        assert "10.1.1.1" not in monitor
+        sock.close()
+    finally:
+        monitor.stop()
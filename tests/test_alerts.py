@@ -0,0 +1,29 @@
+from alerts import AlertDispatcher
+
+
+def test_hosts_sharing_a_name_are_batched_apart():
+    dispatcher = AlertDispatcher(debounce=2, max_delay=10, min_gap=0)
+    dispatcher.submit("down", "10.0.0.1", "printer", "printer down", now=0)
+    dispatcher.submit("up", "10.0.1.1", "printer", "printer up", now=0.5)
+    summary = dispatcher.poll(now=3)
+    assert "1 host stopped responding: printer" in summary
+    assert "1 host is responding: printer" in summary
+    assert dispatcher.flapped == 0
+
+
+def test_flap_back_is_dropped():
+    dispatcher = AlertDispatcher(debounce=2, max_delay=10, min_gap=0)
+    dispatcher.submit("down", "10.0.0.1", "printer", "printer down", now=0)
+    dispatcher.submit("up", "10.0.0.1", "printer", "printer up", now=1)
+    assert dispatcher.poll(now=2) is None  # not quiet yet
+    assert dispatcher.poll(now=3.5) is None
+    assert dispatcher.flapped == 1
+
+
+def test_single_change_shows_its_own_message():
+    dispatcher = AlertDispatcher(debounce=2, max_delay=10, min_gap=15)
+    dispatcher.submit("down", "10.0.0.1", "printer", "printer down", now=0)
+    assert dispatcher.poll(now=2) == "printer down"
+    dispatcher.submit("up", "10.0.0.1", "printer", "printer up", now=3)
+    assert dispatcher.poll(now=6) is None  # within the minimum gap
+    assert dispatcher.poll(now=17) == "printer up"
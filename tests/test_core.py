@@ -0,0 +1,195 @@
+import os
+
+import pytest
+
+from core import (DEFAULT_IPS, DOWN_AFTER_MISSES, IpListWatcher, Monitor, TargetBlock, TargetState, ip_to_int,
+                  load_ip_list, parse_block, validate_hostname, validate_target)
+
+UP = [0.01]
+LOST = [None]
+
+
+def monitor(targets):
+    return Monitor(targets, popups=False, history_file=None, log_file=None, snapshot_file=None)
+
+
+def alerts(monitor):
+    found = []
+    while not monitor.log_queue.empty():
+        alert = monitor.log_queue.get()
+        found.append((alert.kind, alert.ip))
+    return found
+
+
+def test_unreachable_parent_does_not_hide_dependent_outage():
+    # A gateway that never answers pings (filtered) was never reported down, so it is no outage
+    m = monitor([("10.0.0.1", "gateway", {}), ("10.0.0.5", "host", {"parent": "10.0.0.1"})])
+    m.handle_result("10.0.0.5", UP)
+    for _ in range(DOWN_AFTER_MISSES + 2):
+        m.handle_result("10.0.0.1", LOST)
+        m.handle_result("10.0.0.5", LOST)
+    assert alerts(m) == [("up", "10.0.0.5"), ("down", "10.0.0.5")]
+    assert m.get("10.0.0.5").up is False
+    assert m.behind_outage("10.0.0.5") is None
+
+
+def test_single_parent_miss_does_not_hide_dependent_outage():
+    m = monitor([("10.0.0.1", "gateway", {}), ("10.0.0.5", "host", {"parent": "10.0.0.1"})])
+    m.handle_result("10.0.0.1", UP)
+    m.handle_result("10.0.0.5", UP)
+    for _ in range(DOWN_AFTER_MISSES):
+        m.handle_result("10.0.0.1", UP)  # a lossy parent, missing every other cycle
+        m.handle_result("10.0.0.1", LOST)
+        m.handle_result("10.0.0.5", LOST)
+    assert ("down", "10.0.0.5") in alerts(m)
+    assert m.get("10.0.0.5").up is False
+
+
+def test_parent_outage_folds_dependent_and_clears_on_recovery():
+    m = monitor([("10.0.0.1", "gateway", {}), ("10.0.0.5", "host", {"parent": "10.0.0.1"})])
+    m.handle_result("10.0.0.1", UP)
+    m.handle_result("10.0.0.5", UP)
+    for _ in range(DOWN_AFTER_MISSES):
+        m.handle_result("10.0.0.1", LOST)
+    for _ in range(DOWN_AFTER_MISSES + 2):
+        m.handle_result("10.0.0.5", LOST)
+    assert m.behind_outage("10.0.0.5") == "10.0.0.1"
+    assert m.get("10.0.0.5").up is True  # folded into the parent's outage
+    assert alerts(m) == [("up", "10.0.0.1"), ("up", "10.0.0.5"), ("down", "10.0.0.1")]
+
+    m.handle_result("10.0.0.1", UP)
+    assert m.behind_outage("10.0.0.5") is None
+    m.handle_result("10.0.0.5", LOST)
+    assert alerts(m) == [("up", "10.0.0.1"), ("down", "10.0.0.5")]
+
+
+@pytest.mark.parametrize("name", ["router", "host-1.lan", "example.com.", "xn--p1ai"])
+def test_valid_hostnames(name):
+    assert validate_hostname(name)
+
+
+@pytest.mark.parametrize("name", ["123", "10.0.0.256", "10.0.0.5-3", "10.0.0.1-300", "a.123", "-host", "a..b"])
+def test_malformed_hostnames_and_ranges(name):
+    assert not validate_hostname(name)
+    assert not validate_target(name)
+
+
+def test_reload_applies_only_the_diff():
+    m = monitor([("10.0.0.1", "gateway", {}), ("10.0.0.2", "nas", {}), ("10.0.0.3", "old", {})])
+    m.handle_result("10.0.0.1", UP)
+    gateway = m.get("10.0.0.1")
+    added, removed, updated = m.reload([("10.0.0.1", "gateway", {}), ("10.0.0.2", "storage", {}),
+                                        ("10.0.0.4", "new", {"parent": "10.0.0.1"})])
+    assert (added, removed, updated) == (["10.0.0.4"], ["10.0.0.3"], ["10.0.0.2"])
+    assert m.get("10.0.0.1") is gateway and gateway.probes == 1  # kept its state
+    assert m.get("10.0.0.2").name == "storage"
+    assert m.dependents("10.0.0.1") == {"10.0.0.4"}
+
+
+def test_empty_or_invalid_list_does_not_replace_targets_on_reload(tmp_path):
+    path = tmp_path / "ip_list.txt"
+    path.write_text("")
+    assert load_ip_list(str(path)) == DEFAULT_IPS  # first start still gets the defaults
+    assert load_ip_list(str(path), default=None) is None
+    path.write_text("10.0.0.1,gate")  # cut off in the middle of a line
+    assert load_ip_list(str(path), default=None) == [("10.0.0.1", "gate", {})]
+    path.write_text("not an address\n")
+    assert load_ip_list(str(path), default=None) is None
+    assert load_ip_list(str(tmp_path / "missing.txt"), default=None) is None
+
+
+def test_watcher_waits_for_the_file_to_settle(tmp_path):
+    path = tmp_path / "ip_list.txt"
+    path.write_text("10.0.0.1,gateway\n")
+    watcher = IpListWatcher(str(path))
+    assert not watcher.changed()
+    path.write_text("10.0.0.1,gateway\n10.0.0.2,n")
+    assert not watcher.changed()  # first sight of the new size
+    path.write_text("10.0.0.1,gateway\n10.0.0.2,nas\n")
+    os.utime(path, ns=(1, 2))
+    assert not watcher.changed()  # still changing
+    assert watcher.changed()  # the same on two polls: load it
+    assert not watcher.changed()
+
+
+def test_renaming_keeps_the_record_when_the_address_is_unchanged():
+    m = monitor([("10.0.0.1", "gateway", {"parent": "10.0.0.254"})])
+    m.handle_result("10.0.0.1", UP)
+    state = m.get("10.0.0.1")
+    m.rename("10.0.0.1", "10.0.0.1", "router")
+    assert m.get("10.0.0.1") is state
+    assert (state.name, state.probes, state.up) == ("router", 1, True)
+    assert m.dependents("10.0.0.254") == {"10.0.0.1"}
+    m.handle_result("10.0.0.1", UP)
+    assert alerts(m) == [("up", "10.0.0.1")]  # no second "is responding"
+
+
+def test_renaming_to_a_new_address_starts_afresh():
+    m = monitor([("10.0.0.1", "gateway", {})])
+    m.handle_result("10.0.0.1", UP)
+    m.rename("10.0.0.1", "10.0.0.2", "gateway")
+    assert "10.0.0.1" not in m
+    assert m.get("10.0.0.2").probes == 0
+
+
+@pytest.mark.parametrize("text, first, last", [
+    ("192.168.1.0/24", "192.168.1.1", "192.168.1.254"),
+    ("192.168.1.77/30", "192.168.1.77", "192.168.1.78"),
+    ("192.168.1.6/31", "192.168.1.6", "192.168.1.7"),
+    ("192.168.1.6/32", "192.168.1.6", "192.168.1.6"),
+    ("10.0.0.250-10.0.1.2", "10.0.0.250", "10.0.1.2"),
+    ("10.0.0.5-9", "10.0.0.5", "10.0.0.9"),
+])
+def test_blocks_are_parsed(text, first, last):
+    block = parse_block(text)
+    assert (block.first, block.last) == (ip_to_int(first), ip_to_int(last))
+
+
+@pytest.mark.parametrize("text", ["10.0.0.1", "10.0.0.0/33", "10.0.0.0/x", "10.0.0/24", "10.0.0.9-5",
+                                  "10.0.0.9-10.0.0.1", "10.0.0.1-300", "host-1"])
+def test_malformed_blocks_are_rejected(text):
+    assert parse_block(text) is None
+
+
+def test_block_expands_lazily_and_answers_membership():
+    block = TargetBlock(ip_to_int("10.0.0.254"), ip_to_int("10.0.1.1"))
+    assert len(block) == 4
+    assert list(block) == ["10.0.0.254", "10.0.0.255", "10.0.1.0", "10.0.1.1"]
+    assert "10.0.1.0" in block and "10.0.1.2" not in block and "not-an-ip" not in block
+
+
+@pytest.mark.parametrize("samples, status", [
+    ((0.01, 0.02, None), ("10.0.0.1", True, pytest.approx(0.015))),  # one of three lost: still responding
+    ((0.01, None, None), ("10.0.0.1", False, 0)),  # more than half lost: a miss
+    ((0.01, 0.03, None, None), ("10.0.0.1", True, pytest.approx(0.02))),  # exactly half is not over the threshold
+    ((None, None, None), ("10.0.0.1", False, 0)),
+])
+def test_cycle_loss_threshold(samples, status):
+    m = monitor([("10.0.0.1", "host", {})])
+    m.handle_result("10.0.0.1", samples)
+    assert m.status_queue.get_nowait() == status
+    assert m.get("10.0.0.1").misses == (0 if status[1] else 1)
+
+
+def test_ewma_smooths_rtt_and_loss():
+    state = TargetState("10.0.0.1", "host", {})
+    for response_time in (0.010, 0.020, None, 0.030):
+        state.observe(response_time)
+    assert state.ewma == pytest.approx(0.01359375)  # 0.010, 0.01125, held through the loss, then 0.01359375
+    assert state.loss_ewma == pytest.approx(0.109375)  # 0.125 after the loss, decayed by 7/8 once
+    assert state.link_stats() == {"probes": 4, "loss": 0.25, "loss_ewma": pytest.approx(0.109375),
+                                  "mean": pytest.approx(0.02), "ewma": pytest.approx(0.01359375),
+                                  "jitter": pytest.approx(0.0012109375)}
+
+
+def test_jitter_follows_rfc_3550():
+    state = TargetState("10.0.0.1", "host", {})
+    state.observe(0.010)
+    assert state.jitter == 0.0  # needs two replies
+    state.observe(0.020)
+    assert state.jitter == pytest.approx(0.000625)  # J += (|D| - J) / 16
+    state.observe(None)  # a loss neither resets nor moves it
+    state.observe(0.015)
+    assert state.jitter == pytest.approx(0.0008984375)
+    state.observe(0.015)
+    assert state.jitter == pytest.approx(0.000842285156)
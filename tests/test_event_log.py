@@ -0,0 +1,44 @@
+import json
+
+import event_log
+from event_log import EventLog
+
+
+def read_events(path, backups):
+    # Oldest file first: .N ... .1, then the live file
+    files = [path.with_name(f"{path.name}.{n}") for n in range(backups, 0, -1)] + [path]
+    events = []
+    for file in files:
+        text = file.read_text(encoding="utf-8") if file.exists() else ""
+        if text:  # the live file is empty right after a rollover
+            assert text.endswith("\n")  # never a torn line at a rollover
+            events.append([json.loads(line)["n"] for line in text.splitlines()])
+    return events
+
+
+def test_rotation_rolls_files_over_without_losing_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "LOG_BATCH", 50)
+    path = tmp_path / "events.jsonl"
+    log = EventLog(str(path), max_bytes=1000, backups=1000)
+    for n in range(2000):
+        log.write({"event": "up", "n": n})
+    log.close()
+
+    files = read_events(path, 1000)
+    assert len(files) >= 2000 // 50  # at least one rollover per batch
+    assert [n for events in files for n in events] == list(range(2000))
+    for rotated in range(1, len(files)):
+        assert path.with_name(f"{path.name}.{rotated}").stat().st_size >= 1000
+
+
+def test_rotation_keeps_only_the_newest_backups(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "LOG_BATCH", 50)
+    path = tmp_path / "events.jsonl"
+    log = EventLog(str(path), max_bytes=1000, backups=2)
+    for n in range(2000):
+        log.write({"event": "up", "n": n})
+    log.close()
+
+    assert not path.with_name(f"{path.name}.3").exists()
+    kept = [n for events in read_events(path, 2) for n in events]
+    assert kept and kept == list(range(kept[0], 2000))  # contiguous up to the last event written
@@ -0,0 +1,45 @@
+import queue
+import time
+
+import gui
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.status_queue = queue.Queue()
+
+    def __contains__(self, ip):
+        return True
+
+
+class FakeTargetList:
+    def __init__(self):
+        self.drawn = []
+
+    def __contains__(self, ip):
+        return True
+
+    def set_status(self, ip, is_responding, text):
+        self.drawn.append((ip, is_responding, text))
+
+
+def test_status_drain_stops_at_the_deadline(monkeypatch):
+    monitor, rows = FakeMonitor(), FakeTargetList()
+    monkeypatch.setattr(gui, "monitor", monitor)
+    monkeypatch.setattr(gui, "target_list", rows)
+    monkeypatch.setattr(gui, "pending_status", gui.OrderedDict())
+    for n in range(100):
+        monitor.status_queue.put((f"10.0.0.{n}", True, 0.001))
+
+    gui.process_status_queue(time.perf_counter() - 1)
+    assert monitor.status_queue.qsize() == 100 and rows.drawn == []
+
+    gui.process_status_queue(time.perf_counter() + 5)
+    assert monitor.status_queue.empty()
+    assert len(rows.drawn) == 100 and rows.drawn[0] == ("10.0.0.0", True, "1 ms")
+
+
+def test_rtt_stats_summary():
+    recent = {"samples": 40, "loss": 0.025, "min": 0.0012, "avg": 0.002, "p95": 0.0041, "p99": None}
+    assert gui.format_rtt_stats("router", recent) == \
+        "router: min/avg/p95/p99 1.2/2.0/4.1/- ms, 2.5% loss over 40 samples"
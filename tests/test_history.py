@@ -0,0 +1,78 @@
+import math
+from array import array
+
+import history
+from history import RingBuffer, SegmentStore
+
+
+def values(samples):
+    return [None if x != x else x for x in samples]
+
+
+def test_latest_wraps_around_the_ring():
+    ring = RingBuffer(4)
+    for n in range(6):
+        ring.append(n if n != 4 else None)
+    assert len(ring) == 4 and ring.head == 2
+    assert values(ring.latest()) == [2, 3, None, 5]
+    assert values(ring.latest(2)) == [None, 5]
+    assert values(ring.latest(10)) == [2, 3, None, 5]
+
+
+def test_extend_wraps_and_keeps_only_the_newest():
+    ring = RingBuffer(4)
+    ring.append(1.0)
+    ring.extend(array("d", [2.0, 3.0, 4.0]))
+    assert ring.head == 0 and list(ring.latest()) == [1.0, 2.0, 3.0, 4.0]
+    ring.extend(array("d", [5.0, 6.0]))
+    assert list(ring.latest()) == [3.0, 4.0, 5.0, 6.0]
+    ring.extend(array("d", [7.0, 8.0, 9.0, 10.0, 11.0, 12.0]))
+    assert ring.head == 2 and list(ring.latest()) == [9.0, 10.0, 11.0, 12.0]
+
+
+def test_stats_use_nearest_rank_percentiles_and_count_losses():
+    ring = RingBuffer(200)
+    for n in range(1, 101):
+        ring.append(n / 1000)
+    ring.extend(array("d", [math.nan] * 25))
+    stats = ring.stats()
+    assert stats["samples"] == 125 and stats["loss"] == 0.2
+    assert stats["min"] == 0.001 and math.isclose(stats["avg"], 0.0505)
+    assert stats["p95"] == 0.095 and stats["p99"] == 0.099
+    assert ring.stats(window=25)["loss"] == 1.0 and ring.stats(window=25)["p95"] is None
+    assert RingBuffer(4).stats() == {"samples": 0, "loss": 0.0, "min": None, "avg": None, "p95": None, "p99": None}
+
+
+def test_scan_reads_across_a_rotation(tmp_path):
+    store = SegmentStore(str(tmp_path / "history.bin"), max_records=4)
+    for n in range(7):
+        store.append(100.0 + n, "10.0.0.1" if n % 2 else "10.0.0.2", None if n == 3 else n / 1024)
+    assert (tmp_path / "history.bin.1").exists() and store.count == 3
+    assert [(t, key, rtt) for t, key, rtt in store.scan()] == \
+        [(100.0 + n, "10.0.0.1" if n % 2 else "10.0.0.2", None if n == 3 else n / 1024) for n in range(7)]
+    assert [t for t, _, _ in store.scan("10.0.0.1")] == [101.0, 103.0, 105.0]
+    assert [t for t, _, _ in store.scan(since=104.0)] == [104.0, 105.0, 106.0]
+    store.close()
+
+    reopened = SegmentStore(str(tmp_path / "history.bin"), max_records=4)
+    assert len(list(reopened.scan())) == 7
+    reopened.close()
+
+
+def test_scan_survives_the_segment_growing_and_stops_at_a_rotation(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "SCAN_CHUNK", 2)
+    monkeypatch.setattr(history, "SEGMENT_GROW", 4)
+    store = SegmentStore(str(tmp_path / "history.bin"), max_records=8)
+    for n in range(4):
+        store.append(float(n), "10.0.0.1", 0.5)
+    scan = store.scan()
+    assert next(scan)[0] == 0.0
+    store.append(4.0, "10.0.0.1", 0.5)  # remaps the segment while the scan is suspended
+    assert [t for t, _, _ in scan] == [1.0, 2.0, 3.0]
+
+    scan = store.scan()
+    assert next(scan)[0] == 0.0
+    for n in range(5, 9):
+        store.append(float(n), "10.0.0.1", 0.5)  # the ninth record rotates
+    assert list(scan) == [(1.0, "10.0.0.1", 0.5)]  # the rest of its chunk, then it stops
+    store.close()
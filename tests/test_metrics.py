@@ -0,0 +1,53 @@
+from core import Monitor
+from metrics import FAMILIES, MetricsRegistry
+
+
+def monitored(targets):
+    monitor = Monitor(targets, popups=False, history_file=None, log_file=None, snapshot_file=None)
+    registry = monitor.metrics = MetricsRegistry(monitor)
+    return monitor, registry
+
+
+def test_exposition_format():
+    monitor, registry = monitored([("10.0.0.1", 'lab "a"\\b', {}), ("10.0.0.2", "idle", {})])
+    monitor.handle_result("10.0.0.1", (0.002, None, 0.03))
+    lines = registry._render().splitlines()
+
+    for family, kind, help_text in FAMILIES:
+        index = lines.index(f"# HELP {family} {help_text}")
+        assert lines[index + 1] == f"# TYPE {family} {kind}"
+    labels = 'target="10.0.0.1",name="lab \\"a\\"\\\\b"'
+    assert f"pinger_up{{{labels}}} 1" in lines
+    assert f"pinger_probes_total{{{labels}}} 3" in lines
+    assert f"pinger_probes_lost_total{{{labels}}} 1" in lines
+    assert f"pinger_rtt_last_seconds{{{labels}}} 0.016" in lines
+    buckets = [line for line in lines if line.startswith("pinger_rtt_seconds_bucket")]
+    assert buckets[0] == f'pinger_rtt_seconds_bucket{{{labels},le="0.0005"}} 0'
+    assert f'pinger_rtt_seconds_bucket{{{labels},le="0.0025"}} 1' in buckets
+    assert f'pinger_rtt_seconds_bucket{{{labels},le="0.05"}} 2' in buckets
+    assert buckets[-1] == f'pinger_rtt_seconds_bucket{{{labels},le="+Inf"}} 2'
+    assert f"pinger_rtt_seconds_count{{{labels}}} 2" in lines
+    assert f"pinger_rtt_seconds_sum{{{labels}}} 0.032" in lines
+    assert f"pinger_rtt_p95_seconds{{{labels}}} 0.03" in lines
+    assert f"pinger_rtt_p99_seconds{{{labels}}} 0.03" in lines
+    assert not any('"10.0.0.2"' in line for line in lines)  # no result yet
+
+
+def test_only_targets_with_new_results_are_rendered_again(monkeypatch):
+    monitor, registry = monitored([("10.0.0.1", "a", {}), ("10.0.0.2", "b", {})])
+    monitor.handle_result("10.0.0.1", (0.01,))
+    monitor.handle_result("10.0.0.2", (0.01,))
+    rendered = []
+    render_target = registry._render_target
+    monkeypatch.setattr(registry, "_render_target",
+                        lambda state, histogram: rendered.append(state.ip) or render_target(state, histogram))
+
+    first = registry._render()
+    assert sorted(rendered) == ["10.0.0.1", "10.0.0.2"]
+    assert registry._render() == first and len(rendered) == 2
+
+    monitor.handle_result("10.0.0.2", (None,))
+    assert 'pinger_probes_lost_total{target="10.0.0.2",name="b"} 1' in registry._render()
+    assert rendered[2:] == ["10.0.0.2"]
+    monitor.rename("10.0.0.1", "10.0.0.1", "renamed")
+    assert 'name="renamed"' in registry._render() and rendered[3:] == ["10.0.0.1"]
@@ -0,0 +1,25 @@
+import pytest
+
+from pinger import parse_args
+
+
+def test_numeric_options_are_parsed():
+    args = parse_args(["--burst", "5", "--workers", "2", "--metrics-port", "9374", "--sweep-rate", "500"])
+    assert (args.burst, args.workers, args.metrics_port, args.sweep_rate) == (5, 2, 9374, 500)
+
+
+@pytest.mark.parametrize("argv", [
+    ["--burst", "0"],
+    ["--burst", "-3"],
+    ["--burst", "256"],
+    ["--burst", "three"],
+    ["--workers", "0"],
+    ["--sweep-rate", "0"],
+    ["--sweep-rate", "1000000"],
+    ["--metrics-port", "70000"],
+    ["--aggregate", "0"],
+])
+def test_out_of_range_numbers_are_rejected(argv, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+    assert argv[0] in capsys.readouterr().err
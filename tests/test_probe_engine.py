@@ -0,0 +1,183 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from core import parse_block
+import probe_engine
+from probe_engine import PortProber, ProbeEngine
+from simulated import SimulatedHost, SimulatedProber, normal_latency
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_task_count_follows_one_off_sweeps():
+    prober = SimulatedProber({"10.0.0.1": SimulatedHost(normal_latency(0.001, 0))})
+    done = threading.Event()
+    engine = ProbeEngine(lambda ip, samples: None, interval=5, timeout=0.2, prober=prober)
+    engine.start()
+    try:
+        engine.add("10.0.0.9")
+        engine.sweep("10.0.0.0/30", parse_block("10.0.0.0/30"), lambda key, responders, total: done.set())
+        assert wait_for(lambda: engine.task_count() == 2)
+        assert done.wait(5)
+        assert wait_for(lambda: engine.task_count() == 1)
+    finally:
+        engine.stop()
+
+
+def test_sweep_pauses_while_too_many_requests_are_unanswered(monkeypatch):
+    monkeypatch.setattr(probe_engine, "MAX_SWEEP_PENDING", 4)
+    block = parse_block("10.0.1.0/28")
+    prober = SimulatedProber({ip: SimulatedHost(normal_latency(0.001, 0), loss=1.0) for ip in block})
+    result = {}
+    done = threading.Event()
+    engine = ProbeEngine(None, timeout=0.1, sweep_rate=100000, prober=prober)
+    engine.start()
+    try:
+        engine.sweep("10.0.1.0/28", block, lambda key, responders, total: (result.update(total=total), done.set()))
+        time.sleep(0.05)
+        assert prober.sent == 4
+        assert done.wait(5)
+        assert result["total"] == prober.sent == len(block)
+    finally:
+        engine.stop()
+
+
+class FullBufferProber(SimulatedProber):
+    """Refuses the given send attempts (counted from 1) as if the socket buffer were full."""
+
+    def __init__(self, hosts, full):
+        super().__init__(hosts)
+        self.full = set(full)
+        self.attempts = 0
+
+    def send(self, address, seq):
+        self.attempts += 1
+        if self.attempts in self.full:
+            raise BlockingIOError
+        return super().send(address, seq)
+
+
+def test_burst_resumes_after_a_full_socket_buffer():
+    prober = FullBufferProber({"10.0.0.1": SimulatedHost(normal_latency(0.001, 0))}, full={2, 3})
+    results = []
+    engine = ProbeEngine(lambda ip, samples: results.append(samples), interval=60, timeout=0.5, prober=prober,
+                         burst=3)
+    engine.start()
+    try:
+        engine.add("10.0.0.1")
+        assert wait_for(lambda: results)
+        assert len(results[0]) == 3 and None not in results[0]  # nothing counted as lost
+        assert prober.sent == 3 and prober.attempts == 5
+    finally:
+        engine.stop()
+
+
+def test_sweep_retries_an_address_after_a_full_socket_buffer():
+    block = parse_block("10.0.2.0/29")
+    prober = FullBufferProber({ip: SimulatedHost(normal_latency(0.001, 0)) for ip in block}, full={3})
+    result = {}
+    done = threading.Event()
+    engine = ProbeEngine(None, timeout=0.1, sweep_rate=100000, prober=prober)
+    engine.start()
+    try:
+        engine.sweep("10.0.2.0/29", block, lambda key, responders, total: (result.update(
+            responders=responders, total=total), done.set()))
+        assert done.wait(5)
+        assert result["total"] == len(block) and sorted(result["responders"]) == sorted(block)
+    finally:
+        engine.stop()
+
+
+def port_replies(prober, timeout=2.0):
+    # Everything the prober settles within timeout, whether or not its selector has a descriptor
+    replies = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not replies:
+        replies.extend(prober.poll(time.monotonic()))
+        if prober.selectables():
+            replies.extend(prober.receive(prober))
+        time.sleep(0.01)
+    return [(seq, address) for seq, address, _ in replies]
+
+
+def unused_port(kind):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_tcp_connect_counts_as_a_reply():
+    prober = PortProber()
+    prober.open()
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        try:
+            assert prober.send(("tcp", server.getsockname()[1]), "127.0.0.1", 7)
+            assert port_replies(prober) == [(7, "127.0.0.1")]
+            assert len(prober) == 0
+        finally:
+            prober.close()
+
+
+def test_udp_reply_counts_as_a_reply():
+    prober = PortProber()
+    prober.open()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(2)
+        try:
+            assert prober.send(("udp", server.getsockname()[1]), "127.0.0.1", 8)
+            assert 8 in prober and port_replies(prober, timeout=0.1) == []  # nothing until the service answers
+            payload, client = server.recvfrom(2048)
+            server.sendto(payload, client)
+            assert port_replies(prober) == [(8, "127.0.0.1")]
+        finally:
+            prober.close()
+
+
+@pytest.mark.parametrize("protocol, kind", [("tcp", socket.SOCK_STREAM), ("udp", socket.SOCK_DGRAM)])
+def test_refused_port_counts_as_up(protocol, kind):
+    prober = PortProber()
+    prober.open()
+    try:
+        assert prober.send((protocol, unused_port(kind)), "127.0.0.1", 9)
+        assert port_replies(prober) == [(9, "127.0.0.1")]
+    finally:
+        prober.close()
+
+
+def test_discarded_probe_is_closed_and_never_reported():
+    prober = PortProber()
+    prober.open()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+        server.bind(("127.0.0.1", 0))
+        try:
+            prober.send(("udp", server.getsockname()[1]), "127.0.0.1", 10)
+            prober.discard(10)
+            assert 10 not in prober and port_replies(prober, timeout=0.1) == []
+        finally:
+            prober.close()
+
+
+def test_engine_runs_port_probes_next_to_the_prober():
+    results = []
+    engine = ProbeEngine(lambda ip, samples: results.append((ip, samples)), interval=60, timeout=1,
+                         prober=SimulatedProber({}))
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        engine.start()
+        try:
+            engine.set_probe("127.0.0.1", ("tcp", server.getsockname()[1]))
+            engine.add("127.0.0.1")
+            assert wait_for(lambda: results)
+            assert results[0][0] == "127.0.0.1" and results[0][1][0] is not None
+        finally:
+            engine.stop()
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+import resolver
+from resolver import PENDING, ResolverCache, literal_address
+
+
+class StubResolver:
+    """resolve() replacement answering from a dict; a missing name raises like a failed lookup."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, name):
+        self.gate.wait(5)
+        self.calls.append(name)
+        if name not in self.answers:
+            raise OSError(f"no such host {name}")
+        return self.answers[name]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resolver.time, "monotonic", lambda: now[0])
+    return now
+
+
+def settle(cache, name, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if name in cache._entries and name not in cache._queued:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"{name} was never resolved")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10.0.0.1", "10.0.0.1"),
+    ("2001:DB8:0:0::1", "2001:db8::1"),
+    ("::FFFF:10.0.0.1", "::ffff:10.0.0.1"),
+    ("fe80::1", "fe80::1"),
+    ("router.lan", None),
+    ("10.0.0.256", None),
+])
+def test_literal_address(text, expected):
+    assert literal_address(text) == expected
+
+
+def test_literals_never_reach_the_resolver():
+    stub = StubResolver({})
+    cache = ResolverCache(stub, workers=1)
+    assert cache.lookup("2001:DB8::1") == "2001:db8::1"
+    assert cache.lookup("10.0.0.1") == "10.0.0.1"
+    assert stub.calls == []
+
+
+def test_miss_returns_pending_without_blocking():
+    stub = StubResolver({"router.lan": ("10.0.0.1", 60)})
+    stub.gate.clear()  # the resolver hangs until released
+    cache = ResolverCache(stub, workers=1)
+    started = time.perf_counter()
+    assert cache.lookup("router.lan") is PENDING
+    assert cache.lookup("router.lan") is PENDING
+    assert time.perf_counter() - started < 0.1
+    stub.gate.set()
+    settle(cache, "router.lan")
+    assert cache.lookup("router.lan") == "10.0.0.1"
+    assert stub.calls == ["router.lan"]  # the second miss did not queue another lookup
+
+
+def test_refreshes_ahead_of_ttl_and_serves_old_address_meanwhile(clock):
+    stub = StubResolver({"router.lan": ("10.0.0.1", 100)})
+    cache = ResolverCache(stub, workers=1)
+    cache.lookup("router.lan")
+    settle(cache, "router.lan")
+
+    clock[0] += 100 * resolver.DNS_REFRESH_AHEAD - 1
+    stub.answers["router.lan"] = ("10.0.0.2", 100)
+    assert cache.lookup("router.lan") == "10.0.0.1"
+    assert stub.calls == ["router.lan"]
+
+    clock[0] += 2
+    stub.gate.clear()
+    assert cache.lookup("router.lan") == "10.0.0.1"  # refresh queued, old answer still served
+    stub.gate.set()
+    settle(cache, "router.lan")
+    assert cache.lookup("router.lan") == "10.0.0.2"
+    assert stub.calls == ["router.lan", "router.lan"]
+
+
+def test_failed_refresh_keeps_last_good_answer_until_it_expires(clock):
+    stub = StubResolver({"router.lan": ("10.0.0.1", 100)})
+    cache = ResolverCache(stub, negative_ttl=30, workers=1)
+    cache.lookup("router.lan")
+    settle(cache, "router.lan")
+
+    del stub.answers["router.lan"]
+    clock[0] += 90
+    assert cache.lookup("router.lan") == "10.0.0.1"
+    settle(cache, "router.lan")
+    assert cache.lookup("router.lan") == "10.0.0.1"
+
+
+def test_failures_are_cached_for_the_negative_ttl(clock):
+    stub = StubResolver({})
+    cache = ResolverCache(stub, negative_ttl=30, workers=1)
+    assert cache.lookup("gone.lan") is PENDING
+    settle(cache, "gone.lan")
+    assert cache.lookup("gone.lan") is None
+    clock[0] += 29
+    assert cache.lookup("gone.lan") is None
+    assert stub.calls == ["gone.lan"]
+
+    clock[0] += 2
+    stub.gate.clear()
+    assert cache.lookup("gone.lan") is PENDING  # expired; retried in the background
+    stub.answers["gone.lan"] = ("10.0.0.9", 60)
+    stub.gate.set()
+    settle(cache, "gone.lan")
+    assert cache.lookup("gone.lan") == "10.0.0.9"
+
+
+def test_forget_drops_the_entry():
+    stub = StubResolver({"router.lan": ("10.0.0.1", 60)})
+    cache = ResolverCache(stub, workers=1)
+    cache.lookup("router.lan")
+    settle(cache, "router.lan")
+    cache.forget("router.lan")
+    assert cache.lookup("router.lan") is PENDING
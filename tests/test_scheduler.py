@@ -0,0 +1,34 @@
+from scheduler import Scheduler
+
+
+def fire(scheduler, now):
+    return [(key, deadline) for key, deadline, _ in scheduler.pop_due(now)]
+
+
+def test_shortened_interval_is_not_scheduled_in_the_past():
+    scheduler = Scheduler(30)
+    scheduler.add("10.0.0.1", 0.0)
+    assert fire(scheduler, 0.0) == [("10.0.0.1", 0.0)]
+
+    # A miss noticed 2 s after the probe shortens the period to 1 s
+    scheduler.set_interval("10.0.0.1", 1, now=2.0)
+    assert scheduler.next_deadline() == 2.0
+    assert [(key, late) for key, _, late in scheduler.pop_due(2.0)] == [("10.0.0.1", 0.0)]
+
+
+def test_shortened_interval_takes_effect_from_the_last_firing():
+    scheduler = Scheduler(30)
+    scheduler.add("10.0.0.1", 0.0)
+    fire(scheduler, 0.0)
+    scheduler.set_interval("10.0.0.1", 5, now=2.0)
+    assert scheduler.next_deadline() == 5.0
+    scheduler.set_interval("10.0.0.1", None, now=3.0)
+    assert scheduler.next_deadline() == 30.0
+
+
+def test_rate_limit_defers_firings():
+    scheduler = Scheduler(10, rate=10)
+    scheduler.add_many([f"10.0.0.{n}" for n in range(5)], 0.0)
+    assert len(fire(scheduler, 10.0)) == 1  # burst of max(1, rate * RATE_BURST) tokens
+    assert fire(scheduler, 10.05) == []
+    assert len(fire(scheduler, 10.2)) == 1
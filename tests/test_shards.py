@@ -0,0 +1,41 @@
+import threading
+import time
+from threading import Thread
+
+from shards import ResultsTable, ShardedEngine
+
+
+def test_table_round_trip():
+    table = ResultsTable(8, 2, 8, burst=2)
+    try:
+        table.write(1, 5, (0.01, None))
+        samples, updated_at, version = table.read(5)
+        assert samples == (0.01, None)
+        assert version == 2 and updated_at > 0
+        assert table.heads[1] == 1 and table.rings[1 * 8] == 5
+    finally:
+        table.close(unlink=True)
+
+
+def test_local_results_are_delivered_on_the_reader_thread():
+    delivered = []
+    engine = ShardedEngine(lambda ip, samples: delivered.append((ip, samples, threading.current_thread())),
+                           workers=1, capacity=1,
+                           on_sweep=lambda key, responders, total: delivered.append((key, total,
+                                                                                     threading.current_thread())))
+    # Run only the reader; the test thread stands in for the local engine's thread
+    engine.running = True
+    engine._thread = Thread(target=engine._run, name="shard-reader", daemon=True)
+    engine._thread.start()
+    try:
+        engine.local.on_result("10.0.0.1", (0.01,))
+        engine.local.on_sweep("10.0.1.0/24", {}, 256)
+        deadline = time.monotonic() + 5
+        while len(delivered) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [entry[:2] for entry in delivered] == [("10.0.0.1", (0.01,)), ("10.0.1.0/24", 256)]
+        assert all(entry[2] is engine._thread for entry in delivered)
+    finally:
+        engine.running = False
+        engine._thread.join(timeout=1)
+        engine.table.close(unlink=True)
@@ -0,0 +1,71 @@
+import math
+
+from core import DEPENDENT_INTERVAL_FACTOR, DOWN_AFTER_MISSES, PING_INTERVAL, Monitor
+from simulated import SimulatedProber
+
+TARGETS = [("10.0.0.1", "gateway", {}), ("10.0.0.5", "host", {"parent": "10.0.0.1"}), ("10.0.0.9", "other", {})]
+
+
+def monitor(path, prober=None):
+    return Monitor(TARGETS, popups=False, history_file=None, log_file=None, snapshot_file=str(path), prober=prober)
+
+
+def gateway_outage(path):
+    m = monitor(path)
+    m.handle_result("10.0.0.1", [0.01, 0.012, None])
+    m.handle_result("10.0.0.5", [0.02, 0.021, 0.022])
+    m.handle_result("10.0.0.9", [0.03, 0.031, 0.032])
+    for _ in range(DOWN_AFTER_MISSES):
+        m.handle_result("10.0.0.1", [None, None, None])
+    assert m.failing == {"10.0.0.1"}
+    m.save_snapshot()
+    return m
+
+
+def test_round_trip_restores_records_and_history(tmp_path):
+    before = gateway_outage(tmp_path / "pinger.snapshot")
+    after = monitor(tmp_path / "pinger.snapshot")
+    restored, _, saved_at = after.restored
+    assert restored == 3 and saved_at > 0
+    for ip in ("10.0.0.1", "10.0.0.5", "10.0.0.9"):
+        old, new = before.get(ip), after.get(ip)
+        for field in ("up", "misses", "probes", "lost", "received", "rtt_sum", "ewma", "jitter", "loss_ewma",
+                      "prev_rtt", "last_rtt", "last_seen", "updated_at", "changed_at"):
+            assert getattr(new, field) == getattr(old, field), (ip, field)
+        assert [x if x == x else None for x in new.history.latest(100)] == \
+            [x if x == x else None for x in old.history.latest(100)]
+    assert math.isnan(after.get("10.0.0.1").history.latest(1)[0])
+
+
+def test_restart_during_an_outage_keeps_dependents_quiet(tmp_path):
+    gateway_outage(tmp_path / "pinger.snapshot")
+    after = monitor(tmp_path / "pinger.snapshot")
+    assert after.failing == {"10.0.0.1"}
+    assert after.behind_outage("10.0.0.5") == "10.0.0.1"
+    while not after.log_queue.empty():
+        after.log_queue.get()
+    for _ in range(DOWN_AFTER_MISSES + 1):
+        after.handle_result("10.0.0.5", [None, None, None])
+    assert after.log_queue.empty()  # folded into the gateway's outage, no alert storm
+    after.handle_result("10.0.0.1", [0.01, 0.01, 0.01])
+    assert after.failing == set()
+
+
+def test_restored_dependents_start_on_the_slow_period(tmp_path):
+    gateway_outage(tmp_path / "pinger.snapshot")
+    after = monitor(tmp_path / "pinger.snapshot", prober=SimulatedProber({}))
+    after.snapshot_file = None  # do not overwrite the snapshot on stop
+    after.start()
+    try:
+        assert after.get("10.0.0.5").interval == PING_INTERVAL * DEPENDENT_INTERVAL_FACTOR
+        assert after.get("10.0.0.9").interval is None
+    finally:
+        after.stop()
+
+
+def test_targets_no_longer_listed_are_skipped(tmp_path):
+    gateway_outage(tmp_path / "pinger.snapshot")
+    m = Monitor(TARGETS[2:], popups=False, history_file=None, log_file=None,
+                snapshot_file=str(tmp_path / "pinger.snapshot"))
+    assert m.restored[0] == 1
+    assert m.failing == set()
@@ -0,0 +1,109 @@
+import pytest
+
+import target_list
+from history import RingBuffer
+from target_list import ROW_HEIGHT, SPARK_POINTS, TargetList
+
+THEME = {"frame_bg": "#fff", "canvas_bg": "#fff", "label_bg": "#eee", "label_fg": "#000", "highlight_bg": "#ccc",
+         "status_unknown": "#999", "status_online": "#0f0", "status_offline": "#f00"}
+
+
+class FakeCanvas:
+    """Records what a Tk canvas would draw: item coordinates, tags and options."""
+
+    def __init__(self, *args, **kwargs):
+        self.items = {}  # id -> {"coords": [...], "tags": (...), option: value}
+
+    def _create(self, *coords, **options):
+        item = len(self.items) + 1
+        self.items[item] = dict(options, coords=list(coords), tags=tuple(options.get("tags", ())))
+        return item
+
+    create_line = create_rectangle = create_text = _create
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+    def itemconfigure(self, item, **options):
+        for target in self._find(item):
+            target.update(options)
+
+    def move(self, tag, dx, dy):
+        for target in self._find(tag):
+            target["coords"] = [v + (dx if n % 2 == 0 else dy) for n, v in enumerate(target["coords"])]
+
+    def delete(self, item):
+        for key in [key for key, target in self.items.items() if item == key or item in target["tags"]]:
+            del self.items[key]
+
+    def _find(self, item):
+        if item in self.items:
+            return [self.items[item]]
+        return [target for target in self.items.values() if item in target["tags"]]
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None  # pack, bind, configure, set
+
+
+@pytest.fixture
+def rows(monkeypatch):
+    monkeypatch.setattr(target_list, "Canvas", FakeCanvas)
+    monkeypatch.setattr(target_list, "Scrollbar", FakeCanvas)
+    monkeypatch.setattr(target_list.Frame, "__init__", lambda self, master=None: None)
+    monkeypatch.setattr(target_list.Frame, "configure", lambda self, **options: None, raising=False)
+    view = TargetList(None, THEME)
+    view._resize(ROW_HEIGHT * 3)  # four slots, the last one partly visible
+    return view
+
+
+def spark_picture(view, slot):
+    # Visible segments of a slot's sparkline, left to right, rounded to hide float drift from moves
+    canvas = view.canvas
+    segments = [canvas.items[item] for item in view.sparks[slot].items]
+    return sorted(tuple(round(v, 6) for v in segment["coords"]) for segment in segments
+                  if segment["state"] == "normal")
+
+
+def test_removing_rows_clamps_like_scrolling(rows):
+    for n in range(10):
+        rows.add(f"10.0.0.{n}", f"host{n}")
+    rows.yview("moveto", 1.0)
+    assert rows.top == 10 - len(rows.slots) + 1  # last row in the last fully visible slot
+    rows.remove("10.0.0.0")
+    assert rows.top == 9 - len(rows.slots) + 1
+    rows.yview("scroll", 1, "units")
+    assert rows.top == 9 - len(rows.slots) + 1
+    for n in range(1, 9):
+        rows.remove(f"10.0.0.{n}")
+    assert rows.top == 0 and rows.order == ["10.0.0.9"]
+
+
+def test_sparkline_ring_matches_a_full_redraw(rows):
+    histories = {"10.0.0.1": RingBuffer(40)}
+    rows.history_source = histories.get
+    rows.add("10.0.0.1", "router")
+    history = histories["10.0.0.1"]
+    for n in range(75):  # wraps both the history ring and the segment ring
+        history.append(None if n % 11 == 5 else 0.001 * (1 + n % 7))
+        if n % 3:  # several samples may arrive between ticks
+            rows.advance_sparklines()
+            incremental = spark_picture(rows, 0)
+            rows._draw_spark(0, "10.0.0.1")
+            assert incremental == spark_picture(rows, 0), n
+    assert len(spark_picture(rows, 0)) < SPARK_POINTS - 1  # the lost samples leave gaps
+
+
+def test_sparkline_falling_far_behind_is_redrawn(rows):
+    histories = {"10.0.0.1": RingBuffer(100)}
+    rows.history_source = histories.get
+    rows.add("10.0.0.1", "router")
+    rows.advance_sparklines()
+    assert spark_picture(rows, 0) == []  # no history yet
+    history = histories["10.0.0.1"]
+    history.append(0.002)
+    rows.advance_sparklines()
+    for _ in range(SPARK_POINTS + 5):
+        history.append(0.004)
+    rows.advance_sparklines()
+    segments = spark_picture(rows, 0)
+    assert len(segments) == SPARK_POINTS - 1 and len({segment[1] for segment in segments}) == 1